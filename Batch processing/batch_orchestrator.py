@@ -0,0 +1,311 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from batch_writer import io_pairs, iter_jsonl
+
+# ——————————————
+# Submits batch input files, polls the jobs, downloads their outputs and resubmits the
+# requests that failed, keeping every step in a JSON ledger (batch_ledger.json), so that
+# an interrupted run continues where it stopped instead of uploading or paying twice.
+#
+# One ledger job per batch input file (or shard), keyed by its path:
+#   new → uploaded (input_file_id) → submitted (batch_id) → done / failed
+# When a batch ends ("completed", "expired", "cancelled"), its successful answers are
+# merged into the job's output file (e.g. CQ_Batchoutput/swo_output.jsonl, one record per
+# custom_id, as the postprocessors expect) and the error records go to <output dir>/errors/.
+# Requests without a successful answer are written to a retry file and submitted again
+# (at most `max_attempts` submissions per job). A job that failed anyway is retried with its
+# unanswered requests the next time its input is added, even if the input did not change.
+LEDGER_PATH = "batch_ledger.json"
+ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+POLL_INTERVAL = 60
+MAX_ATTEMPTS = 3
+MAX_WORKERS = 8
+CLOCK_SKEW = 300    # seconds of local/remote clock difference tolerated when looking for a lost batch
+TERMINAL = {"completed", "expired", "cancelled", "failed"}
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_jsonl(path, records):
+    # whole-file replace, so a crash never leaves a half-written output behind
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(path + ".tmp", path)
+
+
+def _parse_jsonl(data):
+    return [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+
+
+def _is_success(record):
+    return not record.get("error") and (record.get("response") or {}).get("status_code") == 200
+
+
+def _ledger_tag(key):
+    # metadata values are limited to 512 characters; long keys are stored (and compared) by their tail
+    return key[-512:]
+
+
+def _counts(batch):
+    counts = getattr(batch, "request_counts", None)
+    if counts is None:
+        return None
+    return {key: getattr(counts, key, 0) for key in ("total", "completed", "failed")}
+
+
+class BatchOrchestrator:
+    """
+    Drives batch jobs through the OpenAI client `client` (or mock_server.FakeBatchAPI), with their
+    state in the JSON ledger at `ledger_path`. Every call (`add`, `step`, `run`) can be interrupted
+    and repeated: the ledger is rewritten atomically after each state change and batches are tagged
+    with their ledger key, so a batch created just before a crash is found again instead of resubmitted.
+    """
+    def __init__(self, client, ledger_path=LEDGER_PATH, max_attempts=MAX_ATTEMPTS, max_workers=MAX_WORKERS,
+                 endpoint=ENDPOINT, completion_window=COMPLETION_WINDOW):
+        self.client = client
+        self.ledger_path = ledger_path
+        self.retry_dir = os.path.join(os.path.dirname(os.path.abspath(ledger_path)), "batch_retries")
+        self.max_attempts = max_attempts
+        self.max_workers = max_workers
+        self.endpoint = endpoint
+        self.completion_window = completion_window
+        self.lock = threading.Lock()
+        self.jobs = {}
+        if os.path.exists(ledger_path):
+            with open(ledger_path, "r", encoding="utf-8") as f:
+                self.jobs = json.load(f)["jobs"]
+
+    def save(self):
+        with self.lock:
+            data = json.dumps({"jobs": self.jobs}, ensure_ascii=False, indent=1)
+            with open(self.ledger_path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(self.ledger_path + ".tmp", self.ledger_path)
+
+    def _update(self, key, **fields):
+        with self.lock:
+            self.jobs[key].update(fields, updated=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        self.save()
+
+    # 1. registration
+    def add(self, input_path, output_path):
+        """
+        Registers one batch input file (an empty one, e.g. with every request cached, is skipped).
+        A finished job whose input changed since is started over; a failed job with the same input
+        gets a new round of attempts for its unanswered requests. Returns the ledger key.
+        """
+        if os.path.getsize(input_path) == 0:
+            return None
+        key = os.path.normpath(input_path)
+        digest = file_digest(input_path)
+        job = self.jobs.get(key)
+        if job is not None and job["digest"] == digest and job["status"] == "failed":
+            return self._retry_failed(key)
+        if job is not None and (job["digest"] == digest or job["status"] not in ("done", "failed")):
+            if job["digest"] != digest:
+                print(f"⚠️ {key} changed while its batch is running; the running batch is kept")
+            return key
+        with self.lock:
+            self.jobs[key] = {"input": key, "output": os.path.normpath(output_path), "digest": digest,
+                              "status": "new", "attempt": 1, "current_input": key,
+                              "input_file_id": None, "submitting": False, "submitted_at": None,
+                              "batch_id": None, "remote_status": None,
+                              "request_counts": None, "failed_ids": [], "batches": [], "error": None}
+        self.save()
+        return key
+
+    def _retry_failed(self, key):
+        # restarts a failed job (attempt 1) on the requests its output file has no answer for
+        job = self.jobs[key]
+        answered = set()
+        if os.path.exists(job["output"]):
+            answered = {r["custom_id"] for r in iter_jsonl([job["output"]])}
+        requests = [r for r in iter_jsonl([job["input"]]) if r["custom_id"] not in answered]
+        if not requests:
+            self._update(key, status="done", failed_ids=[], error=None)
+            return key
+        current_input = job["input"]
+        if answered:
+            stem = os.path.splitext(os.path.basename(job["input"]))[0]
+            current_input = os.path.join(self.retry_dir, f"{stem}_retry0.jsonl")
+            _write_jsonl(current_input, requests)
+        print(f"↻ {key}: retrying the {len(requests)} unanswered requests of the failed job")
+        self._update(key, status="new", attempt=1, current_input=current_input, input_file_id=None,
+                     submitting=False, batch_id=None, remote_status=None, error=None,
+                     failed_ids=[r["custom_id"] for r in requests])
+        return key
+
+    def add_directory(self, input_dir, output_dir):
+        return [self.add(input_path, output_path) for input_path, output_path in io_pairs(input_dir, output_dir)]
+
+    # 2. one job, one step
+    def _find_batch(self, key, submission, since):
+        # a batch created by this submission of the job whose id did not make it into the ledger.
+        # batches.list pages through the batches newest first; the search stops at the batches
+        # created before the submission started.
+        tag = _ledger_tag(key)
+        for batch in self.client.batches.list(limit=100):
+            created_at = getattr(batch, "created_at", None)
+            if since is not None and created_at is not None and created_at < since - CLOCK_SKEW:
+                break
+            metadata = getattr(batch, "metadata", None) or {}
+            if metadata.get("ledger_key") == tag and metadata.get("submission") == str(submission):
+                return batch
+        return None
+
+    def _submit(self, key):
+        job = self.jobs[key]
+        if job["status"] == "new":
+            with open(job["current_input"], "rb") as file:
+                uploaded = self.client.files.create(file=file, purpose="batch")
+            self._update(key, status="uploaded", input_file_id=uploaded.id)
+        # "submitting" is set before batches.create: if it is still set, the process stopped around that call.
+        # `submission` numbers the batches of the job over all its rounds of attempts.
+        submission = len(job["batches"]) + 1
+        batch = self._find_batch(key, submission, job.get("submitted_at")) if job["submitting"] else None
+        if batch is None:
+            self._update(key, submitting=True, submitted_at=int(time.time()))
+            batch = self.client.batches.create(input_file_id=job["input_file_id"], endpoint=self.endpoint,
+                                               completion_window=self.completion_window,
+                                               metadata={"ledger_key": _ledger_tag(key), "attempt": str(job["attempt"]),
+                                                         "submission": str(submission)})
+        self._update(key, status="submitted", submitting=False, batch_id=batch.id, remote_status=batch.status,
+                     batches=job["batches"] + [batch.id])
+
+    def _download(self, file_id):
+        return _parse_jsonl(self.client.files.content(file_id).content) if file_id else []
+
+    def _collect(self, key, batch):
+        job = self.jobs[key]
+        # 2.1 merge the new answers into the output file (one record per custom_id)
+        records = self._download(batch.output_file_id)
+        errors = self._download(batch.error_file_id) + [r for r in records if not _is_success(r)]
+        answered = {}
+        if os.path.exists(job["output"]) and job["current_input"] != job["input"]:
+            answered = {r["custom_id"]: r for r in iter_jsonl([job["output"]])}
+        for record in records:
+            if _is_success(record):
+                answered[record["custom_id"]] = record
+        _write_jsonl(job["output"], answered.values())
+
+        # 2.2 requests of this attempt without an answer: error records and, for expired/cancelled batches, unsent ones
+        requests = [r for r in iter_jsonl([job["current_input"]]) if r["custom_id"] not in answered]
+        error_path = os.path.join(os.path.dirname(job["output"]), "errors", os.path.basename(job["output"]))
+        if errors:
+            _write_jsonl(error_path, errors)
+        elif os.path.exists(error_path):
+            os.remove(error_path)
+        failed_ids = [r["custom_id"] for r in requests]
+        if not requests:
+            self._update(key, status="done", failed_ids=[])
+        elif job["attempt"] >= self.max_attempts:
+            self._update(key, status="failed", failed_ids=failed_ids,
+                         error=f"{len(requests)} requests without an answer after {job['attempt']} attempts")
+        else:
+            # 2.3 resubmit only the failed custom_ids
+            stem = os.path.splitext(os.path.basename(job["input"]))[0]
+            retry_path = os.path.join(self.retry_dir, f"{stem}_retry{job['attempt']}.jsonl")
+            _write_jsonl(retry_path, requests)
+            self._update(key, status="new", attempt=job["attempt"] + 1, current_input=retry_path,
+                         input_file_id=None, batch_id=None, failed_ids=failed_ids)
+
+    def _poll(self, key):
+        job = self.jobs[key]
+        batch = self.client.batches.retrieve(job["batch_id"])
+        if batch.status != job["remote_status"]:
+            self._update(key, remote_status=batch.status, request_counts=_counts(batch))
+        if batch.status == "failed":
+            # the input itself was rejected; resubmitting it would fail the same way
+            errors = getattr(getattr(batch, "errors", None), "data", None) or []
+            self._update(key, status="failed", error="; ".join(getattr(e, "message", str(e)) for e in errors) or "batch failed")
+        elif batch.status in TERMINAL:
+            self._collect(key, batch)
+
+    def _advance(self, key):
+        try:
+            if self.jobs[key]["status"] in ("new", "uploaded"):
+                self._submit(key)
+            elif self.jobs[key]["status"] == "submitted":
+                self._poll(key)
+        except Exception as e:
+            # network/API trouble: leave the job where it is and try again on the next step
+            print(f"⚠️ {key}: {type(e).__name__}: {e}")
+
+    # 3. all jobs
+    def active(self):
+        return [key for key, job in self.jobs.items() if job["status"] not in ("done", "failed")]
+
+    def step(self):
+        """Advances every unfinished job once (uploads, submissions and polls run concurrently)."""
+        keys = self.active()
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            list(pool.map(self._advance, keys))
+        return self.active()
+
+    def run(self, poll_interval=POLL_INTERVAL, timeout=None):
+        """Steps until every job is done or failed (or `timeout` seconds passed). Returns the jobs."""
+        start = time.monotonic()
+        while self.step():
+            if timeout is not None and time.monotonic() - start > timeout:
+                break
+            time.sleep(poll_interval)
+        return self.jobs
+
+    def summary(self):
+        lines = []
+        for key, job in sorted(self.jobs.items()):
+            counts = job["request_counts"] or {}
+            lines.append(f"{job['status']:<10} {job['remote_status'] or '-':<11} attempt {job['attempt']} "
+                         f"{counts.get('completed', 0)}/{counts.get('total', 0)} ok, {len(job['failed_ids'])} failed  {key}")
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Submit, poll, download and resume OpenAI batch jobs.")
+    parser.add_argument("command", choices=["step", "run", "status"],
+                        help="step: submit new jobs and poll/download the others once, without waiting; "
+                             "run: step until every job is finished; status: print the ledger")
+    parser.add_argument("pairs", nargs="*", help="INPUT_DIR:OUTPUT_DIR pairs, e.g. CQ_Batchinput:CQ_Batchoutput")
+    parser.add_argument("--ledger", default=LEDGER_PATH)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    parser.add_argument("--fake", action="store_true", help="use the in-process fake Batch API (mock_server.FakeBatchAPI)")
+    args = parser.parse_args()
+
+    if args.fake:
+        from mock_server import FakeBatchAPI
+        client = FakeBatchAPI(fail_rate=0.05)
+    else:
+        from openai import OpenAI
+        client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY", ""))
+
+    orchestrator = BatchOrchestrator(client, args.ledger, args.max_attempts)
+    for pair in args.pairs:
+        input_dir, output_dir = pair.split(":", 1)
+        orchestrator.add_directory(input_dir, output_dir)
+    if args.command == "step":
+        orchestrator.step()
+    elif args.command == "run":
+        orchestrator.run(args.poll_interval)
+    print(orchestrator.summary())
+    if any(job["status"] == "failed" for job in orchestrator.jobs.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import json
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from batch_writer import iter_jsonl
+from request_index import parse_custom_id
+from response_cache import is_success
+
+# ——————————————
+# Streaming ingestion of batch outputs, shared by the postprocessors.
+# `iter_results` reads output shards lazily and turns every line into a BatchResult;
+# errored records, non-200 responses and answers without content are marked failed.
+# A parser turns one successful result into the records a postprocessor writes
+# (CQ lists, descriptions, ...). `process_file` streams one logical output through
+# a parser into its JSONL file, and `process_outputs` does that for many outputs
+# on worker processes. Parsers must be module-level functions (or functools.partial
+# of them) so that they can be sent to the workers.
+# With a RequestIndex, `ontology` and `key` come from the index; otherwise (and for
+# custom_ids it does not know) from splitting the custom_id at its first "_".
+# A custom_id answered in several shards (a rerun, a cache hit next to an older download) is
+# read once, with its newest answer.
+BatchResult = namedtuple("BatchResult", ["custom_id", "ontology", "key", "content", "error"])
+
+
+class Unparsed:
+    """Yielded by a parser for a part of an answer it could not parse (e.g. one axiom of a packed request)."""
+    def __init__(self, key, reason):
+        self.key = key
+        self.reason = reason
+
+
+def parse_record(record, index=None):
+    """One batch output line -> BatchResult, keyed through `index` (a RequestIndex) if given."""
+    custom_id = record.get("custom_id", "")
+    request = index.resolve(custom_id) if index is not None else parse_custom_id(custom_id)
+    ontology, key = request.ontology, request.key
+    if record.get("error"):
+        return BatchResult(custom_id, ontology, key, None, record["error"].get("message") or str(record["error"]))
+    response = record.get("response") or {}
+    if response.get("status_code") != 200:
+        message = ((response.get("body") or {}).get("error") or {}).get("message", "")
+        return BatchResult(custom_id, ontology, key, None, f"status {response.get('status_code')}: {message}".strip())
+    try:
+        content = response["body"]["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        content = None
+    if content is None:
+        return BatchResult(custom_id, ontology, key, None, "no message content in the response")
+    return BatchResult(custom_id, ontology, key, content, None)
+
+
+def iter_latest(paths):
+    """
+    The records of the output shards `paths`, one per custom_id: its newest successful answer, or its
+    newest record when none succeeded. Newer means a later line of a more recently modified shard
+    (e.g. the "_000" cache shard of this run over an output downloaded before it). Two passes over
+    the shards; only (shard, line) per custom_id is kept in memory. Records keep the order of `paths`.
+    """
+    rank = {path: n for n, path in enumerate(sorted(paths, key=lambda path: (os.path.getmtime(path), path)))}
+    latest = {}
+    for path in paths:
+        for line, record in enumerate(iter_jsonl([path])):
+            key = (is_success(record), rank[path], line)
+            custom_id = record.get("custom_id", "")
+            if custom_id not in latest or key > latest[custom_id]:
+                latest[custom_id] = key
+    for path in paths:
+        for line, record in enumerate(iter_jsonl([path])):
+            if latest[record.get("custom_id", "")][1:] == (rank[path], line):
+                yield record
+
+
+def iter_results(paths, index=None):
+    # lazily, record by record, across all shards; one result per custom_id (see iter_latest)
+    for record in iter_latest(paths):
+        yield parse_record(record, index)
+
+
+def iter_parsed(paths, parser, failed=None, index=None):
+    """
+    Records produced by `parser` for every successful result of the output shards `paths`.
+    Failed results and Unparsed parts are appended to `failed` as (key, reason) instead.
+    """
+    for result in iter_results(paths, index):
+        if result.error is not None:
+            if failed is not None:
+                failed.append((result.key, result.error))
+            continue
+        for item in parser(result):
+            if isinstance(item, Unparsed):
+                if failed is not None:
+                    failed.append((item.key, item.reason))
+            else:
+                yield item
+
+
+def process_file(paths, parser, output_path, index=None):
+    """Streams the output shards `paths` through `parser` into `output_path`. Returns the file's stats."""
+    failed = []
+    written = 0
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        for item in iter_parsed(paths, parser, failed, index):
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            written += 1
+    return {"output": output_path, "shards": len(paths), "written": written, "failed": failed}
+
+
+def process_outputs(groups, parser, output_dir, jobs=None, index=None):
+    """
+    `process_file` for every logical output of `groups` ({file name: shard paths}, see
+    batch_writer.group_shards), written to `output_dir`/<file name>. Files are processed on
+    `jobs` worker processes (default: one per file, at most one per core; 1 = in this process).
+    `index` (a RequestIndex) is reopened in every worker. Returns {file name: stats} in the order of `groups`.
+    """
+    names = list(groups)
+    outputs = [os.path.join(output_dir, name) for name in names]
+    jobs = jobs or min(len(names), os.cpu_count() or 1)
+    if jobs <= 1 or len(names) <= 1:
+        return {name: process_file(groups[name], parser, out, index) for name, out in zip(names, outputs)}
+    with ProcessPoolExecutor(jobs) as pool:
+        stats = pool.map(process_file, [groups[name] for name in names], [parser] * len(names), outputs, [index] * len(names))
+        return dict(zip(names, stats))
+
+
+# 1. parsers
+
+def split_packed(content, axioms):
+    """
+    Maps the answer to a packed CQ request back to its axioms: {axiom: [CQ, ...]} for every axiom
+    whose number is in the returned JSON object. Lists given as one "... // ..." string are split.
+    """
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        answer = json.loads(text)
+    except ValueError:
+        return {}
+    if not isinstance(answer, dict):
+        return {}
+    result = {}
+    for n, axiom in enumerate(axioms, 1):
+        cqs = answer.get(str(n))
+        if isinstance(cqs, str):
+            cqs = cqs.split("//")
+        if isinstance(cqs, list):
+            result[axiom] = [str(cq) for cq in cqs]
+    return result
+
+
+def clean_CQs(CQ_list):
+    temp_list = []
+    for CQ in CQ_list:
+        CQ = CQ.strip()
+        if CQ == "": continue
+        if CQ[:2]=="\n": CQ = CQ[2:]
+        if CQ[0]=="-": CQ = CQ[1:]
+        temp_list.append(CQ.strip())
+    return temp_list
+
+
+def cq_parser(result, packs=None):
+    # {"axiom", "CQ"} per axiom; `packs` maps the custom_id of a packed request to its axioms
+    if packs and result.custom_id in packs:
+        split = split_packed(result.content, packs[result.custom_id])
+        for axiom in packs[result.custom_id]:
+            if axiom in split:
+                yield {"axiom": axiom, "CQ": clean_CQs(split[axiom])}
+            else:
+                yield Unparsed(axiom, "no CQs for this axiom in the packed answer")
+        return
+    if "http://" in result.content: CQ_list = result.content.split("// ")
+    else: CQ_list = result.content.split("//")
+    yield {"axiom": result.key, "CQ": clean_CQs(CQ_list)}
+
+
+def description_parser(result):
+    # {"class", "description"}; the key is the class or property name
+    yield {"class": result.key, "description": result.content}
+
+
+def numbered_parser(result):
+    # "q1 | q2 | ..." answers of the evaluation prompts -> {"custom_id", "generated_outputs": {"0": q1, ...}}
+    parts = [part.strip() for part in result.content.split("|") if "?" in part and part.strip()]
+    yield {"custom_id": result.custom_id, "generated_outputs": {str(i): part for i, part in enumerate(parts)}}
@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import hashlib
+
+# ——————————————
+# Shared writer/reader for OpenAI Batch API files.
+# A batch input file may hold at most MAX_REQUESTS requests and MAX_BYTES bytes, so the
+# writer streams requests into numbered shards ("swo_batchinput_001.jsonl", ...) and
+# records a manifest (custom_id → shard). When everything fits into one shard the file
+# keeps its plain name ("swo_batchinput.jsonl"), as before.
+# On the way back, `shard_paths` / `group_shards` find all shards of a logical file so that
+# postprocessors read them as one output.
+# When a batch input changes, `retire_outputs` moves the outputs downloaded for the previous
+# input out of the way (to "stale/"), so that they are not read as shards of the new output.
+MAX_REQUESTS = 50000
+MAX_BYTES = 200 * 1024 * 1024
+SHARD_SUFFIX = re.compile(r"_(\d{3})$")
+STALE_DIR = "stale"
+
+
+def shard_path(path, index):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_{index:03d}{ext}"
+
+
+def manifest_path(path):
+    stem, _ = os.path.splitext(path)
+    return f"{stem}_manifest.json"
+
+
+def logical_name(file_name):
+    # "swo_output_002.jsonl" -> "swo_output.jsonl"
+    stem, ext = os.path.splitext(file_name)
+    return SHARD_SUFFIX.sub("", stem) + ext
+
+
+def output_name(input_name):
+    # "swo_batchinput_001.jsonl" -> "swo_output_001.jsonl", "Batchinput.jsonl" -> "Batchoutput.jsonl"
+    if "batchinput" in input_name:
+        return input_name.replace("batchinput", "output")
+    return input_name.replace("Batchinput", "Batchoutput")
+
+
+def io_pairs(input_dir, output_dir, ext=".jsonl"):
+    """(input shard, output shard) for every non-empty batch input file of `input_dir`."""
+    return [(path, os.path.join(output_dir, output_name(os.path.basename(path))))
+            for paths in group_shards(input_dir, ext).values() for path in paths
+            if os.path.getsize(path) > 0]
+
+
+def shard_paths(path):
+    """All files of the logical file `path`: the plain file and/or its numbered shards, in order."""
+    directory, base = os.path.split(path)
+    directory = directory or "."
+    return [os.path.join(directory, fname) for fname in sorted(os.listdir(directory))
+            if logical_name(fname) == base and not fname.endswith("_manifest.json")]
+
+
+def group_shards(directory, ext=".jsonl"):
+    """{logical file name: [shard paths]} for every `ext` file in `directory`."""
+    groups = {}
+    for fname in sorted(os.listdir(directory)):
+        if fname.endswith(ext):
+            groups.setdefault(logical_name(fname), []).append(os.path.join(directory, fname))
+    return groups
+
+
+def inputs_digest(path):
+    """Hash of the content of all shards of the logical batch input `path`, or None when it holds no requests."""
+    digest, size = hashlib.sha256(), 0
+    for shard in (shard_paths(path) if os.path.isdir(os.path.dirname(path) or ".") else []):
+        with open(shard, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+                size += len(block)
+    return digest.hexdigest() if size else None
+
+
+def retire_outputs(path, keep=()):
+    """
+    Moves the shards of the logical output `path`, and its error file (<dir>/errors/<name>), to a
+    "stale/" subdirectory, except the paths in `keep`. group_shards does not read subdirectories,
+    so the answers to an earlier batch input are no longer read with the current ones. Returns the moved paths.
+    """
+    directory, base = os.path.split(path)
+    moved = []
+    for folder in (directory or ".", os.path.join(directory or ".", "errors")):
+        if not os.path.isdir(folder):
+            continue
+        for shard in shard_paths(os.path.join(folder, base)):
+            if shard in keep:
+                continue
+            os.makedirs(os.path.join(folder, STALE_DIR), exist_ok=True)
+            os.replace(shard, os.path.join(folder, STALE_DIR, os.path.basename(shard)))
+            moved.append(shard)
+    return moved
+
+
+def iter_jsonl(paths):
+    # one record per non-empty line, across all shards
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def load_manifest(path):
+    with open(manifest_path(path), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ShardedBatchWriter:
+    """
+    Streams batch requests into `path` shards of at most `max_requests` lines / `max_bytes` bytes.
+
+    `write` takes a request dict, or an already encoded JSON line together with its custom_id.
+    `close` (or leaving the `with` block) writes the manifest next to the shards:
+    {"path", "max_requests", "max_bytes", "shards": [{"file", "requests", "bytes"}], "custom_ids": {custom_id: shard index}}
+    and returns the shard paths. Shards and manifest of an earlier run of the same `path` are removed first.
+    """
+    def __init__(self, path, max_requests=MAX_REQUESTS, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.shards = []
+        self.custom_ids = {}
+        self._file = None
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        for old in shard_paths(path) + [manifest_path(path)]:
+            if os.path.exists(old):
+                os.remove(old)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _next_shard(self):
+        if self._file is not None:
+            self._file.close()
+        shard = {"file": shard_path(self.path, len(self.shards) + 1), "requests": 0, "bytes": 0}
+        self.shards.append(shard)
+        self._file = open(shard["file"], "wb")
+
+    def write(self, request, custom_id=None):
+        if isinstance(request, str):
+            line = request
+        else:
+            line = json.dumps(request, ensure_ascii=False)
+            custom_id = request["custom_id"]
+        data = (line + "\n").encode("utf-8")
+        if len(data) > self.max_bytes:
+            raise ValueError(f"request {custom_id} is {len(data)} bytes, more than the {self.max_bytes} byte shard limit")
+
+        shard = self.shards[-1] if self.shards else None
+        if shard is None or shard["requests"] >= self.max_requests or shard["bytes"] + len(data) > self.max_bytes:
+            self._next_shard()
+            shard = self.shards[-1]
+        self._file.write(data)
+        shard["requests"] += 1
+        shard["bytes"] += len(data)
+        self.custom_ids[custom_id] = len(self.shards) - 1
+
+    def close(self):
+        if self._file is None and not self.shards:
+            # nothing written: an empty file, as the monolithic writers produced
+            open(self.path, "w").close()
+            self.shards.append({"file": self.path, "requests": 0, "bytes": 0})
+        elif self._file is not None:
+            self._file.close()
+            self._file = None
+            if len(self.shards) == 1:
+                os.replace(self.shards[0]["file"], self.path)
+                self.shards[0]["file"] = self.path
+
+        manifest = {
+            "path": self.path,
+            "max_requests": self.max_requests,
+            "max_bytes": self.max_bytes,
+            "shards": [{**shard, "file": os.path.basename(shard["file"])} for shard in self.shards],
+            "custom_ids": self.custom_ids,
+        }
+        with open(manifest_path(self.path), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        return [shard["file"] for shard in self.shards]
+
+    @property
+    def paths(self):
+        return [shard["file"] for shard in self.shards]
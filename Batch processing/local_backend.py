@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import uuid
+import argparse
+from batch_writer import io_pairs, iter_jsonl
+from response_cache import request_key
+from realtime_client import RunMarker
+
+# ——————————————
+# Local Hugging Face backend: runs the requests of batch input files (the same JSONL the
+# Batch API gets) through a causal LM on this machine and writes the answers in the batch
+# output schema, so the postprocessors read them like a downloaded batch output.
+# Requests are sorted by prompt length and grouped into batches whose padded size
+# (prompt + new tokens) stays under `max_batch_tokens`, so short prompts are not padded
+# to the longest one in the file. Without a GPU the model runs on the CPU in float32,
+# which is practical for small models (e.g. Qwen/Qwen2.5-0.5B-Instruct).
+# torch / transformers (and peft for LoRA adapters) are imported only when the backend is created.
+MAX_BATCH_TOKENS = 16384
+MAX_BATCH_SIZE = 32
+# sampling as in Fine-tuning/inference.py
+GENERATION_KWARGS = {"do_sample": True, "temperature": 0.6, "top_p": 0.9, "repetition_penalty": 1.1}
+
+
+def plan_batches(lengths, new_tokens, max_batch_tokens=MAX_BATCH_TOKENS, max_batch_size=MAX_BATCH_SIZE):
+    """
+    Groups request indices into generation batches. `lengths[i]` is the prompt length of request i
+    and `new_tokens[i]` its completion budget. Requests are taken shortest prompt first; a batch is
+    closed when one more request would make (batch size × (longest prompt + largest budget)) exceed
+    `max_batch_tokens` or the batch would exceed `max_batch_size`. A request that alone exceeds the
+    budget gets a batch of its own.
+    """
+    batches, batch, longest, budget = [], [], 0, 0
+    for i in sorted(range(len(lengths)), key=lambda i: (lengths[i], new_tokens[i])):
+        l, b = max(longest, lengths[i]), max(budget, new_tokens[i])
+        if batch and ((len(batch) + 1) * (l + b) > max_batch_tokens or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch, l, b = [], lengths[i], new_tokens[i]
+        batch.append(i)
+        longest, budget = l, b
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def render_prompt(tokenizer, messages):
+    # chat template of the model if it has one, otherwise "role: content" lines
+    if getattr(tokenizer, "chat_template", None):
+        return tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+    return "\n".join(f"{m['role']}: {m['content']}" for m in messages) + "\nassistant:"
+
+
+def error_record(request, message):
+    # batch output line of a request that was not run (as the API reports a 400 error)
+    return {"id": f"local_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"],
+            "response": {"status_code": 400, "request_id": "",
+                         "body": {"error": {"code": "context_length_exceeded", "message": message}}},
+            "error": None}
+
+
+def output_record(request, model_name, content, prompt_tokens, completion_tokens, finish_reason):
+    return {
+        "id": f"local_req_{uuid.uuid4().hex}",
+        "custom_id": request["custom_id"],
+        "response": {
+            "status_code": 200,
+            "request_id": "",
+            "body": {
+                "id": f"chatcmpl-local-{uuid.uuid4().hex[:12]}", "object": "chat.completion",
+                "created": int(time.time()), "model": model_name,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            },
+        },
+        "error": None,
+    }
+
+
+class HFBackend:
+    """
+    Causal LM `model_name` (Hub id or local path), optionally with the LoRA adapter `lora`.
+    `device`: "cuda", "mps" or "cpu" (default: the first available). `threads` sets the CPU threads.
+    """
+    def __init__(self, model_name, lora=None, device=None, threads=None, max_batch_tokens=MAX_BATCH_TOKENS,
+                 max_batch_size=MAX_BATCH_SIZE, max_prompt_tokens=None, generation_kwargs=None):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+
+        self.torch = torch
+        if device is None:
+            device = "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
+        if threads:
+            torch.set_num_threads(threads)
+        self.device = device
+        self.model_name = model_name
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.generation_kwargs = GENERATION_KWARGS if generation_kwargs is None else generation_kwargs
+        self.rejected = []
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        # decoder-only models continue from the right end of the prompt
+        self.tokenizer.padding_side = "left"
+        self.max_prompt_tokens = max_prompt_tokens or getattr(self.tokenizer, "model_max_length", None)
+
+        # half precision only on accelerators; CPU kernels are float32
+        dtype = torch.float16 if device == "cuda" else torch.float32
+        model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=dtype).to(device)
+        if lora:
+            from peft import PeftModel
+            model = PeftModel.from_pretrained(model, lora)
+        self.model = model.eval()
+
+    def generate(self, requests):
+        """
+        Answers a list of batch-input requests; yields batch output records (shortest prompts first).
+        Prompts longer than `max_prompt_tokens` are not truncated (that would cut the instruction
+        at one end or the other) but rejected with a 400 context_length_exceeded record.
+        """
+        prompts = [render_prompt(self.tokenizer, request["body"]["messages"]) for request in requests]
+        encoded = self.tokenizer(prompts, add_special_tokens=False)["input_ids"]
+        budgets = [request["body"].get("max_tokens") or 512 for request in requests]
+        runnable = []
+        for i, ids in enumerate(encoded):
+            if self.max_prompt_tokens and len(ids) > self.max_prompt_tokens:
+                yield error_record(requests[i], f"prompt of {len(ids)} tokens, more than the {self.max_prompt_tokens} token limit")
+            else:
+                runnable.append(i)
+
+        for planned in plan_batches([len(encoded[i]) for i in runnable], [budgets[i] for i in runnable],
+                                    self.max_batch_tokens, self.max_batch_size):
+            batch = [runnable[j] for j in planned]
+            inputs = self.tokenizer.pad({"input_ids": [encoded[i] for i in batch]}, return_tensors="pt").to(self.device)
+            with self.torch.no_grad():
+                output_ids = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max(budgets[i] for i in batch),
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    eos_token_id=self.tokenizer.eos_token_id,
+                    **self.generation_kwargs,
+                )
+            # prompts are left-padded, so every answer starts at the same column
+            new_ids = output_ids[:, inputs["input_ids"].shape[1]:].tolist()
+            for row, i in zip(new_ids, batch):
+                # each request keeps its own max_tokens, and ends at its first EOS
+                row = row[:budgets[i]]
+                finish_reason = "length"
+                if self.tokenizer.eos_token_id in row:
+                    row = row[:row.index(self.tokenizer.eos_token_id)]
+                    finish_reason = "stop"
+                content = self.tokenizer.decode(row, skip_special_tokens=True).strip()
+                yield output_record(requests[i], self.model_name, content, len(encoded[i]), len(row), finish_reason)
+
+    def run_file(self, input_path, output_path, chunk_size=1024):
+        """
+        Answers the requests of `input_path` into `output_path`, `chunk_size` requests at a time
+        (batches are planned per chunk). An interrupted run is resumed from its marker
+        (realtime_client.RunMarker); otherwise `output_path` is rewritten. Rejected requests (prompt
+        too long) go to `<output dir>/errors/<name>`, like the error file of a batch.
+        Returns the number of answers written.
+        """
+        marker = RunMarker(output_path)
+        error_path = os.path.join(os.path.dirname(output_path) or ".", "errors", os.path.basename(output_path))
+        if os.path.exists(error_path):
+            os.remove(error_path)
+        self.rejected = []
+        written = 0
+        try:
+            with open(output_path, marker.mode, encoding="utf-8") as out:
+                chunk = []
+                for request in iter_jsonl([input_path]):
+                    if request_key(request) in marker.done:
+                        continue
+                    chunk.append(request)
+                    if len(chunk) == chunk_size:
+                        written += self._write(out, chunk, marker)
+                        chunk = []
+                if chunk:
+                    written += self._write(out, chunk, marker)
+        except BaseException:
+            marker.close()
+            raise
+        marker.finish()
+        if self.rejected:
+            os.makedirs(os.path.dirname(error_path), exist_ok=True)
+            with open(error_path, "w", encoding="utf-8") as f:
+                for record in self.rejected:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return written
+
+    def _write(self, out, requests, marker):
+        count = 0
+        for record in self.generate(requests):
+            if record["response"]["status_code"] != 200:
+                self.rejected.append(record)
+                continue
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+        out.flush()
+        for request in requests:
+            marker.add(request_key(request))
+        return count
+
+    def run_directory(self, input_dir, output_dir):
+        """Runs every batch input file (and shard) of `input_dir`; outputs keep the shard suffixes."""
+        for input_path, output_path in io_pairs(input_dir, output_dir):
+            start = time.perf_counter()
+            written = self.run_file(input_path, output_path)
+            print(f"✔️ {input_path} → {output_path}: {written} answered, {len(self.rejected)} rejected (prompt too long) "
+                  f"on {self.device} ({time.perf_counter() - start:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer batch input files with a local Hugging Face causal LM.")
+    parser.add_argument("input", help="batch input file or directory (e.g. CQ_Batchinput)")
+    parser.add_argument("output", help="output file or directory (e.g. CQ_Batchoutput)")
+    parser.add_argument("--model", required=True, help="Hub id or local path, e.g. Qwen/Qwen2.5-0.5B-Instruct")
+    parser.add_argument("--lora", default=None, help="LoRA adapter directory")
+    parser.add_argument("--device", default=None, choices=["cuda", "mps", "cpu"])
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads")
+    parser.add_argument("--max-batch-tokens", type=int, default=MAX_BATCH_TOKENS)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-prompt-tokens", type=int, default=None,
+                        help="longer prompts are rejected (default: the tokenizer's model_max_length)")
+    parser.add_argument("--greedy", action="store_true", help="greedy decoding instead of sampling")
+    args = parser.parse_args()
+
+    backend = HFBackend(args.model, args.lora, args.device, args.threads, args.max_batch_tokens, args.max_batch_size,
+                        args.max_prompt_tokens, generation_kwargs={"do_sample": False} if args.greedy else None)
+    if os.path.isdir(args.input):
+        backend.run_directory(args.input, args.output)
+    else:
+        written = backend.run_file(args.input, args.output)
+        print(f"✔️ {args.input} → {args.output}: {written} answered, {len(backend.rejected)} rejected (prompt too long)")
+
+
+if __name__ == "__main__":
+    main()
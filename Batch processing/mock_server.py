@@ -0,0 +1,270 @@
+import re
+import json
+import time
+import random
+import argparse
+import itertools
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ——————————————
+# Offline stand-ins for the OpenAI API.
+# - MockServer: local chat-completions endpoint for realtime_client.py. Every answer is
+#   "Mock answer N // ..." plus a usage block; a seeded share of the requests fails with
+#   429 (with Retry-After) or 500 so that retries are exercised. The server records the
+#   arrival time of every request and the peak number in flight.
+# - FakeBatchAPI: in-process replacement of the OpenAI client's files/batches resources
+#   for batch_orchestrator.py, with jobs that advance on every retrieve.
+
+
+def mock_completion(body, n):
+    prompt = " ".join(message.get("content") or "" for message in body.get("messages", []))
+    prompt_tokens = len(prompt) // 4
+    content = f"Mock answer {n} to a {prompt_tokens}-token prompt? // Second mock question? // Third mock question?"
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        # packed CQ requests: 3 CQs for each numbered axiom line ("1. A subClassOf B")
+        numbers = re.findall(r"^\s*(\d+)\. ", prompt, re.M)
+        content = json.dumps({k: [f"Mock question {j} on axiom {k}?" for j in range(1, 4)] for k in numbers})
+    return {
+        "id": f"chatcmpl-mock{n}", "object": "chat.completion", "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20},
+    }
+
+
+class MockServer:
+    """
+    Chat-completions mock on 127.0.0.1 (`port=0`: any free port), run in a background thread:
+
+        with MockServer(fail_rate=0.1) as server:
+            RealtimeClient(base_url=server.url, ...)
+    """
+    def __init__(self, port=0, latency=0.0, fail_rate=0.0, seed=0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.arrivals = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.failures = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, payload, headers=()):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("x-request-id", f"req_mock_{time.monotonic_ns()}")
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path != "/v1/chat/completions":
+                    return self._reply(404, {"error": {"message": f"unknown path {self.path}"}})
+                with server.lock:
+                    server.arrivals.append(time.monotonic())
+                    n = len(server.arrivals)
+                    server.in_flight += 1
+                    server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+                    roll = server.rng.random()
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    if roll < server.fail_rate:
+                        with server.lock:
+                            server.failures += 1
+                        if roll < server.fail_rate / 2:
+                            return self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                               [("Retry-After", "0.05")])
+                        return self._reply(500, {"error": {"message": "The server had an error"}})
+                    return self._reply(200, mock_completion(body, n))
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+        return Handler
+
+
+class _FakeFiles:
+    def __init__(self, api):
+        self.api = api
+
+    def create(self, file, purpose):
+        return self.api._store(file.read(), purpose)
+
+    def content(self, file_id):
+        with self.api.lock:
+            self.api.calls["files.content"] += 1
+            data = self.api.files_data[file_id]
+        return SimpleNamespace(content=data, text=data.decode("utf-8"))
+
+
+class _FakeBatches:
+    def __init__(self, api):
+        self.api = api
+
+    def create(self, input_file_id, endpoint, completion_window, metadata=None):
+        return self.api._create_batch(input_file_id, endpoint, completion_window, metadata)
+
+    def retrieve(self, batch_id):
+        return self.api._advance(batch_id)
+
+    def list(self, limit=20, after=None):
+        # newest first, one page of `limit` batches after the batch id `after`; iterating the page
+        # fetches the following pages, like the SDK's cursor pages
+        with self.api.lock:
+            ids = list(reversed(self.api.batches_data))
+            start = ids.index(after) + 1 if after else 0
+            data = [SimpleNamespace(**vars(self.api.batches_data[i])) for i in ids[start:start + limit]]
+            self.api.calls["batches.list"] += 1
+        return _FakePage(self, data, start + limit < len(ids), limit)
+
+
+class _FakePage:
+    def __init__(self, batches, data, has_more, limit):
+        self.batches = batches
+        self.data = data
+        self.has_more = has_more
+        self.limit = limit
+
+    def __iter__(self):
+        page = self
+        while True:
+            yield from page.data
+            if not page.has_more:
+                return
+            page = self.batches.list(limit=page.limit, after=page.data[-1].id)
+
+
+class FakeBatchAPI:
+    """
+    Offline Batch API with the client interface batch_orchestrator.py uses
+    (files.create / files.content, batches.create / retrieve / list).
+
+    A job is "validating", then "in_progress" for `steps` retrieves, then "completed"
+    (or "expired" with `expire=True`, answering only the first half of its requests).
+    A request fails with a 500 in the error file with probability `fail_rate`, drawn per
+    (custom_id, submission) from `seed`, so a resubmitted request can succeed.
+    Thread-safe; the API calls are counted in `calls`.
+    """
+    def __init__(self, steps=2, fail_rate=0.0, expire=False, seed=0):
+        self.steps = steps
+        self.fail_rate = fail_rate
+        self.expire = expire
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.files_data = {}
+        self.batches_data = {}
+        self.progress = {}
+        self.submissions = {}
+        self.calls = {"files.create": 0, "files.content": 0, "batches.create": 0, "batches.retrieve": 0,
+                      "batches.list": 0}
+        self._ids = itertools.count(1)
+        self.files = _FakeFiles(self)
+        self.batches = _FakeBatches(self)
+
+    def _store(self, data, purpose):
+        with self.lock:
+            file_id = f"file-{next(self._ids)}"
+            self.files_data[file_id] = data
+            self.calls["files.create"] += 1
+        return SimpleNamespace(id=file_id, purpose=purpose, bytes=len(data))
+
+    def _create_batch(self, input_file_id, endpoint, completion_window, metadata):
+        with self.lock:
+            if input_file_id not in self.files_data:
+                raise ValueError(f"unknown file {input_file_id}")
+            self.calls["batches.create"] += 1
+            batch = SimpleNamespace(id=f"batch_{next(self._ids)}", status="validating", endpoint=endpoint,
+                                    created_at=int(time.time()),
+                                    input_file_id=input_file_id, completion_window=completion_window,
+                                    output_file_id=None, error_file_id=None, metadata=metadata or {},
+                                    request_counts=SimpleNamespace(total=0, completed=0, failed=0))
+            self.batches_data[batch.id] = batch
+            self.progress[batch.id] = 0
+        return SimpleNamespace(**vars(batch))
+
+    def _advance(self, batch_id):
+        with self.lock:
+            self.calls["batches.retrieve"] += 1
+            batch = self.batches_data[batch_id]
+            if batch.status in ("validating", "in_progress"):
+                self.progress[batch_id] += 1
+                if self.progress[batch_id] == 1:
+                    batch.status = "in_progress"
+                elif self.progress[batch_id] > self.steps:
+                    self._finish(batch)
+            return SimpleNamespace(**vars(batch))
+
+    def _finish(self, batch):
+        lines = [json.loads(line) for line in self.files_data[batch.input_file_id].decode("utf-8").splitlines() if line.strip()]
+        answered = lines[:len(lines) // 2] if self.expire else lines
+        output, errors = [], []
+        for n, request in enumerate(answered):
+            submission = self.submissions.get(request["custom_id"], 0)
+            self.submissions[request["custom_id"]] = submission + 1
+            record = {"id": f"batch_req_{batch.id}_{n}", "custom_id": request["custom_id"], "error": None}
+            if random.Random(f"{self.seed}:{request['custom_id']}:{submission}").random() < self.fail_rate:
+                record["response"] = {"status_code": 500, "request_id": f"req_{n}",
+                                      "body": {"error": {"message": "The server had an error"}}}
+                errors.append(record)
+            else:
+                record["response"] = {"status_code": 200, "request_id": f"req_{n}",
+                                      "body": mock_completion(request["body"], n)}
+                output.append(record)
+        for name, records in (("output_file_id", output), ("error_file_id", errors)):
+            if records:
+                data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+                file_id = f"file-{next(self._ids)}"
+                self.files_data[file_id] = data
+                setattr(batch, name, file_id)
+        batch.request_counts = SimpleNamespace(total=len(lines), completed=len(output), failed=len(errors))
+        batch.status = "expired" if self.expire else "completed"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock chat-completions endpoint.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--fail-rate", type=float, default=0.05, help="share of requests answered with 429/500")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with MockServer(args.port, args.latency, args.fail_rate, args.seed) as server:
+        print(f"✔️ Mock server on {server.url} (Ctrl+C to stop)")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from batch_writer import io_pairs, iter_jsonl
+from response_cache import request_key
+
+# ——————————————
+# Real-time alternative to the 24h Batch API: the requests of a batch input file
+# (same JSONL, same custom_ids) are sent concurrently to the chat-completions endpoint,
+# within requests-per-minute / tokens-per-minute limits, and the answers are written in the
+# batch output schema ({"id", "custom_id", "response": {"status_code", "request_id", "body"}, "error"}),
+# so the postprocessors read them like a downloaded batch output.
+# HTTP goes through urllib in worker threads, so nothing beyond the standard library is needed;
+# `base_url` points the client at a local mock server (see mock_server.py) for testing.
+# A run keeps a "<output>.partial" marker (see RunMarker) and only an interrupted run is resumed;
+# an output file without a marker is rewritten, so a changed template is always sent again.
+BASE_URL = "https://api.openai.com"
+RPM = 500
+TPM = 200000
+MAX_CONCURRENCY = 32
+MAX_RETRIES = 6
+TIMEOUT = 120
+# status codes worth another try; everything else (400, 401, ...) is final
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    `rate` units per minute, at most `capacity` (default: one minute's worth) saved up.
+    `acquire(n)` waits until n units are available and takes them; `refund(n)` gives back
+    units that were reserved but not used (a negative n takes extra units).
+    The event loop is single-threaded, so check-and-take in `acquire` needs no lock and the
+    bucket can be shared by several `asyncio.run` calls.
+    """
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate / 60.0
+        self.capacity = capacity or rate
+        self.clock = clock
+        self.level = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        # a request larger than the bucket can never fit; it waits for a full bucket instead
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.level >= amount:
+                self.level -= amount
+                return
+            await asyncio.sleep((amount - self.level) / self.rate)
+
+    def refund(self, amount):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+def estimate_tokens(body):
+    # rough prompt size (≈ 4 characters per token) plus the completion budget,
+    # which is how the API counts a request against the TPM limit
+    chars = sum(len(message.get("content") or "") for message in body.get("messages", []))
+    return chars // 4 + (body.get("max_tokens") or 0)
+
+
+class RealtimeClient:
+    """Sends batch-input requests one by one, concurrently, within RPM/TPM limits."""
+    def __init__(self, api_key=None, base_url=BASE_URL, rpm=RPM, tpm=TPM, max_concurrency=MAX_CONCURRENCY,
+                 max_retries=MAX_RETRIES, timeout=TIMEOUT, backoff=1.0, max_backoff=60.0):
+        self.api_key = os.environ.get("OPENAI_API_KEY", "") if api_key is None else api_key
+        self.base_url = base_url.rstrip("/")
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {"requests": 0, "retries": 0, "failed": 0, "tokens": 0}
+        self.rpm_bucket, self.tpm_bucket = TokenBucket(rpm), TokenBucket(tpm)
+
+    def _post(self, url, body):
+        # one HTTP call (runs in a worker thread): (status, headers, parsed body)
+        request = urllib.request.Request(
+            self.base_url + url, data=json.dumps(body).encode("utf-8"), method="POST",
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.api_key}"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            payload = e.read()
+            try:
+                payload = json.loads(payload)
+            except ValueError:
+                payload = {"error": {"message": payload.decode("utf-8", "replace")}}
+            return e.code, e.headers, payload
+
+    def _delay(self, attempt, headers=None):
+        retry_after = headers.get("Retry-After") if headers is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def send(self, request):
+        """Returns the batch output record of one batch-input request."""
+        body = request["body"]
+        estimate = estimate_tokens(body)
+        rpm_bucket, tpm_bucket = self.rpm_bucket, self.tpm_bucket
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            await rpm_bucket.acquire(1)
+            await tpm_bucket.acquire(estimate)
+            try:
+                status, headers, payload = await loop.run_in_executor(None, self._post, request["url"], body)
+            except (OSError, ValueError) as e:
+                # connection refused/reset, timeout, a response body that is not JSON: retry, then
+                # report as a request error
+                tpm_bucket.refund(estimate)
+                if attempt == self.max_retries:
+                    self.stats["failed"] += 1
+                    code = "invalid_response" if isinstance(e, ValueError) else "connection_error"
+                    return {"id": None, "custom_id": request["custom_id"], "response": None,
+                            "error": {"code": code, "message": str(e)}}
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._delay(attempt))
+                continue
+
+            usage = payload.get("usage") if isinstance(payload, dict) else None
+            if usage:
+                tpm_bucket.refund(estimate - usage.get("total_tokens", estimate))
+                self.stats["tokens"] += usage.get("total_tokens", 0)
+            if status in RETRY_STATUS and attempt < self.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._delay(attempt, headers))
+                continue
+            self.stats["requests"] += 1
+            if status != 200:
+                self.stats["failed"] += 1
+            return {"id": f"rt_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"],
+                    "response": {"status_code": status, "request_id": headers.get("x-request-id", ""), "body": payload},
+                    "error": None}
+
+    async def run(self, requests, on_result):
+        """
+        Sends every request of the iterable `requests` with at most `max_concurrency` in flight,
+        calling `on_result(record, request)` as each one finishes (completion order, as in a batch output).
+        An exception in a worker (`send` or `on_result`) cancels the other workers and is raised here.
+        """
+        queue = asyncio.Queue(maxsize=2 * self.max_concurrency)
+
+        async def worker():
+            while True:
+                request = await queue.get()
+                if request is None:
+                    return
+                on_result(await self.send(request), request)
+
+        async def put(item):
+            # waits for a free queue slot, unless a worker fails first (nothing would free the slot then)
+            putter = asyncio.ensure_future(queue.put(item))
+            try:
+                while not putter.done():
+                    running = [task for task in workers if not task.done()]
+                    await asyncio.wait([putter, *running], return_when=asyncio.FIRST_COMPLETED)
+                    for task in workers:
+                        if task.done() and not task.cancelled() and task.exception() is not None:
+                            raise task.exception()
+            finally:
+                putter.cancel()
+
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(self.max_concurrency))
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+        try:
+            for request in requests:
+                await put(request)
+            for _ in workers:
+                await put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+class RunMarker:
+    """
+    Progress of a real-time / local run into `output_path`: "<output_path>.partial" lists the request
+    keys (response_cache.request_key: model, messages, max_tokens) answered so far. It is created when
+    a run starts and removed when the run finishes. A marker left by an interrupted run is resumed:
+    the output is appended to and requests with a listed key are skipped. Without a marker the output
+    file is rewritten, whatever it already holds (e.g. a downloaded batch output for the same custom_ids).
+    """
+    def __init__(self, output_path):
+        self.path = output_path + ".partial"
+        self.done = set()
+        self.resumed = os.path.exists(self.path) and os.path.exists(output_path)
+        if self.resumed:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        self._file = open(self.path, "a" if self.resumed else "w", encoding="utf-8")
+
+    @property
+    def mode(self):
+        # how to open the output file
+        return "a" if self.resumed else "w"
+
+    def add(self, key):
+        # call after the answer has been flushed to the output file
+        self._file.write(key + "\n")
+        self._file.flush()
+
+    def finish(self):
+        self._file.close()
+        os.remove(self.path)
+
+    def close(self):
+        # keeps the marker (the run did not finish)
+        self._file.close()
+
+
+def run_file(input_path, output_path, client):
+    """
+    Answers the requests of `input_path` (one shard) into `output_path`. Successful answers go to
+    `output_path`; failed ones to `<output dir>/errors/<name>`, like the error file of a batch.
+    An interrupted run is resumed from its marker (see RunMarker); otherwise `output_path` is rewritten.
+    Returns (answered, failed).
+    """
+    marker = RunMarker(output_path)
+    error_path = os.path.join(os.path.dirname(output_path) or ".", "errors", os.path.basename(output_path))
+    if os.path.exists(error_path):
+        os.remove(error_path)
+    counts = {"answered": 0, "failed": 0}
+    errors = []
+    try:
+        with open(output_path, marker.mode, encoding="utf-8") as out:
+            def on_result(record, request):
+                if not record["error"] and record["response"]["status_code"] == 200:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    marker.add(request_key(request))
+                    counts["answered"] += 1
+                else:
+                    errors.append(record)
+                    counts["failed"] += 1
+
+            def pending():
+                for request in iter_jsonl([input_path]):
+                    if request_key(request) not in marker.done:
+                        yield request
+            asyncio.run(client.run(pending(), on_result))
+    except BaseException:
+        marker.close()
+        raise
+    marker.finish()
+    if errors:
+        os.makedirs(os.path.dirname(error_path), exist_ok=True)
+        with open(error_path, "w", encoding="utf-8") as f:
+            for record in errors:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return counts["answered"], counts["failed"]
+
+
+def run_directory(input_dir, output_dir, client=None, suffix=".jsonl"):
+    """Runs every batch input file (and shard) of `input_dir`; outputs keep the shard suffixes."""
+    client = client or RealtimeClient()
+    os.makedirs(output_dir, exist_ok=True)
+    for input_path, output_path in io_pairs(input_dir, output_dir, suffix):
+        start = time.perf_counter()
+        answered, failed = run_file(input_path, output_path, client)
+        print(f"✔️ {input_path} → {output_path}: {answered} answered, {failed} failed ({time.perf_counter() - start:.1f}s)")
+    return client.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run batch input files against the chat-completions endpoint in real time.")
+    parser.add_argument("input", help="batch input file or directory (e.g. CQ_Batchinput)")
+    parser.add_argument("output", help="output file or directory (e.g. CQ_Batchoutput)")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--api-key", default=None, help="defaults to $OPENAI_API_KEY")
+    parser.add_argument("--rpm", type=int, default=RPM, help="requests per minute")
+    parser.add_argument("--tpm", type=int, default=TPM, help="tokens per minute")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES)
+    args = parser.parse_args()
+
+    client = RealtimeClient(args.api_key, args.base_url, args.rpm, args.tpm, args.concurrency, args.max_retries)
+    if os.path.isdir(args.input):
+        run_directory(args.input, args.output, client)
+    else:
+        answered, failed = run_file(args.input, args.output, client)
+        print(f"✔️ {args.input} → {args.output}: {answered} answered, {failed} failed")
+    print(f"Stats: {client.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import argparse
+from collections import namedtuple
+
+# ——————————————
+# Index of the requests the generators write: custom_id → structured key (ontology, section,
+# entity, axiom relation, and the key the postprocessors write: the axiom for CQs, the entity
+# name for descriptions). Outputs are joined back to their source by an indexed lookup instead
+# of splitting the custom_id at its first "_". A packed request has one row (part) per axiom.
+# One SQLite file is shared by all stages ("cq", "description", "type2", "gpt") and ontologies;
+# a generator clears the rows of an ontology before it writes the ontology's requests again.
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "request_index.sqlite")
+RequestKey = namedtuple("RequestKey", ["custom_id", "part", "ontology", "section", "entity", "relation", "key", "source"])
+_COLUMNS = ", ".join(RequestKey._fields)
+
+
+def parse_custom_id(custom_id):
+    # requests written before the index existed: "<ontology>_<key>"
+    ontology, _, key = custom_id.partition("_")
+    return RequestKey(custom_id, 0, ontology, None, None, None, key or ontology, None)
+
+
+class RequestIndex:
+    """
+    SQLite table (stage, custom_id, part) → RequestKey, with an index on (stage, ontology, entity).
+    Picklable (the connection is reopened), so it can be passed to worker processes.
+    """
+    def __init__(self, stage, path=INDEX_PATH):
+        self.stage = stage
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS requests (stage TEXT, {_COLUMNS}, "
+                          "PRIMARY KEY (stage, custom_id, part))")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS requests_entity ON requests (stage, ontology, entity)")
+
+    def __getstate__(self):
+        self.conn.commit()
+        return {"stage": self.stage, "path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["stage"], state["path"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(DISTINCT custom_id) FROM requests WHERE stage = ?", (self.stage,)).fetchone()[0]
+
+    def add(self, custom_id, ontology, key, entity=None, section=None, relation=None, part=0, source=None):
+        self.conn.execute(f"INSERT OR REPLACE INTO requests (stage, {_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                          (self.stage, custom_id, part, ontology, section, entity, relation, key, source))
+
+    def clear(self, ontology):
+        self.conn.execute("DELETE FROM requests WHERE stage = ? AND ontology = ?", (self.stage, ontology))
+
+    def parts(self, custom_id):
+        # all rows of a request, in part order (one per axiom of a packed request)
+        rows = self.conn.execute(f"SELECT {_COLUMNS} FROM requests WHERE stage = ? AND custom_id = ? ORDER BY part",
+                                 (self.stage, custom_id)).fetchall()
+        return [RequestKey(*row) for row in rows]
+
+    def get(self, custom_id):
+        row = self.conn.execute(f"SELECT {_COLUMNS} FROM requests WHERE stage = ? AND custom_id = ? ORDER BY part LIMIT 1",
+                                (self.stage, custom_id)).fetchone()
+        return RequestKey(*row) if row else None
+
+    def resolve(self, custom_id):
+        # the indexed key, or the "<ontology>_<key>" reading for requests that are not in the index
+        return self.get(custom_id) or parse_custom_id(custom_id)
+
+    def entity(self, ontology, entity):
+        rows = self.conn.execute(f"SELECT {_COLUMNS} FROM requests WHERE stage = ? AND ontology = ? AND entity = ? "
+                                 "ORDER BY custom_id, part", (self.stage, ontology, entity)).fetchall()
+        return [RequestKey(*row) for row in rows]
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up requests in the request index.")
+    parser.add_argument("stage", help="cq, description, type2 or gpt")
+    parser.add_argument("custom_ids", nargs="*", help="custom_ids to look up (none: print the number of requests)")
+    parser.add_argument("--index", default=INDEX_PATH)
+    args = parser.parse_args()
+    with RequestIndex(args.stage, args.index) as index:
+        for custom_id in args.custom_ids:
+            for part in index.parts(custom_id) or [None]:
+                print(f"{custom_id}: {part}")
+        if not args.custom_ids:
+            print(f"{args.stage}: {len(index)} requests")
+
+
+if __name__ == "__main__":
+    main()
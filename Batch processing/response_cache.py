@@ -0,0 +1,138 @@
+import os
+import json
+import sqlite3
+import hashlib
+import argparse
+from batch_writer import group_shards, iter_jsonl, shard_path, inputs_digest, retire_outputs
+
+# ——————————————
+# Content-addressed store of LLM responses. A request is identified by the hash of
+# (model, messages, max_tokens) — not by its custom_id — so an unchanged axiom/prompt is
+# answered from the store on the next run, whatever ontology file or position it came from.
+# The generators skip cached requests when they build the batch input and write their
+# responses, in the batch output schema, to the "_000" shard of the ontology's output
+# (e.g. CQ_Batchoutput/swo_output_000.jsonl); the postprocessors read it together with the
+# downloaded shards. The store is filled from finished Batchinput/Batchoutput pairs.
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "response_cache.sqlite")
+CACHED_SHARD = 0
+
+
+def request_key(request):
+    body = request["body"]
+    payload = json.dumps([body["model"], body["messages"], body.get("max_tokens")],
+                         ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_success(record):
+    response = record.get("response") or {}
+    return not record.get("error") and response.get("status_code") == 200
+
+
+class ResponseCache:
+    """SQLite table key → response (the "response" object of a batch output line)."""
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, request, key=None):
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key or request_key(request),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, request, response):
+        self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?)",
+                          (request_key(request), json.dumps(response, ensure_ascii=False)))
+
+    def output_record(self, request):
+        # batch output line for a cached request, or None on a miss
+        key = request_key(request)
+        response = self.get(request, key)
+        if response is None:
+            return None
+        return {"id": f"cached-{key[:16]}", "custom_id": request["custom_id"],
+                "response": response, "error": None}
+
+    def add_outputs(self, input_dir, output_dir):
+        """
+        Stores the successful responses of `output_dir` under the requests of `input_dir`
+        with the same custom_id (all shards of all files). Returns the number of responses stored.
+        """
+        requests = {}
+        for paths in group_shards(input_dir).values():
+            for request in iter_jsonl(paths):
+                requests[request["custom_id"]] = request
+        added = 0
+        for paths in group_shards(output_dir).values():
+            for record in iter_jsonl(paths):
+                request = requests.get(record["custom_id"])
+                if request is not None and is_success(record):
+                    self.put(request, record["response"])
+                    added += 1
+        self.conn.commit()
+        return added
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class CachedOutputWriter:
+    """
+    Writes the cache hits of one logical batch output (`output_path`, e.g. CQ_Batchoutput/swo_output.jsonl)
+    to its "_000" shard. The shard is only created when there is at least one hit.
+    With `input_path` (the batch input the output answers; create the writer before the input is
+    rewritten), `close` moves the downloaded outputs of the previous input to "stale/" when the
+    input has changed or holds no requests any more (see batch_writer.retire_outputs).
+    """
+    def __init__(self, output_path, input_path=None):
+        self.output_path = output_path
+        self.input_path = input_path
+        self.path = shard_path(output_path, CACHED_SHARD)
+        self.count = 0
+        self.retired = []
+        self._file = None
+        self._digest = inputs_digest(input_path) if input_path else None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def write(self, record):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.input_path:
+            digest = inputs_digest(self.input_path)
+            if digest is None or digest != self._digest:
+                self.retired = retire_outputs(self.output_path, keep=[self.path])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the response cache from finished batch input/output directories.")
+    parser.add_argument("pairs", nargs="+", help="INPUT_DIR:OUTPUT_DIR pairs, e.g. CQ_Batchinput:CQ_Batchoutput")
+    parser.add_argument("--cache", default=CACHE_PATH)
+    args = parser.parse_args()
+    with ResponseCache(args.cache) as cache:
+        for pair in args.pairs:
+            input_dir, output_dir = pair.split(":", 1)
+            print(f"✔️ {output_dir}: {cache.add_outputs(input_dir, output_dir)} responses stored")
+        print(f"Cache size: {len(cache)}")
+
+
+if __name__ == "__main__":
+    main()
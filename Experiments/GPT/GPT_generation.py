@@ -1,5 +1,11 @@
+import os
+import sys
 import json
 from openai import OpenAI
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Batch processing"))
+from batch_writer import ShardedBatchWriter
+from batch_orchestrator import BatchOrchestrator
+from request_index import RequestIndex
 def init_template(input):
     return {
     "custom_id": None, 
@@ -19,29 +25,27 @@ with open("test_dataset.jsonl", "r") as file:
 
 with open("test_dataset_meta.jsonl", "r") as file:
     test_meta = [json.loads(line) for line in file]
-batches = []
-for i, data in enumerate(test_dataset):
-    input_text = data["input"]
-    batch = init_template(input_text)
-    batch.update({"custom_id": f"{test_meta[i]['ontology']}_{test_meta[i]['class']}"})
-    batches.append(batch)
-with open("GPT_input.jsonl", 'w', encoding='utf-8') as file:
-        for item in batches:
-            json_string = json.dumps(item, ensure_ascii=False)
-            file.write(json_string + '\n')
+# requests are streamed into GPT_input[_NNN].jsonl shards
+# custom_id -> (ontology, class), for joining the answers back to the test dataset
+with ShardedBatchWriter("GPT_input.jsonl") as batches, RequestIndex("gpt") as index:
+    for ontology in {meta["ontology"] for meta in test_meta}:
+        index.clear(ontology)
+    for i, data in enumerate(test_dataset):
+        input_text = data["input"]
+        batch = init_template(input_text)
+        batch.update({"custom_id": f"{test_meta[i]['ontology']}_{test_meta[i]['class']}"})
+        batches.write(batch)
+        index.add(batch["custom_id"], test_meta[i]["ontology"], test_meta[i]["class"], test_meta[i]["class"], source=batches.path)
 
-client = OpenAI(api_key="") # Initialize the OpenAI client
-
-with open("GPT_input.jsonl", "rb") as file:
-  batch_input_file = client.files.create(
-    file=file, 
-    purpose="batch"
-  )
-batch_input_file_id = batch_input_file.id
-
-# Create a batch job
-client.batches.create(
-  input_file_id=batch_input_file_id,
-  endpoint="/v1/chat/completions",
-  completion_window="24h", 
-        )
+# one batch job per shard, tracked in batch_ledger.json; with WAIT_FOR_BATCHES the jobs are polled
+# until they are finished, otherwise `batch_orchestrator.py run` (or `step`) later downloads the
+# outputs (GPT_4_1_output[_NNN].jsonl) and resubmits failed requests
+WAIT_FOR_BATCHES = False
+orchestrator = BatchOrchestrator(OpenAI(api_key=""), "batch_ledger.json")
+for shard in batches.paths:
+    orchestrator.add(shard, shard.replace("GPT_input", "GPT_4_1_output"))
+if WAIT_FOR_BATCHES:
+    orchestrator.run()
+else:
+    orchestrator.step()
+print(orchestrator.summary())
@@ -1,33 +1,17 @@
-import json
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Batch processing"))
+from batch_writer import shard_paths
+from batch_output import process_file, numbered_parser
 
 # ========== setting ==========
-input_file = "GPT_4_1_output.jsonl"   # GPT output batch file
+input_file = "GPT_4_1_output.jsonl"   # GPT output batch file (or its _001, _002, ... shards)
 output_file = "parsed_GPT_4_1_outputs.jsonl"    # output file
 
 # ========== processing ==========
-results = []
-
-# 1. read JSONL file
-with open(input_file, "r", encoding="utf-8") as f:
-    for line in f:
-        data = json.loads(line)
-
-        custom_id = data["custom_id"]
-        content = data["response"]["body"]["choices"][0]["message"]["content"]
-
-        # 2. split by "|" and clean up
-        parts = [part.strip() for part in content.split("|") if "?" in part and part.strip()]
-        numbered_output = {str(i): part for i, part in enumerate(parts)}
-
-        # 3. save to results
-        results.append({
-            "custom_id": custom_id,
-            "generated_outputs": numbered_output
-        })
-
-# 4. save to JSONL file
-with open(output_file, "w", encoding="utf-8") as f:
-    for item in results:
-        f.write(json.dumps(item, ensure_ascii=False) + "\n")
+# read the JSONL file(s) record by record, split each answer by "|" and write it out
+stats = process_file(shard_paths(input_file), numbered_parser, output_file)
+if stats["failed"]:
+    print(f"⚠️ {len(stats['failed'])} errored responses, e.g. {stats['failed'][0]}")
 
 print(f"✅ parsed : {output_file}")
@@ -1,7 +1,13 @@
-import json
 from copy import deepcopy
 import os
+import sys
 from openai import OpenAI
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Batch processing"))
+from batch_writer import ShardedBatchWriter, output_name
+from batch_orchestrator import BatchOrchestrator
+from request_index import RequestIndex
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from entity_table import load
 with open("C_example.txt", "r") as file:
 	C_example = file.read()
 with open("P_example.txt", "r") as file:
@@ -32,46 +38,46 @@ ontology_list = {file.split("_")[0]: {"description":os.path.join(directory_path,
 
 
 data_num = 0
-batches = []
+# requests are streamed into Batchinput[_NNN].jsonl shards
+batches = ShardedBatchWriter("Batchinput.jsonl")
+# custom_id -> (ontology, section, entity), for type2_description_postprocessing.py
+index = RequestIndex("type2")
+# only the entity axioms are used: with a table file, only their columns are read
+processed_type2 = load("processed_type2.json", columns=["relation", "expression"])
 for ontology in ontology_list:
-    with open("processed_type2.json", "r") as f:
-        temp_axiom=json.load(f)[ontology]
+    index.clear(ontology)
+    temp_axiom=processed_type2[ontology]
     for cls in temp_axiom["classes"]:
         temp = deepcopy(init_template("class", C_example))
         temp["body"]["messages"].append({"role": "user", "content": "Class name: "+cls})
         temp["custom_id"] = ontology+"_"+cls
         temp["body"]["messages"].append({"role": "user", "content": "Axiom: "+str(temp_axiom["classes"][cls]["axiom"])})
         temp["body"]["messages"].append({"role": "user", "content": "Generated description: "})
-        batches.append(temp)
+        batches.write(temp)
+        index.add(temp["custom_id"], ontology, cls, cls, "classes", source=batches.path)
     for prop in temp_axiom["properties"]:
         temp = deepcopy(init_template("property", P_example))
         temp["body"]["messages"].append({"role": "user", "content": "Property name: "+prop})
         temp["custom_id"] = ontology+"_"+prop
         temp["body"]["messages"].append({"role": "user", "content": "Axiom: "+str(temp_axiom["properties"][prop]["axiom"])})
         temp["body"]["messages"].append({"role": "user", "content": "Generated description: "})
-        batches.append(temp)
-    data_num += len(batches)
-# Save the batches to a JSONL file
-with open("Batchinput.jsonl", 'w', encoding='utf-8') as file:
-    for item in batches:
-        json_string = json.dumps(item, ensure_ascii=False)
-        file.write(json_string + '\n')
+        batches.write(temp)
+        index.add(temp["custom_id"], ontology, prop, prop, "properties", source=batches.path)
+    data_num = len(batches.custom_ids)
+batches.close()
+index.close()
     
     
 
-client = OpenAI(api_key="")
-
-
-with open("Batchinput.jsonl", "rb") as file:
-  batch_input_file = client.files.create(
-    file=file, 
-    purpose="batch"
-  )
-batch_input_file_id = batch_input_file.id
-
-# Create a batch job
-client.batches.create(
-  input_file_id=batch_input_file_id,
-  endpoint="/v1/chat/completions",
-  completion_window="24h", 
-        )
+# one batch job per shard, tracked in batch_ledger.json; with WAIT_FOR_BATCHES the jobs are polled
+# until they are finished, otherwise `batch_orchestrator.py run` (or `step`) later downloads the
+# outputs (Batchoutput[_NNN].jsonl) and resubmits failed requests
+WAIT_FOR_BATCHES = False
+orchestrator = BatchOrchestrator(OpenAI(api_key=""), "batch_ledger.json")
+for shard in batches.paths:
+    orchestrator.add(shard, output_name(shard))
+if WAIT_FOR_BATCHES:
+    orchestrator.run()
+else:
+    orchestrator.step()
+print(orchestrator.summary())
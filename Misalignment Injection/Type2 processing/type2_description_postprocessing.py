@@ -1,36 +1,45 @@
 import os
+import sys
 import json
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Batch processing"))
+from batch_writer import shard_paths
+from batch_output import iter_results, description_parser
+from request_index import RequestIndex
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from entity_table import load, save
 
-jsonl_files = ["Batchoutput.jsonl"]
-
-for jsonl_file in jsonl_files:
-    loaded_data = []
-    with open(jsonl_file, "r", encoding="utf-8") as f:
-        for line in f:
-            temp_data = json.loads(line)
-            temp_out = {"class": temp_data["custom_id"].split("_",1)[1], "description": temp_data["response"]["body"]["choices"][0]["message"]["content"]}
-            loaded_data.append(temp_out)
-    # Save the loaded data to a new JSONL file
-    with open("Generated_description.jsonl", "w", encoding="utf-8") as f:
-        for item in loaded_data:
-            json_string = json.dumps(item, ensure_ascii=False)
-            f.write(json_string + '\n')
-
-with open("processed_type2.json", "r", encoding="utf-8") as outfile:
-    total_type2 = json.load(outfile)
-with open("Generated_description.jsonl", "r", encoding="utf-8") as f:
-    temp_desc = {}
-    for line in f:
-        loadfile = json.loads(line)
-        temp_desc[loadfile["class"]] = loadfile["description"]
-for ontology in total_type2:
-    for cls in total_type2[ontology]["classes"]:
-        total_type2[ontology]["classes"][cls]["description"] = temp_desc[cls]
-    for prop in total_type2[ontology]["properties"]:
-        total_type2[ontology]["properties"][prop]["description"] = temp_desc[prop]
-with open("type2_description_update.json", "w", encoding="utf-8") as outfile:
-    json.dump(total_type2, outfile, ensure_ascii=False, indent=4)
-
+def update_type2_descriptions():
+    total_type2 = load("processed_type2.json")
+    failed = []
+    updated = set()
+    # Batchoutput.jsonl, or its shards Batchoutput_001.jsonl, ..., streamed into Generated_description.jsonl;
+    # every description goes to the (ontology, section, entity) its custom_id was generated for,
+    # so equal class names in different ontologies keep their own descriptions
+    with RequestIndex("type2") as index, open("Generated_description.jsonl", "w", encoding="utf-8") as f:
+        for result in iter_results(shard_paths("Batchoutput.jsonl"), index):
+            if result.error is not None:
+                failed.append((result.key, result.error))
+                continue
+            for item in description_parser(result):
+                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+            request = index.resolve(result.custom_id)
+            entities = total_type2.get(request.ontology, {})
+            # outputs from before the request index: the section is found by name
+            section = request.section or ("classes" if request.key in entities.get("classes", {}) else "properties")
+            if request.key in entities.get(section, {}):
+                entities[section][request.key]["description"] = result.content
+                updated.add((request.ontology, section, request.key))
+    if failed:
+        print(f"⚠️ {len(failed)} errored responses, e.g. {failed[0]}")
+    # an entity without a regenerated description still has its original one, which describes the
+    # removed axiom: it is left out instead of being labelled with that description
+    missing = [(ontology, section, name) for ontology, sections in total_type2.items() for section in ("classes", "properties")
+               for name in sections.get(section, {}) if (ontology, section, name) not in updated]
+    for ontology, section, name in missing:
+        del total_type2[ontology][section][name]
+    if missing:
+        print(f"⚠️ {len(missing)} entities without a generated description left out, e.g. {missing[0]}")
+    save(total_type2, "type2_description_update.json", indent=4)
 
 
 # List of axiom predicates to look for
@@ -40,40 +49,45 @@ axiom_relations = [
     "characteristics", "inverseOf"
 ]
 
+def restore_removed_axiom(info):
+    # puts the axiom removed by type-2 injection back into info['axiom'] (one entity)
+    removed = info.get('removed axiom')
+    if not removed:
+        return
+
+    # find predicate
+    predicate = next((rel for rel in axiom_relations if f" {rel} " in removed), None)
+    if predicate is None:
+        return
+
+    # split into subject and expression
+    _, expr = removed.split(f" {predicate} ", 1)
+    expr = expr.strip()
+
+    # restore into info['axiom'][predicate]
+    ax = info.setdefault('axiom', {})
+    current = ax.setdefault(predicate, [])
+    if isinstance(current, list) and expr not in current:
+        current.append(expr)
+
+
 def restore_removed_axioms(input_path='type2_description_update.json', output_path='Final_type2.json'):
     # 1. Load the processed data
-    with open(input_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load(input_path)
 
     # 2. Traverse each ontology, classes and properties
     for ontology in data.values():
         for section in ('classes', 'properties'):
             for name, info in ontology.get(section, {}).items():
-                removed = info.get('removed axiom')
-                if not removed:
-                    continue
-
-                # find predicate
-                predicate = next((rel for rel in axiom_relations if f" {rel} " in removed), None)
-                if predicate is None:
-                    continue
-
-                # split into subject and expression
-                _, expr = removed.split(f" {predicate} ", 1)
-                expr = expr.strip()
-
-                # restore into info['axiom'][predicate]
-                ax = info.setdefault('axiom', {})
-                current = ax.setdefault(predicate, [])
-                if isinstance(current, list) and expr not in current:
-                    current.append(expr)
+                restore_removed_axiom(info)
 
     # 3. Write out the restored file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    save(data, output_path)
 
-# Example usage:
-restore_removed_axioms(
-    input_path='type2_description_update.json',
-    output_path='Final_type2.json'
-)
+if __name__ == "__main__":
+    update_type2_descriptions()
+    # Example usage:
+    restore_removed_axioms(
+        input_path='type2_description_update.json',
+        output_path='Final_type2.json'
+    )
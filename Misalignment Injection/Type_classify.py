@@ -1,6 +1,7 @@
 import os
 import json
 import re
+from entity_table import save
 # Define the directories
 axiom_relations = [
     "subClassOf", "equivalentClass", "propertyRestrictions",
@@ -9,59 +10,98 @@ axiom_relations = [
 ]
 directories = ['Axiom_per_entity', 'Generated CQ', 'generated description']
 
-# Load the list of files in each directory
-files_in_directories = {directory: os.listdir(directory) for directory in directories}
-
-total_data = {}
-for directory in files_in_directories["Axiom_per_entity"]:
-    with open(f"Axiom_per_entity/{directory}", "r") as file:
-        total_data[directory.split("_")[0]] = json.load(file)
-
-description_data = {}
-for directory in files_in_directories["generated description"]:
-    temp = {}
-    with open(f"generated description/{directory}", "r") as file:
-        for line in file:
-            temp[json.loads(line)["class"]] = json.loads(line)["description"]
-    description_data[directory.split("_")[0]] = temp
-
-CQ_data = {}
-for directory in files_in_directories["Generated CQ"]:
-    temp = {}
-    with open(f"Generated CQ/{directory}", "r") as file:
-        for line in file:
-            axiom = json.loads(line)["axiom"]
-            for rela in axiom_relations:
-                if rela in axiom:
-                    cls = axiom.split(rela)[0].strip()
-                    break
-            if cls not in temp: temp[cls] = []
-            temp[cls].append({"axiom": axiom, "CQ": json.loads(line)["CQ"]})
-    CQ_data[directory.split("_")[0]] = temp
-
-
-for ontology in total_data:
-    for classorproperty in total_data[ontology]:
-        for cp in total_data[ontology][classorproperty]:
-            temp = {"axiom" : total_data[ontology][classorproperty][cp], "description" : description_data[ontology][cp], "CQ": CQ_data[ontology][cp]}
-            total_data[ontology][classorproperty][cp] = temp
-with open("total_data.json", "w") as json_file:
-    json.dump(total_data, json_file, indent=4, ensure_ascii=False)
-
-
-
-with open("total_data.json", "r", encoding="utf-8") as json_file:
-    total_data = json.load(json_file)
-
-# initialize types
-type1, type2, type3, type4 = {}, {}, {}, {}
-types = [type1, type2, type3, type4]
-for t in types:
-    for ontology in total_data:
-        t[ontology] = {"classes": {}, "properties": {}}
-
-class_counts = {id(t): 0 for t in types}
-prop_counts  = {id(t): 0 for t in types}
+
+def axiom_entity(axiom):
+    # entity an axiom string ("<entity> <relation> <expression>") belongs to
+    for rela in axiom_relations:
+        if rela in axiom:
+            return axiom.split(rela)[0].strip()
+    return None
+
+
+def ontology_key(file_name):
+    # "swo_merged_axiom.json" / "swo_output.jsonl" -> "swo"
+    return file_name.split("_")[0]
+
+
+def iter_jsonl_dir(directory):
+    # (ontology, record) for every line of every file, each line parsed once
+    for file_name in os.listdir(directory):
+        ontology = ontology_key(file_name)
+        with open(os.path.join(directory, file_name), "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield ontology, json.loads(line)
+
+
+def load_total_data(report=None):
+    """
+    Joins the axioms, generated descriptions and generated CQs of every entity:
+    {ontology: {section: {entity: {"axiom", "description", "CQ"}}}}.
+    Every source is read once into a hash index keyed by (ontology, section, entity); a CQ line is
+    matched to its entity through the exact axiom string "<entity> <relation> <expression>" it was
+    generated from. Entities without a description or without CQs are left out. `report` (a dict)
+    receives what did not line up: missing descriptions / CQs and descriptions / CQs of unknown entities.
+    """
+    report = {} if report is None else report
+    # 1. axioms, and the index axiom string -> entities
+    total_data = {}
+    entities = set()
+    axiom_index = {}
+    for file_name in os.listdir("Axiom_per_entity"):
+        ontology = ontology_key(file_name)
+        with open(os.path.join("Axiom_per_entity", file_name), "r") as file:
+            total_data[ontology] = json.load(file)
+        for section, cps in total_data[ontology].items():
+            for cp, axioms in cps.items():
+                entities.add((ontology, section, cp))
+                for relation, expressions in axioms.items():
+                    for expression in expressions:
+                        keys = axiom_index.setdefault((ontology, f"{cp} {relation} {expression}"), [])
+                        if (section, cp) not in keys:
+                            keys.append((section, cp))
+
+    # 2. descriptions, keyed by (ontology, entity name); later lines win
+    description_data = {}
+    for ontology, record in iter_jsonl_dir("generated description"):
+        description_data[(ontology, record["class"])] = record["description"]
+
+    # 3. CQs, keyed by (ontology, section, entity) in file order
+    CQ_data = {}
+    unmatched_cqs = []
+    for ontology, record in iter_jsonl_dir("Generated CQ"):
+        keys = axiom_index.get((ontology, record["axiom"]))
+        if keys is None:
+            # axiom no longer in Axiom_per_entity: fall back to the entity name in front of the relation
+            cp = axiom_entity(record["axiom"])
+            keys = [(section, cp) for section in ("classes", "properties") if (ontology, section, cp) in entities]
+        if not keys:
+            unmatched_cqs.append((ontology, record["axiom"]))
+        for section, cp in keys:
+            CQ_data.setdefault((ontology, section, cp), []).append({"axiom": record["axiom"], "CQ": record["CQ"]})
+
+    # 4. join and validate
+    report["missing description"] = sorted(key for key in entities if key[::2] not in description_data)
+    report["missing CQ"] = sorted(key for key in entities if key not in CQ_data)
+    report["unknown description"] = sorted(set(description_data) - {key[::2] for key in entities})
+    report["unknown CQ"] = unmatched_cqs
+    for ontology, cps in total_data.items():
+        for section in cps:
+            for cp in list(cps[section]):
+                description = description_data.get((ontology, cp))
+                CQs = CQ_data.get((ontology, section, cp))
+                if description is None or CQs is None:
+                    del cps[section][cp]
+                    continue
+                cps[section][cp] = {"axiom": cps[section][cp], "description": description, "CQ": CQs}
+    return total_data
+
+
+def print_report(report):
+    for problem, keys in report.items():
+        if keys:
+            print(f"⚠️ {problem}: {len(keys)}, e.g. {keys[:3]}")
+
 
 def has_and_or_some_only_in_axiom(ax):
     for v in ax.values():
@@ -71,56 +111,90 @@ def has_and_or_some_only_in_axiom(ax):
                     return True
     return False
 
-for ontology, cps in total_data.items():
-    for section in ("classes", "properties"):
-        for cp, value in cps[section].items():
-            ax = value.get("axiom", {}) if isinstance(value, dict) else {}
-
-            # 1) eligible types
-            if section == "classes":
-                is_single_cq = (
-                    "CQ" in value
-                    and isinstance(value["CQ"], list)
-                    and len(value["CQ"]) == 1
-                )
-                eligible = [type3, type4] if is_single_cq else types.copy()
-            else:
-                is_empty_axiom = (
-                    not ax.get("characteristics")
-                    and ax.get("domain") == ["None"]
-                    and ax.get("range") == ["None"]
-                    and not ax.get("subPropertyOf")
-                    and not ax.get("inverseOf")
-                )
-                eligible = [type3, type4] if is_empty_axiom else types.copy()
-
-
-            #  2) axiom including and/or some/only processing 
-            if not has_and_or_some_only_in_axiom(ax):
-                eligible = [t for t in eligible if t is not type3]
-
-            # 3) classification
-            if section == "classes":
-                target = min(eligible, key=lambda t: class_counts[id(t)])
-                class_counts[id(target)] += 1
-            else:
-                target = min(eligible, key=lambda t: prop_counts[id(t)])
-                prop_counts[id(target)] += 1
-
-            target[ontology][section][cp] = value
-
-# results
-for idx, t in enumerate(types, start=1):
-    nc = sum(len(t[ont]["classes"]) for ont in t)
-    np = sum(len(t[ont]["properties"]) for ont in t)
-    print(f"type{idx} ➔ {nc} classes, {np} properties")
-
-# save to json files
-with open("type1.json", "w", encoding="utf-8") as f:
-    json.dump(type1, f, ensure_ascii=False, indent=2)
-with open("type2.json", "w", encoding="utf-8") as f:
-    json.dump(type2, f, ensure_ascii=False, indent=2)
-with open("type3.json", "w", encoding="utf-8") as f:
-    json.dump(type3, f, ensure_ascii=False, indent=2)
-with open("type4.json", "w", encoding="utf-8") as f:
-    json.dump(type4, f, ensure_ascii=False, indent=2)
+
+def eligible_types(section, value):
+    """Indexes (0 = type1 ... 3 = type4) of the misalignment types an entity may be assigned to."""
+    ax = value.get("axiom", {}) if isinstance(value, dict) else {}
+
+    # 1) eligible types
+    if section == "classes":
+        is_single_cq = (
+            "CQ" in value
+            and isinstance(value["CQ"], list)
+            and len(value["CQ"]) == 1
+        )
+        eligible = [2, 3] if is_single_cq else [0, 1, 2, 3]
+    else:
+        is_empty_axiom = (
+            not ax.get("characteristics")
+            and ax.get("domain") == ["None"]
+            and ax.get("range") == ["None"]
+            and not ax.get("subPropertyOf")
+            and not ax.get("inverseOf")
+        )
+        eligible = [2, 3] if is_empty_axiom else [0, 1, 2, 3]
+
+
+    #  2) axiom including and/or some/only processing
+    if not has_and_or_some_only_in_axiom(ax):
+        eligible = [t for t in eligible if t != 2]
+    return eligible
+
+
+class TypeBalancer:
+    """
+    Greedy type assignment: every entity goes to the eligible type that has received the
+    fewest entities of its section (classes / properties) so far. Only the running counts
+    are kept, so entities can be fed one at a time.
+    """
+    def __init__(self):
+        self.class_counts = [0, 0, 0, 0]
+        self.prop_counts = [0, 0, 0, 0]
+
+    def assign(self, section, value):
+        # 3) classification
+        counts = self.class_counts if section == "classes" else self.prop_counts
+        target = min(eligible_types(section, value), key=lambda t: counts[t])
+        counts[target] += 1
+        return target
+
+
+def classify(total_data):
+    # initialize types
+    types = [{}, {}, {}, {}]
+    for t in types:
+        for ontology in total_data:
+            t[ontology] = {"classes": {}, "properties": {}}
+
+    balancer = TypeBalancer()
+    for ontology, cps in total_data.items():
+        for section in ("classes", "properties"):
+            for cp, value in cps[section].items():
+                target = balancer.assign(section, value)
+                types[target][ontology][section][cp] = value
+    return types
+
+
+def main():
+    report = {}
+    total_data = load_total_data(report)
+    print_report(report)
+    # export of the joined data (total_data.json, or .parquet with INTERMEDIATE_FORMAT=parquet);
+    # type assignment works on the joined dict directly
+    save(total_data, "total_data.json", indent=4)
+
+    types = classify(total_data)
+
+    # results
+    for idx, t in enumerate(types, start=1):
+        nc = sum(len(t[ont]["classes"]) for ont in t)
+        np = sum(len(t[ont]["properties"]) for ont in t)
+        print(f"type{idx} ➔ {nc} classes, {np} properties")
+
+    # save to json (or parquet / arrow) files
+    for idx, t in enumerate(types, start=1):
+        save(t, f"type{idx}.json", type=f"Type{idx}")
+
+
+if __name__ == "__main__":
+    main()
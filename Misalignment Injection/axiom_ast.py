@@ -0,0 +1,187 @@
+import re
+from collections import namedtuple
+
+# ——————————————
+# Class expressions in the string format of Ontology_processing.process_class_expression,
+# parsed once into a small AST and rendered back unchanged (render(parse(s)) == s):
+#   Name         "Pizza", "obo:BFO_0000001", "DatatypeRestriction(xsd:int minInclusive 2)"
+#   Not          "not X"
+#   Connective   "(X and Y and ...)", "(X or Y or ...)"
+#   Restriction  "[p some X]", "[p only X]", "[p hasValue v]", "[p ?]"
+#   Cardinality  "[p exactly 1 X]", "[p min 2]", "[p max 3 X]"
+#   OneOf        "{a, b, c}"
+# Labels can contain spaces, brackets and words such as "and" / "not" ("identifier not unique",
+# "Prediction and recognition (protein)"). Since unions and intersections are always rendered in
+# parentheses, a parenthesised group is only a Connective when "and" / "or" separates its
+# top-level parts; anything else is kept as a Name.
+# `mutants` enumerates every distinct single-edit mutant of an expression in one traversal.
+Name = namedtuple("Name", ["text"])
+Not = namedtuple("Not", ["operand"])
+Connective = namedtuple("Connective", ["op", "operands"])
+Restriction = namedtuple("Restriction", ["prop", "kind", "filler"])
+Cardinality = namedtuple("Cardinality", ["prop", "kind", "count", "filler"])
+OneOf = namedtuple("OneOf", ["items"])
+Mutant = namedtuple("Mutant", ["operator", "expression"])
+
+OPEN = {"(": ")", "[": "]", "{": "}"}
+# single-edit mutation operators
+QUANTIFIER, CONNECTIVE, CARDINALITY, NEGATION = "quantifier swap", "connective swap", "cardinality shift", "negation flip"
+OPERATORS = (QUANTIFIER, CONNECTIVE, CARDINALITY, NEGATION)
+# relations whose values are class expressions (the others name properties or characteristics)
+CLASS_RELATIONS = ("subClassOf", "equivalentClass", "disjointWith", "propertyRestrictions", "domain", "range")
+_RESTRICTION = re.compile(r" (some|only|hasValue) | (exactly|min|max) (\d+)(?= |$)")
+
+
+def _depths(text):
+    # bracket depth before every character
+    depths, depth = [], 0
+    for ch in text:
+        if ch in ")]}":
+            depth -= 1
+        depths.append(depth)
+        if ch in OPEN:
+            depth += 1
+    return depths
+
+
+def _enclosed(text):
+    # True when text[0] opens a bracket that is closed by the last character
+    if not text or text[0] not in OPEN or text[-1] != OPEN[text[0]]:
+        return False
+    depths = _depths(text)
+    return all(d > 0 for d in depths[1:-1]) and depths[-1] == 0
+
+
+def _split_top(text, separator):
+    # parts of `text` between the top-level occurrences of `separator`
+    depths = _depths(text)
+    parts, start, i = [], 0, text.find(separator)
+    while i != -1:
+        if depths[i] == 0:
+            parts.append(text[start:i])
+            start = i + len(separator)
+        i = text.find(separator, i + 1)
+    parts.append(text[start:])
+    return parts
+
+
+def parse(text):
+    """AST of a rendered class expression."""
+    if text.startswith("not ") and len(text) > 4:
+        return Not(parse(text[4:]))
+    if _enclosed(text):
+        inner = text[1:-1]
+        if text[0] == "(":
+            # one connective per group; a group with both words keeps "or" (and-words are then in labels)
+            for op in ("or", "and"):
+                parts = _split_top(inner, f" {op} ")
+                if len(parts) > 1 and all(parts):
+                    return Connective(op, tuple(parse(part) for part in parts))
+        elif text[0] == "{":
+            return OneOf(tuple(_split_top(inner, ", ")))
+        else:
+            return _parse_restriction(inner, text)
+    return Name(text)
+
+
+def _parse_restriction(inner, text):
+    if inner.endswith(" ?"):
+        return Restriction(inner[:-2], "?", None)
+    depths = _depths(inner)
+    for match in _RESTRICTION.finditer(inner):
+        if depths[match.start()] != 0:
+            continue
+        prop = inner[:match.start()]
+        rest = inner[match.end():]
+        if match.group(1):
+            filler = Name(rest) if match.group(1) == "hasValue" else parse(rest)
+            return Restriction(prop, match.group(1), filler)
+        filler = parse(rest.lstrip(" ")) if rest.strip() else None
+        return Cardinality(prop, match.group(2), int(match.group(3)), filler)
+    return Name(text)
+
+
+def render(node):
+    """The expression string of an AST, in the Ontology_processing format."""
+    kind = type(node)
+    if kind is Name:
+        return node.text
+    if kind is Not:
+        return "not " + render(node.operand)
+    if kind is Connective:
+        return "(" + f" {node.op} ".join(render(operand) for operand in node.operands) + ")"
+    if kind is OneOf:
+        return "{" + ", ".join(node.items) + "}"
+    if kind is Restriction:
+        if node.kind == "?":
+            return f"[{node.prop} ?]"
+        return f"[{node.prop} {node.kind} {render(node.filler)}]"
+    filler = f" {render(node.filler)}" if node.filler is not None else ""
+    return f"[{node.prop} {node.kind} {node.count}{filler}]"
+
+
+def _local_edits(node, operators):
+    # (operator, node) for every single edit of `node` itself
+    kind = type(node)
+    if kind is Restriction and node.kind in ("some", "only") and QUANTIFIER in operators:
+        yield QUANTIFIER, node._replace(kind="only" if node.kind == "some" else "some")
+    if kind is Connective and CONNECTIVE in operators:
+        yield CONNECTIVE, node._replace(op="or" if node.op == "and" else "and")
+    if kind is Cardinality and CARDINALITY in operators:
+        yield CARDINALITY, node._replace(count=node.count + 1)
+        if node.count > 0:
+            yield CARDINALITY, node._replace(count=node.count - 1)
+    if NEGATION in operators:
+        # class positions only: hasValue fillers and oneOf items are individuals
+        if kind is Not:
+            yield NEGATION, node.operand
+        elif not (kind is Name and node.text == "None"):
+            yield NEGATION, Not(node)
+
+
+def _edits(node, operators):
+    # every single-edit variant of the subtree `node`: its own edits, then one edit in one child
+    yield from _local_edits(node, operators)
+    kind = type(node)
+    if kind is Not:
+        for operator, operand in _edits(node.operand, operators):
+            # "not not X" is not rendered by Ontology_processing
+            if type(operand) is not Not:
+                yield operator, Not(operand)
+    elif kind is Connective:
+        for i, operand in enumerate(node.operands):
+            for operator, edited in _edits(operand, operators):
+                yield operator, node._replace(operands=node.operands[:i] + (edited,) + node.operands[i + 1:])
+    elif kind in (Restriction, Cardinality) and node.filler is not None and node.kind != "hasValue":
+        for operator, filler in _edits(node.filler, operators):
+            yield operator, node._replace(filler=filler)
+
+
+def mutants(expression, operators=OPERATORS):
+    """
+    All distinct single-edit mutants of a class expression string with the given operators,
+    as Mutant(operator, expression) in traversal order (outermost edits first).
+    """
+    seen = {expression}
+    result = []
+    for operator, node in _edits(parse(expression), operators):
+        text = render(node)
+        if text not in seen:
+            seen.add(text)
+            result.append(Mutant(operator, text))
+    return result
+
+
+def split_axiom(axiom, entity=None, relations=CLASS_RELATIONS):
+    """
+    "<entity> <relation> <expression>" -> (entity, relation, expression), or None when no relation
+    of `relations` follows the entity. Without `entity`, the first " <relation> " in the string is used.
+    """
+    if entity is not None and axiom.startswith(entity + " "):
+        relation, _, expression = axiom[len(entity) + 1:].partition(" ")
+        return (entity, relation, expression) if relation in relations and expression else None
+    for relation in relations:
+        if f" {relation} " in axiom:
+            subject, expression = axiom.split(f" {relation} ", 1)
+            return subject, relation, expression
+    return None
@@ -0,0 +1,276 @@
+import os
+import re
+import array
+import hashlib
+import argparse
+from functools import lru_cache
+
+# ——————————————
+# Near-duplicate index over CQs: MinHash signatures of word shingles, split into LSH bands, so a
+# query only compares against the CQs that share a band bucket with it (sublinear in the number of
+# indexed CQs) instead of against every CQ. Candidates are confirmed by the exact Jaccard similarity
+# of their shingle sets.
+# With an embedder (sentence-transformers, CQ_EMBEDDING_MODEL) the index works on the embeddings
+# instead: the LSH signature is the sign pattern of the embedding against random hyperplanes
+# (EMBEDDING_BANDS bands of EMBEDDING_ROWS bits), so CQs with a small angle between their
+# embeddings share a bucket whatever their wording, and candidates are confirmed by cosine similarity.
+# This finds paraphrases that share few words, which token shingles cannot. It needs numpy
+# (installed with sentence-transformers).
+# CQs are compared lower-cased, camelCase split and without punctuation, so "hasTopping" = "has topping".
+# CQ_NEAR_DUPLICATES in the environment sets what the type processors and merge_data.py do with
+# near-duplicates: "flag" (default: count and report them), "drop" (remove them) or "off".
+NEAR_DUPLICATES = os.environ.get("CQ_NEAR_DUPLICATES", "flag")
+EMBEDDING_MODEL = os.environ.get("CQ_EMBEDDING_MODEL")
+# Word bigrams of templated CQs that differ in one word ("... no specified domain?" / "... range?") still
+# reach a Jaccard similarity of 0.8-0.86, so the default threshold is 0.9.
+THRESHOLD = 0.9             # Jaccard similarity of the shingle sets
+EMBEDDING_THRESHOLD = 0.9   # cosine similarity of the embeddings, when an embedder is used
+SHINGLE_SIZE = 2
+NUM_PERM = 64
+BANDS = 16                  # 16 bands of 4 rows: pairs with Jaccard 0.9 are candidates with p > 0.99999
+EMBEDDING_BANDS = 16        # 16 bands of 8 hyperplane bits: pairs with cosine 0.9 are candidates with p > 0.99
+EMBEDDING_ROWS = 8
+_TOKEN = re.compile(r"[a-z0-9]+")
+_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+
+
+def tokens(cq):
+    return _TOKEN.findall(_CAMEL.sub(r"\1 \2", cq).lower())
+
+
+def shingles(cq, size=SHINGLE_SIZE):
+    """Set of word `size`-grams of a CQ (the whole CQ when it is shorter)."""
+    words = tokens(cq)
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+@lru_cache(maxsize=1 << 16)
+def _hashes(shingle, num_perm, seed):
+    # `num_perm` independent 32-bit hashes of a shingle, from one SHAKE-128 digest
+    return array.array("I", hashlib.shake_128(f"{seed}:{shingle}".encode("utf-8")).digest(4 * num_perm))
+
+
+def sentence_embedder(model_name="all-MiniLM-L6-v2", device=None):
+    """texts -> unit-length embedding vectors, with a sentence-transformers model (imported only here)."""
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name, device=device)
+
+    def embed(texts):
+        return model.encode(list(texts), normalize_embeddings=True)
+    return embed
+
+
+@lru_cache(maxsize=None)
+def default_embedder():
+    # the CQ_EMBEDDING_MODEL embedder, loaded once; None without CQ_EMBEDDING_MODEL
+    return sentence_embedder(EMBEDDING_MODEL) if EMBEDDING_MODEL else None
+
+
+class CQIndex:
+    """
+    LSH index of CQs. `add(cq, key)` indexes a CQ, `query(cq)` returns the near-duplicates
+    of `cq` among the indexed CQs as (key, cq, similarity), most similar first.
+    Without `embedder`: MinHash of word shingles and Jaccard similarity; with it: random
+    hyperplanes over the embeddings and cosine similarity. `embed(cqs)` embeds many CQs in one
+    batch ahead of `add` / `query`.
+    """
+    def __init__(self, threshold=THRESHOLD, embedder=None, embedding_threshold=EMBEDDING_THRESHOLD,
+                 num_perm=NUM_PERM, bands=BANDS, seed=1):
+        self.seed = seed
+        self.threshold = threshold
+        self.embedder = embedder
+        self.embedding_threshold = embedding_threshold
+        if embedder is None:
+            self.rows = num_perm // bands
+            self.num_perm = self.rows * bands
+        else:
+            self.rows = EMBEDDING_ROWS
+            self.num_perm = EMBEDDING_ROWS * EMBEDDING_BANDS
+        self.hyperplanes = None
+        self._np = None
+        self.buckets = {}
+        self.entries = []   # (key, cq, shingle set or embedding)
+        self.vectors = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def signature(self, features):
+        if self.embedder is not None:
+            # sign of the embedding against every hyperplane
+            if self.hyperplanes is None:
+                self.hyperplanes = self._np.random.default_rng(self.seed).standard_normal((self.num_perm, len(features)))
+            return (self.hyperplanes @ features > 0).tolist()
+        # per hash function, the minimum over the shingles (element-wise min of their hash arrays)
+        return list(map(min, zip(*(_hashes(shingle, self.num_perm, self.seed) for shingle in features))))
+
+    def _bands(self, features):
+        signature = self.signature(features)
+        return [(band, tuple(signature[start:start + self.rows]))
+                for band, start in enumerate(range(0, len(signature), self.rows))]
+
+    def embed(self, cqs):
+        """Embeddings of `cqs`, computed in one batch for those not embedded yet."""
+        missing = [cq for cq in dict.fromkeys(cqs) if cq not in self.vectors]
+        if missing:
+            if self._np is None:
+                import numpy
+                self._np = numpy
+            self.vectors.update(zip(missing, self._np.asarray(self.embedder(missing), dtype=float)))
+        return [self.vectors[cq] for cq in cqs]
+
+    def features(self, cq):
+        # what the signature and the similarity are computed from: shingle set or embedding
+        return shingles(cq) if self.embedder is None else self.embed([cq])[0]
+
+    def add(self, cq, key=None):
+        features = self.features(cq)
+        position = len(self.entries)
+        self.entries.append((key, cq, features))
+        for band in self._bands(features):
+            self.buckets.setdefault(band, []).append(position)
+        return position
+
+    def candidates(self, cq, features=None):
+        # positions of the indexed CQs that share at least one band bucket with `cq`
+        found = set()
+        for band in self._bands(self.features(cq) if features is None else features):
+            found.update(self.buckets.get(band, ()))
+        return sorted(found)
+
+    def query(self, cq):
+        features = self.features(cq)
+        positions = self.candidates(cq, features)
+        if not positions:
+            return []
+        if self.embedder is None:
+            scored = [(position, jaccard(features, self.entries[position][2])) for position in positions]
+            threshold = self.threshold
+        else:
+            scored = [(position, float(features @ self.entries[position][2])) for position in positions]
+            threshold = self.embedding_threshold
+        matches = [(self.entries[position][0], self.entries[position][1], score)
+                   for position, score in scored if score >= threshold]
+        return sorted(matches, key=lambda match: -match[2])
+
+    def match(self, cq):
+        # the most similar indexed near-duplicate of `cq`, or None
+        matches = self.query(cq)
+        return matches[0] if matches else None
+
+
+def new_index(threshold=THRESHOLD, embedder=None):
+    return CQIndex(threshold, embedder if embedder is not None else default_embedder())
+
+
+def dedupe(cqs, threshold=THRESHOLD, embedder=None):
+    """
+    (kept, dropped) for a list of CQs: the first CQ of every group of near-duplicates is kept, in order;
+    dropped holds (cq, kept near-duplicate) pairs.
+    """
+    index = new_index(threshold, embedder)
+    cqs = list(cqs)
+    if index.embedder is not None:
+        index.embed(cqs)
+    kept, dropped = [], []
+    for cq in cqs:
+        match = index.match(cq)
+        if match:
+            dropped.append((cq, match[1]))
+        else:
+            index.add(cq)
+            kept.append(cq)
+    return kept, dropped
+
+
+def drop_near_duplicates(cqs, references, threshold=THRESHOLD, embedder=None):
+    """(kept, dropped) for `cqs` against `references`: CQs with a near-duplicate in `references` are dropped."""
+    index = new_index(threshold, embedder)
+    if index.embedder is not None:
+        index.embed(list(cqs) + list(references))
+    for reference in references:
+        index.add(reference)
+    kept, dropped = [], []
+    for cq in cqs:
+        match = index.match(cq)
+        if match:
+            dropped.append((cq, match[1]))
+        else:
+            kept.append(cq)
+    return kept, dropped
+
+
+def check_target_valid(info, mode=NEAR_DUPLICATES):
+    """
+    Valid CQs of an injected entity that paraphrase one of its Target CQs; they are removed from
+    'Valid CQ' with mode "drop". Returns the number of such CQs (0 with mode "off").
+    """
+    if mode == "off" or "Target CQ" not in info:
+        return 0
+    kept, dropped = drop_near_duplicates(info["Valid CQ"], info["Target CQ"])
+    if mode == "drop":
+        info["Valid CQ"] = kept
+    return len(dropped)
+
+
+def split_leaks(train_dataset, test_dataset, threshold=THRESHOLD, embedder=None):
+    """
+    Target CQs of test entities with a near-duplicate among the Target CQs of the train entities, as
+    dicts (ontology, section, entity, CQ, train entity, train CQ, similarity).
+    """
+    index = new_index(threshold, embedder)
+    if index.embedder is not None:
+        index.embed([cq for dataset in (train_dataset, test_dataset) for sections in dataset.values()
+                     for entities in sections.values() for info in entities.values() for cq in info.get("Target CQ", [])])
+    for ontology, sections in train_dataset.items():
+        for section, entities in sections.items():
+            for entity, info in entities.items():
+                for cq in info.get("Target CQ", []):
+                    index.add(cq, (ontology, section, entity))
+    leaks = []
+    for ontology, sections in test_dataset.items():
+        for section, entities in sections.items():
+            for entity, info in entities.items():
+                for cq in info.get("Target CQ", []):
+                    match = index.match(cq)
+                    if match:
+                        leaks.append({"ontology": ontology, "section": section, "entity": entity, "CQ": cq,
+                                      "train entity": list(match[0]), "train CQ": match[1], "similarity": match[2]})
+    return leaks
+
+
+def main():
+    from entity_table import load
+    parser = argparse.ArgumentParser(description="Report near-duplicate CQs across a stage file.")
+    parser.add_argument("input", nargs="?", default="total_data.json", help="stage file with 'CQ' entries")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="sentence-transformers model (embedding index)")
+    parser.add_argument("--examples", type=int, default=10)
+    args = parser.parse_args()
+    embedder = sentence_embedder(args.model) if args.model else None
+    index = CQIndex(args.threshold, embedder, args.threshold)
+    rows = [(ontology, entity, cq) for ontology, sections in load(args.input, columns=["axiom", "CQ", "cq_position"]).items()
+            for entities in sections.values() for entity, info in entities.items()
+            for cq in dict.fromkeys(cq for entry in info.get("CQ", []) for cq in entry["CQ"])]
+    if embedder is not None:
+        index.embed([cq for _, _, cq in rows])
+    duplicates = []
+    for ontology, entity, cq in rows:
+        match = index.match(cq)
+        if match:
+            duplicates.append(((ontology, entity, cq), match))
+        index.add(cq, (ontology, entity))
+    print(f"{len(rows)} CQs, {len(duplicates)} near-duplicates of an earlier CQ "
+          f"({'cosine' if embedder else 'Jaccard'} >= {args.threshold})")
+    for (ontology, entity, cq), (key, other, score) in duplicates[:args.examples]:
+        print(f"  {score:.2f}  {ontology}/{entity}: {cq}\n        {key[0]}/{key[1]}: {other}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import os
+import re
+import gzip
+import json
+
+# ——————————————
+# Writer for the dataset files "<prefix>.jsonl" (training lines) and "<prefix>_meta.jsonl" (metadata
+# lines). Line i of one file belongs to line i of the other. Both files stay open while the records
+# stream in, through large write buffers (or gzip with `compress`: ".jsonl.gz"). The files are first
+# written as "*.tmp" and renamed over the old ones when the writer is closed, so a rerun replaces
+# the dataset instead of appending to it, and a failed run leaves the previous files in place.
+# With `max_bytes`, the dataset is split into numbered shards ("<prefix>_001.jsonl" +
+# "<prefix>_001_meta.jsonl", ...) of at most `max_bytes` bytes of training lines each (the metadata
+# is split at the same records). When everything fits in one shard, the files keep their plain
+# names. Shards left over from an earlier run of the same prefix are removed.
+BUFFER_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+
+
+def encode_record(line_data, line_metadata):
+    # (training line, metadata line) as JSON lines
+    return (json.dumps(line_data, ensure_ascii=False) + "\n",
+            json.dumps(line_metadata, ensure_ascii=False) + "\n")
+
+
+class DatasetWriter:
+    """
+    Streams (line_data, line_metadata) records into `prefix`.jsonl / `prefix`_meta.jsonl.
+    `write` takes the two dicts, `write_lines` two already encoded lines (see `encode_record`).
+    `close` (or leaving the `with` block) moves the files into place and returns the training file paths.
+    """
+    def __init__(self, prefix, compress=False, max_bytes=None):
+        self.prefix = prefix
+        self.ext = ".jsonl.gz" if compress else ".jsonl"
+        self.max_bytes = max_bytes
+        self.shards = []    # [training file, metadata file, records, bytes]
+        self.records = 0
+        self._files = None
+        os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _paths(self, index=None):
+        stem = self.prefix if index is None else f"{self.prefix}_{index:03d}"
+        return stem + self.ext, stem + "_meta" + self.ext
+
+    def _open(self, path):
+        if self.ext.endswith(".gz"):
+            return gzip.open(path + ".tmp", "wt", encoding="utf-8", compresslevel=COMPRESS_LEVEL)
+        return open(path + ".tmp", "w", encoding="utf-8", buffering=BUFFER_SIZE)
+
+    def _next_shard(self):
+        self._close_files()
+        data_path, meta_path = self._paths(len(self.shards) + 1)
+        self.shards.append([data_path, meta_path, 0, 0])
+        self._files = (self._open(data_path), self._open(meta_path))
+
+    def _close_files(self):
+        if self._files is not None:
+            for f in self._files:
+                f.close()
+            self._files = None
+
+    def write(self, line_data, line_metadata):
+        self.write_lines(*encode_record(line_data, line_metadata))
+
+    def write_lines(self, data_line, meta_line):
+        size = len(data_line.encode("utf-8"))
+        shard = self.shards[-1] if self.shards else None
+        if shard is None or (self.max_bytes and shard[2] and shard[3] + size > self.max_bytes):
+            self._next_shard()
+            shard = self.shards[-1]
+        self._files[0].write(data_line)
+        self._files[1].write(meta_line)
+        shard[2] += 1
+        shard[3] += size
+        self.records += 1
+
+    def _stale(self):
+        # files of this prefix from an earlier run: plain names and numbered shards
+        directory, base = os.path.split(self.prefix)
+        pattern = re.compile(re.escape(base) + r"(_\d{3})?(_meta)?" + re.escape(self.ext) + "$")
+        return [os.path.join(directory, fname) for fname in os.listdir(directory or ".") if pattern.match(fname)]
+
+    def close(self):
+        if not self.shards:
+            # nothing written: empty files
+            self._next_shard()
+        self._close_files()
+        final = [self._paths()] if len(self.shards) == 1 else [self._paths(i + 1) for i in range(len(self.shards))]
+        for path in self._stale():
+            if path not in {p for pair in final for p in pair}:
+                os.remove(path)
+        for (data_path, meta_path, _, _), (final_data, final_meta) in zip(self.shards, final):
+            os.replace(data_path + ".tmp", final_data)
+            os.replace(meta_path + ".tmp", final_meta)
+        return [data_path for data_path, _ in final]
+
+    def abort(self):
+        # drops the files of this run; the files of the previous run stay as they were
+        self._close_files()
+        for data_path, meta_path, _, _ in self.shards:
+            for path in (data_path, meta_path):
+                if os.path.exists(path + ".tmp"):
+                    os.remove(path + ".tmp")
+        self.shards = []
@@ -1,7 +1,15 @@
 import os
+import sys
 import json
 from copy import deepcopy
 from openai import OpenAI
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Batch processing"))
+from batch_writer import ShardedBatchWriter, io_pairs
+from response_cache import ResponseCache, CachedOutputWriter
+from request_index import RequestIndex
+from realtime_client import RealtimeClient, run_directory
+from local_backend import HFBackend
+from batch_orchestrator import BatchOrchestrator
 
 with open("C_example.txt", "r") as file:
 	C_example = file.read()
@@ -34,10 +42,29 @@ ontology_list = {file.split("_")[0]: {"description":os.path.join(directory_path,
 for file in os.listdir("Axiom_per_entity"):
     ontology_list[file.split("_")[0]]["axiom"]=os.path.join("Axiom_per_entity", file)
 
+# requests answered before (same model/messages/max_tokens) are not sent again; their
+# responses go to Batchoutput/<ontology>_output_000.jsonl
+USE_CACHE = True
+cache = ResponseCache() if USE_CACHE else None
+
+def add_request(batches, cached, request):
+    record = cache.output_record(request) if cache is not None else None
+    if record is not None:
+        cached.write(record)
+    else:
+        batches.write(request)
+
+# custom_id -> (ontology, section, entity), for joining the descriptions back to their entities
+index = RequestIndex("description")
+
 data_num = 0
 for ontology in ontology_list:
-    batches = []
+    # requests are streamed into Batchinput/<ontology>_batchinput[_NNN].jsonl shards
+    # the cache writer is opened first: it compares the batch input before and after this run
+    cached = CachedOutputWriter("Batchoutput/"+ontology+'_output.jsonl', "Batchinput/"+ontology+'_batchinput.jsonl')
+    batches = ShardedBatchWriter("Batchinput/"+ontology+'_batchinput.jsonl')
     cls_num, pro_num = 0, 0
+    index.clear(ontology)
     with open(ontology_list[ontology]["description"], "r") as f:
         temp_desc=json.load(f)
     with open(ontology_list[ontology]["axiom"], "r") as f:
@@ -49,8 +76,9 @@ for ontology in ontology_list:
         temp["body"]["messages"].append({"role": "user", "content": "Axiom: "+str(temp_axiom["classes"][cls])})
         if cls in temp_desc["classes"]: temp["body"]["messages"].append({"role": "user", "content": "Current description: "+str(temp_desc["classes"][cls])})
         temp["body"]["messages"].append({"role": "user", "content": "Generated description: "})
-        batches.append(temp)
-    cls_num=len(batches)
+        add_request(batches, cached, temp)
+        index.add(temp["custom_id"], ontology, cls, cls, "classes", source=batches.path)
+        cls_num+=1
     print(f"Ontology name: {ontology}, {cls_num} classes")
     for prop in temp_axiom["properties"]:
         temp = deepcopy(init_template("property", P_example))
@@ -60,36 +88,44 @@ for ontology in ontology_list:
         if prop in temp_desc["properties"]: temp["body"]["messages"].append({"role": "user", "content": "Current description: "+str(temp_desc["properties"][prop])})
         temp["body"]["messages"].append({"role": "user", "content": "Generated description: "})
         pro_num+=1
-        batches.append(temp)
+        add_request(batches, cached, temp)
+        index.add(temp["custom_id"], ontology, prop, prop, "properties", source=batches.path)
     
-    pro_num=len(batches)-cls_num
     print(f"Ontology name: {ontology}, {pro_num} properties")
-    # Save the batches to a JSONL file
-    with open("Batchinput/"+ontology+'_batchinput.jsonl', 'w', encoding='utf-8') as file:
-        for item in batches:
-            json_string = json.dumps(item, ensure_ascii=False)
-            file.write(json_string + '\n')
-    print(f"Ontology name: {ontology}, Number of batches: {len(batches)}")
-    data_num += len(batches)
+    batches.close()
+    cached.close()
+    print(f"Ontology name: {ontology}, Number of batches: {cls_num + pro_num}, cached: {cached.count}, shards: {len(batches.shards)}")
+    if cached.retired:
+        print(f"Ontology name: {ontology}, batch input changed: {len(cached.retired)} earlier output files moved to Batchoutput/stale/")
+    data_num += cls_num + pro_num
+index.close()
 print(f"Total number of batches: {data_num}")
     
 
-client = OpenAI(api_key="")
-
-for ontology in os.listdir("Batchinput"):
-  if ontology.endswith("stuff_batchinput.jsonl"):
-    with open(os.path.join("Batchinput", ontology), "rb") as file:
-      batch_input_file = client.files.create(
-        file=file, 
-        purpose="batch"
-      )
-    batch_input_file_id = batch_input_file.id
+# BACKEND: "batch" submits 24h OpenAI batch jobs; "realtime" sends the requests now, concurrently
+# within RPM/TPM limits; "local" runs them through a Hugging Face causal LM (LOCAL_MODEL) on this
+# machine (GPU if available, otherwise CPU). "realtime" and "local" write the answers to Batchoutput/
+# in the batch output schema.
+BACKEND = "batch"
+LOCAL_MODEL = "Qwen/Qwen2.5-0.5B-Instruct"
+# batch jobs are tracked in batch_ledger.json. WAIT_FOR_BATCHES polls them here until they are finished;
+# otherwise `python "../../Batch processing/batch_orchestrator.py" run` (or `step`) later polls, downloads the outputs
+# into Batchoutput/ and resubmits failed requests
+WAIT_FOR_BATCHES = False
 
-# Create a batch job
-    client.batches.create(
-      input_file_id=batch_input_file_id,
-      endpoint="/v1/chat/completions",
-      completion_window="24h", 
-            )
-  else:
-    print(f"Skipping non-JSONL file: {ontology}")
\ No newline at end of file
+if BACKEND == "realtime":
+    run_directory("Batchinput", "Batchoutput", RealtimeClient(rpm=500, tpm=200000))
+elif BACKEND == "local":
+    HFBackend(LOCAL_MODEL).run_directory("Batchinput", "Batchoutput")
+else:
+    orchestrator = BatchOrchestrator(OpenAI(api_key=""), "batch_ledger.json")
+    for input_path, output_path in io_pairs("Batchinput", "Batchoutput"):
+        if os.path.basename(input_path).startswith("stuff_batchinput"):
+            orchestrator.add(input_path, output_path)
+        else:
+            print(f"Skipping non-JSONL file: {input_path}")
+    if WAIT_FOR_BATCHES:
+        orchestrator.run()
+    else:
+        orchestrator.step()
+    print(orchestrator.summary())
@@ -1,21 +1,25 @@
 import os
-import json
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Batch processing"))
+from batch_writer import group_shards
+from batch_output import process_outputs, description_parser
+from response_cache import ResponseCache
+from request_index import RequestIndex
 
 batchoutput_directory = "Batchoutput"
-jsonl_files = [file for file in os.listdir(batchoutput_directory) if file.endswith(".jsonl")]
+# shards of one output (stuff_output_001.jsonl, ...) are read as one file
+jsonl_files = group_shards(batchoutput_directory)
 
-for jsonl_file in jsonl_files:
-    loaded_data = []
-    file_path = os.path.join(batchoutput_directory, jsonl_file)
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            temp_data = json.loads(line)
-            temp_out = {"class": temp_data["custom_id"].split("_",1)[1], "description": temp_data["response"]["body"]["choices"][0]["message"]["content"]}
-            loaded_data.append(temp_out)
-    # Save the loaded data to a new jsonl file
-    output_file_path = os.path.join("generated description", f"{jsonl_file}")
-    with open(output_file_path, "w", encoding="utf-8") as f:
-        for item in loaded_data:
-            json_string = json.dumps(item, ensure_ascii=False)
-            f.write(json_string + '\n')
-    print(f"Loaded {len(loaded_data)} records from {len(jsonl_files)} JSONL files.")
\ No newline at end of file
+if __name__ == "__main__":
+    # the output files are parsed in parallel and streamed record by record into generated description/
+    # class / property names are looked up in the request index written by description_generation.py
+    with RequestIndex("description") as index:
+        stats = process_outputs(jsonl_files, description_parser, "generated description", index=index)
+    for jsonl_file, file_stats in stats.items():
+        if file_stats["failed"]:
+            print(f"⚠️ {jsonl_file}: {len(file_stats['failed'])} errored responses, e.g. {file_stats['failed'][0]}")
+        print(f"Loaded {file_stats['written']} records from {file_stats['shards']} JSONL files.")
+
+    # successful responses are kept for the next run of description_generation.py
+    with ResponseCache() as cache:
+        print(f"Response cache: {cache.add_outputs('Batchinput', batchoutput_directory)} responses stored")
@@ -0,0 +1,242 @@
+import os
+import json
+import argparse
+
+# ——————————————
+# Columnar intermediate format for the nested stage files (total_data, type classification/type*,
+# processed types/*, merged dataset/*): {ontology: {section: {entity: info}}} is stored as a table
+# with one row per entity axiom (relation, expression) and the CQs generated for it. Columns:
+#   ontology, section, entity, relation, expression, axiom, CQ, cq_position, description, type, extra
+# `extra` is the JSON of the remaining entity fields (Target CQ, Valid CQ, removed axiom, ...) and
+# keeps their order, so a table converts back to exactly the nested dict. CQs of axioms that are no
+# longer in the entity's axiom dict (e.g. removed by an injection) get rows without relation.
+# The stages save and load through `save` / `load`. With INTERMEDIATE_FORMAT=parquet (or arrow) in
+# the environment, "x.json" is written and read as "x.parquet" ("x.arrow"); the default stays JSON.
+# Parquet files are read with memory mapping, Arrow IPC files are memory-mapped without copying;
+# `read_table(path, columns)` reads only the given columns, and `load(path, columns)` builds the
+# entities from them (e.g. only "axiom" for a stage that needs no CQs or descriptions).
+# pyarrow is imported only when needed.
+FORMAT = os.environ.get("INTERMEDIATE_FORMAT", "json")
+EXTENSIONS = {"json": ".json", "parquet": ".parquet", "arrow": ".arrow"}
+if FORMAT not in EXTENSIONS:
+    raise ValueError(f"INTERMEDIATE_FORMAT must be one of {', '.join(EXTENSIONS)}, not {FORMAT!r}")
+COLUMNS = ["ontology", "section", "entity", "relation", "expression", "axiom", "CQ", "cq_position",
+           "description", "type", "extra"]
+KEY_COLUMNS = ["ontology", "section", "entity"]
+# entity fields stored in their own columns; all other fields are in `extra`
+FIELD_COLUMNS = {"axiom": ["relation", "expression"], "CQ": ["axiom", "CQ", "cq_position"],
+                 "description": ["description"], "type": ["type"]}
+
+
+def schema():
+    import pyarrow as pa
+    label = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([("ontology", label), ("section", label), ("entity", pa.string()), ("relation", label),
+                      ("expression", pa.string()), ("axiom", pa.string()), ("CQ", pa.list_(pa.string())),
+                      ("cq_position", pa.int32()), ("description", pa.string()), ("type", label),
+                      ("extra", pa.string())])
+
+
+def stage_path(path):
+    # "type1.json" -> "type1.parquet" when INTERMEDIATE_FORMAT=parquet; other names are kept
+    root, ext = os.path.splitext(path)
+    return root + EXTENSIONS[FORMAT] if ext == ".json" else path
+
+
+def entity_rows(ontology, section, entity, info, type=None):
+    """Table rows of one entity (see the columns above)."""
+    axioms = info.get("axiom") if isinstance(info.get("axiom"), dict) else None
+    cq_entries = info.get("CQ") if isinstance(info.get("CQ"), list) else None
+    extra = dict(info)
+    for key, columnar in (("axiom", axioms), ("CQ", cq_entries)):
+        if columnar is not None:
+            extra[key] = None
+    if "description" in extra:
+        extra["description"] = None
+    base = {"ontology": ontology, "section": section, "entity": entity, "description": info.get("description"),
+            "type": info.get("type", type), "extra": json.dumps(extra, ensure_ascii=False)}
+
+    # CQ entries by axiom string; each entry is used by one row
+    pending = {}
+    for position, entry in enumerate(cq_entries or []):
+        pending.setdefault(entry["axiom"], []).append(position)
+    rows = []
+    for relation, expressions in (axioms or {}).items():
+        if not expressions:
+            rows.append(dict(base, relation=relation, expression=None, axiom=None, CQ=None, cq_position=None))
+        for expression in expressions:
+            axiom = f"{entity} {relation} {expression}"
+            positions = pending.get(axiom)
+            position = positions.pop(0) if positions else None
+            rows.append(dict(base, relation=relation, expression=expression, axiom=axiom, cq_position=position,
+                             CQ=cq_entries[position]["CQ"] if position is not None else None))
+    for axiom, positions in pending.items():
+        for position in positions:
+            rows.append(dict(base, relation=None, expression=None, axiom=axiom, CQ=cq_entries[position]["CQ"],
+                             cq_position=position))
+    if not rows:
+        rows.append(dict(base, relation=None, expression=None, axiom=None, CQ=None, cq_position=None))
+    return rows
+
+
+def iter_rows(data, type=None):
+    # rows of a nested {ontology: {section: {entity: info}}} dict; empty sections get one row without entity
+    for ontology, sections in data.items():
+        if not sections:
+            yield {"ontology": ontology}
+        for section, entities in sections.items():
+            if not entities:
+                yield {"ontology": ontology, "section": section}
+            for entity, info in entities.items():
+                yield from entity_rows(ontology, section, entity, info, type)
+
+
+def selected_fields(columns):
+    # entity fields that `columns` make up; None for all fields
+    if columns is None:
+        return None
+    fields = {field for field, needed in FIELD_COLUMNS.items() if set(needed) <= set(columns)}
+    return fields | {"extra"} if "extra" in columns else fields
+
+
+def nest_rows(rows, columns=None):
+    """
+    The nested dict of table rows (inverse of `iter_rows`). Rows read with only some `columns`
+    give entities with only the fields those columns make up (see FIELD_COLUMNS).
+    """
+    fields = selected_fields(columns)
+    data, parts = {}, {}
+    for row in rows:
+        sections = data.setdefault(row["ontology"], {})
+        if row.get("section") is None:
+            continue
+        entities = sections.setdefault(row["section"], {})
+        if row.get("entity") is None:
+            continue
+        key = (row["ontology"], row["section"], row["entity"])
+        if key not in parts:
+            if fields is None or "extra" in fields:
+                info = json.loads(row["extra"])
+                for field in FIELD_COLUMNS:
+                    if fields is not None and field not in fields and info.get(field, "") is None:
+                        del info[field]
+            else:
+                info = {field: None for field in FIELD_COLUMNS if field in fields}
+            entities[row["entity"]] = info
+            parts[key] = ({}, [], row.get("description"), row.get("type"))
+        axioms, cq_entries, _, _ = parts[key]
+        if row.get("relation") is not None:
+            expressions = axioms.setdefault(row["relation"], [])
+            if row.get("expression") is not None:
+                expressions.append(row["expression"])
+        if row.get("cq_position") is not None:
+            cq_entries.append((row["cq_position"], {"axiom": row["axiom"], "CQ": row["CQ"]}))
+    for (ontology, section, entity), (axioms, cq_entries, description, type) in parts.items():
+        info = data[ontology][section][entity]
+        if "axiom" in info and info["axiom"] is None:
+            info["axiom"] = axioms
+        if "CQ" in info and info["CQ"] is None:
+            info["CQ"] = [entry for _, entry in sorted(cq_entries, key=lambda item: item[0])]
+        if "description" in info and info["description"] is None:
+            info["description"] = description
+        if "type" in info and info["type"] is None:
+            info["type"] = type
+        if fields is not None and "extra" not in fields:
+            # without `extra` the columns do not tell an absent field from a null one; absent is assumed
+            for field in ("description", "type"):
+                if field in info and info[field] is None:
+                    del info[field]
+    return data
+
+
+def project(data, columns):
+    # nested JSON data reduced to the fields of `columns`, as `nest_rows` builds them from a table
+    fields = selected_fields(columns)
+    result = {}
+    for ontology, sections in data.items():
+        result[ontology] = {}
+        for section, entities in sections.items():
+            result[ontology][section] = {}
+            for entity, info in entities.items():
+                if "extra" in fields:
+                    kept = {k: v for k, v in info.items() if k not in FIELD_COLUMNS or k in fields}
+                else:
+                    kept = {k: v for k, v in info.items() if k in fields}
+                result[ontology][section][entity] = kept
+    return result
+
+
+def write_table(data, path, type=None):
+    """Writes nested `data` as a Parquet (".parquet") or Arrow IPC (".arrow") table."""
+    import pyarrow as pa
+    table = pa.Table.from_pylist([dict(dict.fromkeys(COLUMNS), **row) for row in iter_rows(data, type)], schema=schema())
+    if path.endswith(".arrow"):
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+
+
+def read_table(path, columns=None, filters=None):
+    """
+    pyarrow Table of a ".parquet" / ".arrow" stage file, memory-mapped, with only `columns` if given.
+    `filters` (pyarrow.parquet filters, e.g. [("type", "=", "Type1")]) are applied while reading Parquet.
+    """
+    import pyarrow as pa
+    if path.endswith(".arrow"):
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        return table.select(columns) if columns else table
+    import pyarrow.parquet as pq
+    return pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+
+
+def save(data, path, indent=2, type=None):
+    """Saves a stage file: JSON as before, or a table (see INTERMEDIATE_FORMAT). Returns the path written."""
+    path = stage_path(path)
+    if path.endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+    else:
+        write_table(data, path, type)
+    return path
+
+
+def load(path, columns=None):
+    """
+    Loads a stage file as the nested dict. With `columns` (names of COLUMNS), a table file is read
+    with only those columns (plus ontology, section, entity), memory-mapped, and the entities hold only
+    the fields they make up, e.g. columns=["relation", "expression"] -> {"axiom": {...}}. JSON files
+    are read whole and reduced to the same fields.
+    """
+    path = stage_path(path)
+    if columns is not None:
+        columns = KEY_COLUMNS + [column for column in columns if column not in KEY_COLUMNS]
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if columns is None else project(data, columns)
+    return nest_rows(read_table(path, columns).to_pylist(), columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert stage files between JSON and Parquet / Arrow.")
+    parser.add_argument("input", help="e.g. total_data.json or total_data.parquet")
+    parser.add_argument("output", help="e.g. total_data.parquet, or total_data.json to export")
+    parser.add_argument("--indent", type=int, default=2)
+    args = parser.parse_args()
+    if args.input.endswith(".json"):
+        with open(args.input, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        data = nest_rows(read_table(args.input).to_pylist())
+    if args.output.endswith(".json"):
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=args.indent)
+    else:
+        write_table(data, args.output)
+    print(f"✔️ {args.input} → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
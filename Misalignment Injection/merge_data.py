@@ -1,15 +1,16 @@
-import json, os
+import os
 import random
-import copy
-total_dataset = {}
-train_dataset = {}
-test_dataset = {}
-# Load JSON files from the "Final types" directory
-final_types_directory = "processed types"
-for file_name in os.listdir(final_types_directory):
-    if file_name.endswith(".json"):  
-        with open(os.path.join(final_types_directory, file_name), "r", encoding="utf-8") as json_file:
-            temp_dataset = json.load(json_file)
+from entity_table import FORMAT, EXTENSIONS, load, save
+from cq_index import NEAR_DUPLICATES, split_leaks
+from dataset_writer import DatasetWriter, encode_record
+def merge_processed_types(final_types_directory="processed types"):
+    total_dataset = {}
+    train_dataset = {}
+    test_dataset = {}
+    # Load JSON (or parquet / arrow, see INTERMEDIATE_FORMAT) files from the "Final types" directory
+    for file_name in os.listdir(final_types_directory):
+        if file_name.endswith(EXTENSIONS[FORMAT]):
+            temp_dataset = load(os.path.join(final_types_directory, file_name))
             for ontology in temp_dataset:
                 if ontology not in total_dataset:
                     total_dataset[ontology] = {}
@@ -40,13 +41,7 @@ for file_name in os.listdir(final_types_directory):
 
                     for cp in train_items: train_dataset[ontology][classorprop][cp] = train_items[cp]
                     for cp in test_items: test_dataset[ontology][classorprop][cp] = test_items[cp]
-# Save the merged data to a new JSON file
-with open("merged dataset/Final_dataset.json", "w", encoding="utf-8") as json_file:
-    json.dump(total_dataset, json_file, indent=4, ensure_ascii=False)
-with open("merged dataset/Final_train_dataset.json", "w", encoding="utf-8") as json_file:
-    json.dump(train_dataset, json_file, indent=4, ensure_ascii=False)
-with open("merged dataset/Final_test_dataset.json", "w", encoding="utf-8") as json_file:
-    json.dump(test_dataset, json_file, indent=4, ensure_ascii=False)
+    return total_dataset, train_dataset, test_dataset
 
 def dataset_construct(ontology, type, class_name,description, axiom, TCQ, VCQ, Taxiom, datatype, CQ):
     return {"data":{"input": f"""As an ontology engineer, generate a list of competency questions based on the following description and axiom.
@@ -68,45 +63,79 @@ Generated CQs:""",
             "Taxiom": Taxiom,
             "CQ" : CQ
                 }}
-def save_dataset(dataset, output_path):
-    for ontology in dataset:
-        for classorprop in dataset[ontology]:
-            for cp in dataset[ontology][classorprop]:
-                if classorprop == "classes":
-                    type = "Class"
-                else:
-                    type = "Property"
-                axiom = dataset[ontology][classorprop][cp]["axiom"]
-                description = dataset[ontology][classorprop][cp]["description"]
-                TCQ = dataset[ontology][classorprop][cp]["Target CQ"]
-                VCQ = dataset[ontology][classorprop][cp]["Valid CQ"]
-                Taxiom = dataset[ontology][classorprop][cp]["removed axiom"] if "removed axiom" in dataset[ontology][classorprop][cp] else "None"
-                datatype = dataset[ontology][classorprop][cp]["type"]
-                CQ = dataset[ontology][classorprop][cp]["CQ"]
-                for cq in TCQ:
-                    if cq not in VCQ:
-                        VCQ.append(cq)
-                line_data = dataset_construct(ontology, type, cp,description,axiom, TCQ, VCQ, Taxiom, datatype, CQ)["data"]
-                line_metadata = dataset_construct(ontology, type, cp,description,axiom, TCQ, VCQ, Taxiom, datatype, CQ)["metadata"]
-                with open(f"{output_path}.jsonl", "a", encoding="utf-8") as jsonl_file:
-                    jsonl_file.write(json.dumps(line_data, ensure_ascii=False) + "\n")
-                with open(f"{output_path}_meta.jsonl", "a", encoding="utf-8") as jsonl_file:
-                    jsonl_file.write(json.dumps(line_metadata, ensure_ascii=False) + "\n")
-save_dataset(train_dataset, "train_dataset")
-save_dataset(test_dataset, "test_dataset")
+def build_record(ontology, classorprop, cp, info):
+    # (training line, metadata line) of one entity; Target CQs are added to (a copy of) its Valid CQs
+    if classorprop == "classes":
+        type = "Class"
+    else:
+        type = "Property"
+    axiom = info["axiom"]
+    description = info["description"]
+    TCQ = info["Target CQ"]
+    VCQ = list(info["Valid CQ"])
+    Taxiom = info["removed axiom"] if "removed axiom" in info else "None"
+    datatype = info["type"]
+    CQ = info["CQ"]
+    for cq in TCQ:
+        if cq not in VCQ:
+            VCQ.append(cq)
+    record = dataset_construct(ontology, type, cp,description,axiom, TCQ, VCQ, Taxiom, datatype, CQ)
+    return record["data"], record["metadata"]
 
-#Generalizablility setting(unseen ontology)
-onto_list = {"AWO": ["AfricanWildlifeOntology1"],
-"OntoDT": ["OntoDT"],"SWO": ["swo"],"Pizza": ["pizza"],"Stuff": ["stuff"],
-"DEM@Care": ["lab", "time", "home", "exchangemodel", "event"]}
-with open("merged dataset/Final_dataset.json", "r", encoding="utf-8") as json_file:
-    total_data = json.load(json_file)
 
-for onto in onto_list:
-    temp_train = copy.deepcopy(total_data)
-    temp_test = {}
-    for owl in onto_list[onto]:
-        temp_test[owl] = copy.deepcopy(total_data[owl])
-        del temp_train[owl]
-    save_dataset(temp_train, f"additional settings/Generalizability/unseen ontology/{onto}/train_dataset")
-    save_dataset(temp_test, f"additional settings/Generalizability/unseen ontology/{onto}/test_dataset")
\ No newline at end of file
+def encode_dataset(dataset):
+    # {ontology: [(training line, metadata line), ...]}, each record built and serialized once
+    return {ontology: [encode_record(*build_record(ontology, classorprop, cp, info))
+                       for classorprop in dataset[ontology]
+                       for cp, info in dataset[ontology][classorprop].items()]
+            for ontology in dataset}
+
+
+def save_dataset(dataset, output_path, compress=False, max_bytes=None, encoded=None):
+    """
+    Writes `output_path`.jsonl / `output_path`_meta.jsonl (replacing an earlier run, see dataset_writer.py).
+    `encoded` (from `encode_dataset`) supplies already serialized records of the ontologies.
+    """
+    with DatasetWriter(output_path, compress, max_bytes) as writer:
+        for ontology in dataset:
+            for lines in encoded[ontology] if encoded is not None else encode_dataset({ontology: dataset[ontology]})[ontology]:
+                writer.write_lines(*lines)
+
+
+def main():
+    total_dataset, train_dataset, test_dataset = merge_processed_types()
+    # Test Target CQs that near-duplicate a train Target CQ (see cq_index.py); with
+    # CQ_NEAR_DUPLICATES=drop their test entities are left out of the test split
+    if NEAR_DUPLICATES != "off":
+        leaks = split_leaks(train_dataset, test_dataset)
+        leaking = {(leak["ontology"], leak["section"], leak["entity"]) for leak in leaks}
+        print(f"near-duplicate Target CQs between test and train ({NEAR_DUPLICATES}): {len(leaks)} in {len(leaking)} test entities")
+        for leak in leaks[:5]:
+            print(f"  {leak['ontology']}/{leak['entity']}: {leak['CQ']} ~ {'/'.join(leak['train entity'][::2])}: {leak['train CQ']}")
+        if NEAR_DUPLICATES == "drop":
+            for ontology, section, entity in leaking:
+                del test_dataset[ontology][section][entity]
+    # Save the merged data to new JSON (or parquet / arrow) files
+    save(total_dataset, "merged dataset/Final_dataset.json", indent=4)
+    save(train_dataset, "merged dataset/Final_train_dataset.json", indent=4)
+    save(test_dataset, "merged dataset/Final_test_dataset.json", indent=4)
+    save_dataset(train_dataset, "train_dataset")
+    save_dataset(test_dataset, "test_dataset")
+
+    #Generalizablility setting(unseen ontology)
+    onto_list = {"AWO": ["AfricanWildlifeOntology1"],
+    "OntoDT": ["OntoDT"],"SWO": ["swo"],"Pizza": ["pizza"],"Stuff": ["stuff"],
+    "DEM@Care": ["lab", "time", "home", "exchangemodel", "event"]}
+    total_data = load("merged dataset/Final_dataset.json")
+    # every record is serialized once and reused by all folds
+    encoded = encode_dataset(total_data)
+
+    for onto in onto_list:
+        temp_train = {owl: total_data[owl] for owl in total_data if owl not in onto_list[onto]}
+        temp_test = {owl: total_data[owl] for owl in onto_list[onto]}
+        save_dataset(temp_train, f"additional settings/Generalizability/unseen ontology/{onto}/train_dataset", encoded=encoded)
+        save_dataset(temp_test, f"additional settings/Generalizability/unseen ontology/{onto}/test_dataset", encoded=encoded)
+
+
+if __name__ == "__main__":
+    main()
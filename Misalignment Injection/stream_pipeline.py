@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import random
+import sqlite3
+import argparse
+import resource
+import tempfile
+import importlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "..", "Template-based CQ generation"))
+sys.path.append(os.path.join(HERE, "Type2 processing"))
+sys.path.append(os.path.join(HERE, "..", "Batch processing"))
+import Ontology_processing
+import graph_snapshot
+from Type_classify import TypeBalancer, axiom_entity
+from type3_processing import inject_type3
+from type4_processing import inject_type4
+from merge_data import build_record
+from type2_description_postprocessing import restore_removed_axiom
+from request_index import INDEX_PATH
+inject_type1 = importlib.import_module("type1,2_processing").inject_type1
+
+# ——————————————
+# Streaming end-to-end mode: axiom extraction -> type assignment -> misalignment injection ->
+# dataset rows, one entity at a time. Generated CQs and descriptions are joined through an
+# on-disk SQLite index instead of per-ontology dicts (a CQ goes to the entity its axiom was
+# requested for in the request index of CQ_generation.py), the type balancer only keeps counts and
+# every row is written as soon as it is built, so memory is bounded by the parsed graph
+# (use --backend intstore for the smallest footprint) and no 500-entity sample is needed.
+ONTOLOGY_DIR = os.path.join(HERE, "..", "Template-based CQ generation", "Ontology")
+CQ_DIR = os.path.join(HERE, "Generated CQ")
+DESCRIPTION_DIR = os.path.join(HERE, "generated description")
+OUTPUT_DIR = os.path.join(HERE, "stream dataset")
+TRAIN_RATIO = 0.9
+
+
+def ontology_key(file_name):
+    # same key as Type_classify: "swo_merged_axiom.json" / "swo_output.jsonl" / "swo_merged.owl" -> "swo"
+    return os.path.splitext(os.path.basename(file_name))[0].split("_")[0]
+
+
+class JoinIndex:
+    """
+    SQLite index of the generated CQs and descriptions, keyed by (ontology, entity).
+    The jsonl files are read line by line, so only the current entity's rows are ever in memory.
+    The entity of a CQ record comes from the "cq" stage of the request index (`request_index`),
+    which maps every requested axiom to the entity it was generated for; only axioms missing
+    there fall back to parsing the entity out of the axiom string.
+    """
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cq (ontology TEXT, entity TEXT, axiom TEXT, cq TEXT);
+            CREATE TABLE IF NOT EXISTS description (ontology TEXT, entity TEXT, description TEXT,
+                                                    PRIMARY KEY (ontology, entity));
+            CREATE TABLE IF NOT EXISTS type2_description (entity TEXT PRIMARY KEY, description TEXT);
+        """)
+
+    def load_cqs(self, cq_dir, request_index=INDEX_PATH):
+        for fname in sorted(os.listdir(cq_dir)):
+            ontology = ontology_key(fname)
+            with open(os.path.join(cq_dir, fname), "r", encoding="utf-8") as f:
+                rows = ((ontology, line["axiom"], json.dumps(line["CQ"], ensure_ascii=False)) for line in map(json.loads, f))
+                self.conn.executemany("INSERT INTO cq (ontology, axiom, cq) VALUES (?, ?, ?)", rows)
+        if request_index and os.path.exists(request_index):
+            self.conn.execute("ATTACH DATABASE ? AS requests", (request_index,))
+            self.conn.executescript("""
+                CREATE TEMP TABLE axiom_entity AS
+                    SELECT ontology, key AS axiom, MIN(entity) AS entity FROM requests.requests
+                    WHERE stage = 'cq' AND entity IS NOT NULL GROUP BY ontology, key;
+                CREATE INDEX temp.axiom_entity_key ON axiom_entity (ontology, axiom);
+                UPDATE cq SET entity = (SELECT entity FROM axiom_entity
+                                        WHERE axiom_entity.ontology = cq.ontology AND axiom_entity.axiom = cq.axiom);
+                DROP TABLE axiom_entity;
+            """)
+            self.conn.commit()
+            self.conn.execute("DETACH DATABASE requests")
+        # CQs generated before the request index existed
+        self.conn.create_function("axiom_entity", 1, axiom_entity)
+        self.unindexed_cqs = self.conn.execute("UPDATE cq SET entity = axiom_entity(axiom) WHERE entity IS NULL").rowcount
+        self.conn.execute("CREATE INDEX IF NOT EXISTS cq_entity ON cq (ontology, entity)")
+        self.conn.commit()
+
+    def load_descriptions(self, description_dir):
+        for fname in sorted(os.listdir(description_dir)):
+            ontology = ontology_key(fname)
+            with open(os.path.join(description_dir, fname), "r", encoding="utf-8") as f:
+                rows = ((ontology, line["class"], line["description"]) for line in map(json.loads, f))
+                # later lines win, as in Type_classify.load_total_data
+                self.conn.executemany("INSERT OR REPLACE INTO description VALUES (?, ?, ?)", rows)
+        self.conn.commit()
+
+    def load_type2_descriptions(self, path):
+        # Type2 processing/Generated_description.jsonl: regenerated descriptions, keyed by entity only
+        with open(path, "r", encoding="utf-8") as f:
+            rows = ((line["class"], line["description"]) for line in map(json.loads, f))
+            self.conn.executemany("INSERT OR REPLACE INTO type2_description VALUES (?, ?)", rows)
+        self.conn.commit()
+
+    def cqs(self, ontology, entity):
+        cur = self.conn.execute("SELECT axiom, cq FROM cq WHERE ontology = ? AND entity = ? ORDER BY rowid",
+                                (ontology, entity))
+        return [{"axiom": axiom, "CQ": json.loads(cq)} for axiom, cq in cur]
+
+    def description(self, ontology, entity):
+        row = self.conn.execute("SELECT description FROM description WHERE ontology = ? AND entity = ?",
+                                (ontology, entity)).fetchone()
+        return row[0] if row else None
+
+    def type2_description(self, entity):
+        row = self.conn.execute("SELECT description FROM type2_description WHERE entity = ?", (entity,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
+
+
+def inject(target, name, info, section, index, rng):
+    """
+    Applies the misalignment of type `target` (0 = Type1 ... 3 = Type4) to one entity.
+    Returns "ok", "skipped" (injection not applicable) or "pending" (Type2 without a regenerated description).
+    """
+    if target in (0, 1):
+        if not inject_type1(name, info, section, rng):
+            return "skipped"
+        if target == 1:
+            description = index.type2_description(name)
+            if description is None:
+                return "pending"
+            info["description"] = description
+            restore_removed_axiom(info)
+    elif target == 2:
+        if not inject_type3(name, info, rng):
+            return "skipped"
+    else:
+        inject_type4(info, rng)
+    info["type"] = f"Type{target + 1}"
+    return "ok"
+
+
+def stream_ontology(file_path, index, balancer, writers, stats, backend="rdflib",
+                    snapshot_dir=graph_snapshot.SNAPSHOT_DIR, sample_size=0, seed=0):
+    ontology = ontology_key(file_path)
+    g = Ontology_processing.load_graph(file_path, snapshot_dir=snapshot_dir, backend=backend)
+    for section, name, axioms in Ontology_processing.iter_entity_axioms(g, file_path, sample_size=sample_size, seed=seed):
+        stats["entities"] += 1
+        # 1. join the generated CQs and description of this entity
+        cqs = index.cqs(ontology, name)
+        description = index.description(ontology, name)
+        if not cqs or description is None:
+            stats["no CQ/description"] += 1
+            continue
+        info = {"axiom": axioms, "description": description, "CQ": cqs}
+
+        # 2. type assignment and injection, with a per-entity seed
+        target = balancer.assign(section, info)
+        rng = random.Random(f"{seed}:{ontology}:{section}:{name}")
+        status = inject(target, name, info, section, index, rng)
+        if status == "pending":
+            writers["pending"].write(json.dumps({"ontology": ontology, "section": section, "name": name,
+                                                 "info": info}, ensure_ascii=False) + "\n")
+            stats["Type2 pending"] += 1
+            continue
+        if status == "skipped" or len(info["Target CQ"]) < 3:
+            stats["injection skipped"] += 1
+            continue
+
+        # 3. dataset row, split 9:1 per entity
+        line_data, line_metadata = build_record(ontology, section, name, info)
+        split = "train" if random.Random(f"{seed}:split:{ontology}:{name}").random() < TRAIN_RATIO else "test"
+        writers[split].write(json.dumps(line_data, ensure_ascii=False) + "\n")
+        writers[f"{split}_meta"].write(json.dumps(line_metadata, ensure_ascii=False) + "\n")
+        stats[split] += 1
+        stats[info["type"]] += 1
+
+
+def run(paths, output_dir=OUTPUT_DIR, cq_dir=CQ_DIR, description_dir=DESCRIPTION_DIR, type2_descriptions=None,
+        backend="rdflib", snapshot_dir=graph_snapshot.SNAPSHOT_DIR, sample_size=0, seed=0, request_index=INDEX_PATH):
+    """
+    Streams every ontology in `paths` into `output_dir`/{train,test}_dataset[_meta].jsonl.
+    Type2 entities whose regenerated description is not in `type2_descriptions` are written to
+    pending_type2.jsonl instead (input for Type2 processing/type2_description_generation.py).
+    Returns the counters, including the peak RSS of the process.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stats = {key: 0 for key in ("entities", "no CQ/description", "injection skipped", "Type2 pending",
+                                "train", "test", "Type1", "Type2", "Type3", "Type4")}
+    with tempfile.TemporaryDirectory() as tmp:
+        index = JoinIndex(os.path.join(tmp, "join.sqlite"))
+        index.load_cqs(cq_dir, request_index)
+        if index.unindexed_cqs:
+            print(f"⚠️ {index.unindexed_cqs} CQ records not in the request index; their entity is parsed from the axiom")
+        index.load_descriptions(description_dir)
+        if type2_descriptions:
+            index.load_type2_descriptions(type2_descriptions)
+
+        names = {"train": "train_dataset.jsonl", "train_meta": "train_dataset_meta.jsonl",
+                 "test": "test_dataset.jsonl", "test_meta": "test_dataset_meta.jsonl",
+                 "pending": "pending_type2.jsonl"}
+        writers = {key: open(os.path.join(output_dir, fname), "w", encoding="utf-8") for key, fname in names.items()}
+        balancer = TypeBalancer()
+        try:
+            for path in paths:
+                stream_ontology(path, index, balancer, writers, stats, backend, snapshot_dir, sample_size, seed)
+                print(f"✔️ {os.path.basename(path)} streamed ({stats['train']} train / {stats['test']} test rows so far)")
+        finally:
+            for w in writers.values():
+                w.close()
+            index.close()
+
+    stats["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream ontologies entity by entity into the misalignment dataset.")
+    parser.add_argument("ontologies", nargs="*",
+                        help="ontology files (default: every .owl/.ttl in the Template-based CQ generation Ontology directory)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--cq-dir", default=CQ_DIR)
+    parser.add_argument("--description-dir", default=DESCRIPTION_DIR)
+    parser.add_argument("--type2-descriptions", default=None,
+                        help="regenerated Type2 descriptions (Generated_description.jsonl); without it Type2 entities go to pending_type2.jsonl")
+    parser.add_argument("--request-index", default=INDEX_PATH,
+                        help="request index of CQ_generation.py (axiom -> entity of every CQ request)")
+    parser.add_argument("--backend", choices=("rdflib", "intstore"), default="rdflib")
+    parser.add_argument("--no-snapshot", action="store_true")
+    parser.add_argument("--sample-size", type=int, default=0,
+                        help="entities per ontology (0 = all, 500 = the Ontology_processing default)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = args.ontologies or [os.path.join(ONTOLOGY_DIR, f) for f in sorted(os.listdir(ONTOLOGY_DIR))
+                                if f.endswith(".owl") or f.endswith(".ttl")]
+    snapshot_dir = None if args.no_snapshot else graph_snapshot.SNAPSHOT_DIR
+    stats = run(paths, args.output_dir, args.cq_dir, args.description_dir, args.type2_descriptions,
+                args.backend, snapshot_dir, args.sample_size, args.seed, args.request_index)
+    for key, value in stats.items():
+        print(f"{key:<20} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,46 @@
-import json
 import random
-def process_type4(input_path='type classification/type4.json', output_path='Final_type4.json'):
+from entity_table import load, save
+from cq_index import NEAR_DUPLICATES, dedupe
+
+
+def distinct_cqs(info):
+    return list(dict.fromkeys(cq for entry in info.get('CQ', []) for cq in entry['CQ']))
+
+
+def inject_type4(info, rng=random, cqs=None):
+    """
+    Type-4 injection for one entity; returns True when it has more than 3 CQs.
+    `cqs` replaces the distinct CQs of the entity (e.g. with its near-duplicates removed).
+    """
+    temp_list = distinct_cqs(info) if cqs is None else list(cqs)
+
+    info['Target CQ'] = rng.sample(temp_list, min(3, len(temp_list)))
+    info['Valid CQ'] = temp_list
+    return len(temp_list) > 3
+
+
+def process_type4(input_path='type classification/type4.json', output_path='Final_type4.json', near_duplicates=NEAR_DUPLICATES):
     # 1. Load the original data
-    with open(input_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load(input_path)
     over2_axiom_num =0
+    near_duplicate_num = 0
     # 3. Process each ontology
     for ontology in data.values():
         for section in ('classes', 'properties'):
             for name, info in ontology.get(section, {}).items():
-                temp_list = []
-                for entry in info.get('CQ', []):
-                    for cq in entry['CQ']:
-                        if cq not in temp_list:
-                            temp_list.append(cq)
-
-                info['Target CQ'] = random.sample(temp_list, min(3, len(temp_list)))
-                info['Valid CQ'] = temp_list
-                if len(temp_list)>3: over2_axiom_num+=1
+                cqs = None
+                if near_duplicates != "off":
+                    kept, dropped = dedupe(distinct_cqs(info))
+                    near_duplicate_num += len(dropped)
+                    if near_duplicates == "drop":
+                        cqs = kept
+                if inject_type4(info, cqs=cqs): over2_axiom_num+=1
     print("over2_axiom_num: ", over2_axiom_num)
+    print(f"near-duplicate CQs ({near_duplicates}): ", near_duplicate_num)
                     
 
     # 4. Write out the processed file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-process_type4()
\ No newline at end of file
+    save(data, output_path)
+
+if __name__ == "__main__":
+    process_type4()
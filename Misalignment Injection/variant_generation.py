@@ -0,0 +1,141 @@
+import os
+import copy
+import json
+import random
+import argparse
+import itertools
+import importlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from entity_table import load
+from type3_processing import inject_type3
+from type4_processing import inject_type4
+from merge_data import build_record
+from dataset_writer import DatasetWriter
+inject_type1 = importlib.import_module("type1,2_processing").inject_type1
+
+# ——————————————
+# Multi-variant misalignment generation: K independent injections per entity of the type
+# classification files, without rerunning the LLM stages. Variant k of an entity is injected with
+# random.Random(variant_seed(seed, ontology, section, entity, k)); the seed string is recorded in the
+# row's metadata, so any single variant can be rebuilt bit-for-bit with `generate_variant`.
+# Entities are sent to a process pool in chunks of CHUNK_SIZE, at most WINDOW chunks per worker
+# in flight, and the rows are written as they come back, in input order. All variants of an entity go to the same split (9:1, per entity as in stream_pipeline.py),
+# so no test entity is seen in training. Type 2 is not expanded: every variant would remove a
+# different axiom and need its own regenerated description.
+TYPE_DIR = "type classification"
+OUTPUT_DIR = "variant dataset"
+TYPES = {"Type1": "type1.json", "Type3": "type3.json", "Type4": "type4.json"}
+TRAIN_RATIO = 0.9
+CHUNK_SIZE = 32
+WINDOW = 4
+
+
+def variant_seed(seed, ontology, section, name, variant):
+    return f"{seed}:{ontology}:{section}:{name}:{variant}"
+
+
+def generate_variant(datatype, ontology, section, name, info, variant, seed=0):
+    """Variant `variant` of one entity: an injected copy of `info`, or None when the injection does not apply."""
+    info = copy.deepcopy(info)
+    rng = random.Random(variant_seed(seed, ontology, section, name, variant))
+    if datatype == "Type1":
+        applied = inject_type1(name, info, section, rng)
+    elif datatype == "Type3":
+        applied = inject_type3(name, info, rng)
+    else:
+        inject_type4(info, rng)
+        applied = True
+    if not applied or len(info["Target CQ"]) < 3:
+        return None
+    info["type"] = datatype
+    return info
+
+
+def entity_rows(task):
+    """(split, [(training line, metadata line), ...]) for the K variants of one entity; duplicate variants are dropped."""
+    datatype, ontology, section, name, info, variants, seed = task
+    rows, seen = [], set()
+    for variant in range(variants):
+        injected = generate_variant(datatype, ontology, section, name, info, variant, seed)
+        if injected is None:
+            continue
+        line_data, line_metadata = build_record(ontology, section, name, injected)
+        key = json.dumps(line_data, ensure_ascii=False)
+        if key in seen:
+            continue
+        seen.add(key)
+        line_metadata["variant"] = variant
+        line_metadata["seed"] = variant_seed(seed, ontology, section, name, variant)
+        rows.append((line_data, line_metadata))
+    split = "train" if random.Random(f"{seed}:split:{ontology}:{name}").random() < TRAIN_RATIO else "test"
+    return split, rows
+
+
+def chunk_rows(tasks):
+    return [entity_rows(task) for task in tasks]
+
+
+def imap_rows(pool, tasks, workers, chunksize=CHUNK_SIZE, window=WINDOW):
+    """
+    entity_rows over `tasks` in `pool`, in order. Unlike pool.map, which submits the whole task
+    iterator up front, only `window` chunks per worker are pending at a time.
+    """
+    tasks = iter(tasks)
+    pending = deque()
+    while True:
+        chunk = list(itertools.islice(tasks, chunksize))
+        if chunk:
+            pending.append(pool.submit(chunk_rows, chunk))
+        if not pending:
+            return
+        if not chunk or len(pending) >= window * workers:
+            yield from pending.popleft().result()
+
+
+def iter_tasks(type_dir, variants, seed, types=TYPES):
+    for datatype, file_name in types.items():
+        data = load(os.path.join(type_dir, file_name))
+        for ontology, sections in data.items():
+            for section in ("classes", "properties"):
+                for name, info in sections.get(section, {}).items():
+                    yield datatype, ontology, section, name, info, variants, seed
+
+
+def run(variants=10, type_dir=TYPE_DIR, output_dir=OUTPUT_DIR, seed=0, workers=None, types=TYPES):
+    """
+    Writes `output_dir`/{train,test}_dataset[_meta].jsonl with up to `variants` rows per entity.
+    Returns the counters.
+    """
+    stats = {"entities": 0, "no variant": 0, "train": 0, "test": 0}
+    workers = workers or os.cpu_count() or 1
+    with DatasetWriter(os.path.join(output_dir, "train_dataset")) as train, \
+            DatasetWriter(os.path.join(output_dir, "test_dataset")) as test, \
+            ProcessPoolExecutor(workers) as pool:
+        writers = {"train": train, "test": test}
+        for split, rows in imap_rows(pool, iter_tasks(type_dir, variants, seed, types), workers):
+            stats["entities"] += 1
+            if not rows:
+                stats["no variant"] += 1
+            for line_data, line_metadata in rows:
+                writers[split].write(line_data, line_metadata)
+                stats[split] += 1
+                stats[line_metadata["datatype"]] = stats.get(line_metadata["datatype"], 0) + 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate K seeded misalignment variants per entity (Type 1, 3, 4).")
+    parser.add_argument("--variants", type=int, default=10, help="variants per entity (K)")
+    parser.add_argument("--type-dir", default=TYPE_DIR)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+    stats = run(args.variants, args.type_dir, args.output_dir, args.seed, args.workers)
+    for key, value in stats.items():
+        print(f"{key:<12} {value}")
+
+
+if __name__ == "__main__":
+    main()
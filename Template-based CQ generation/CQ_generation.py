@@ -1,127 +1,147 @@
 import os
+import sys
 import json
-from copy import deepcopy
 from openai import OpenAI
+from prompt_templates import TemplateRegistry, pack_axioms, prompt_tokens
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Batch processing"))
+from batch_writer import ShardedBatchWriter
+from response_cache import ResponseCache, CachedOutputWriter
+from request_index import RequestIndex
+from realtime_client import RealtimeClient, run_directory
+from local_backend import HFBackend
+from batch_orchestrator import BatchOrchestrator
+
+# templates are read once; request lines are assembled from pre-encoded shared parts
+registry = TemplateRegistry("templates")
+
 
-def load_templates(directory="templates"):
-    """
-    Read all .txt files in the given directory and return a dict
-    mapping filename (without .txt) to file content.
-    """
-    templates = {}
-    for filename in os.listdir(directory):
-        if filename.lower().endswith(".txt"):
-            key = os.path.splitext(filename)[0]
-            path = os.path.join(directory, filename)
-            with open(path, "r", encoding="utf-8") as f:
-                templates[key] = f.read()
-    return templates
 def init_template(axiom, axiom_relation):
-    if axiom_relation in ["domain", "range"]: template = load_templates()["domain_range"]
-    else: template = load_templates()[axiom_relation]
-    # Add a hint for the logic of the axiom
-    logic_hint = ""
-    if any(keyword in axiom for keyword in ["propertyRestrictions", "equivalentClass"]):
-        logic_hint = """
-        The axiom may include different logical structures. Determine whether it involves existential/universal restrictions (some/only) or intersection/union (and/or), and generate CQs accordingly.
-        """
-    elif any(keyword in axiom for keyword in ["domain", "range"]):
-        logic_hint = """
-        If the property’s domain or range is undefined (None), generate a Competency Question asking what can be the domain or range of the property, is it right that the property has no domain or range.
-        """
-    return {
-        "custom_id": None,  
-        "method": "POST",
-        "url": "/v1/chat/completions",
-        "body": {
-            "model": "gpt-4.1",  
-            "messages": [
-                {
-                    "role": "system",
-                    "content": f"""
-                    As an ontology engineer, generate a list of competency questions based on the following axiom and one-shot example.
-                    Definition of competency questions: the questions that outline the scope of ontology and provide an idea about the knowledge that needs to be entailed in the ontology.
-                    Avoid using narrative questions + axioms.
-                    Don't generate unnecessary text. Just return 3 distinct CQs separated by ' // '.
-                    Use the one-shot and known templates only as inspiration — do not copy them directly. Rephrase and vary the structure of each CQ while maintaining its logical intent.
-                    {logic_hint.strip()}
-                    """
-                },
-                {
-                    "role": "user",
-                    "content": f"""
-                    Generate competency questions including axioms and current template.
-                    Template: {template}
-                    Axiom: {axiom}
-                    """
-                },
-                {
-                    "role": "user",
-                    "content": "Generated CQs:"
-                }
-            ],
-            "max_tokens": 512
-        }
-    }
+    return registry.request(axiom, axiom_relation)
+
+
+# requests answered before (same model, messages and max_tokens) are not resubmitted;
+# their responses go to CQ_Batchoutput/<ontology>_output_000.jsonl instead
+USE_CACHE = True
+cache = ResponseCache() if USE_CACHE else None
+
+
+def add_request(batches, cached, axiom, axiom_relation, custom_id):
+    if cache is not None:
+        record = cache.output_record(registry.request(axiom, axiom_relation, custom_id))
+        if record is not None:
+            cached.write(record)
+            return
+    batches.write(registry.request_line(axiom, axiom_relation, custom_id), custom_id)
+
 
+# PACK_BY "entity" / "relation": up to PACK_SIZE axioms of one entity / one axiom type share a request
+# (system prompt and templates sent once, JSON answer split per axiom by CQ_postprocessing.py);
+# None: one request per axiom
+PACK_BY = None
+PACK_SIZE = 10
+
+
+def add_packed_request(batches, cached, axioms, custom_id):
+    request = registry.packed_request(axioms, custom_id)
+    record = cache.output_record(request) if cache is not None else None
+    if record is not None:
+        cached.write(record)
+    else:
+        batches.write(request)
+    return request
+
+
+# custom_id -> (ontology, section, entity, relation, axiom), for joining the outputs back to their axioms
+index = RequestIndex("cq")
 
 directory_path = "Axiom_per_entity"
 ontology_list = {file.split("_")[0]: os.path.join(directory_path, file) for file in os.listdir(directory_path)}
 
 
 data_num = 0
+packing_report = {}
 for ontology in ontology_list:
-    batches = []
+    # requests are streamed into CQ_Batchinput/<ontology>_batchinput[_NNN].jsonl shards
+    # the cache writer is opened first: it compares the batch input before and after this run
+    cached = CachedOutputWriter("CQ_Batchoutput/"+ontology+'_output.jsonl', "CQ_Batchinput/"+ontology+'_batchinput.jsonl')
+    batches = ShardedBatchWriter("CQ_Batchinput/"+ontology+'_batchinput.jsonl')
     seen_ids = set()
+    entries = []
+    origin = {}
+    index.clear(ontology)
     with open(ontology_list[ontology], "r") as f:
         temp_axiom=json.load(f)
-    for cls in temp_axiom["classes"]:
-        for axiom_relation in temp_axiom["classes"][cls]:
-            for axiom_range in temp_axiom["classes"][cls][axiom_relation]:
-                axiom = f"{cls} {axiom_relation} {axiom_range}"
-                custom_id = f"{ontology}_{axiom}"
-                if custom_id in seen_ids:
-                    continue
-                seen_ids.add(custom_id)
-                temp = deepcopy(init_template(axiom=axiom, axiom_relation=axiom_relation))
-                temp["custom_id"] = custom_id
-                batches.append(temp)
-    for prop in temp_axiom["properties"]:
-        for axiom_relation in temp_axiom["properties"][prop]:
-            for axiom_range in temp_axiom["properties"][prop][axiom_relation]:
-                axiom = f"{prop} {axiom_relation} {axiom_range}"
-                custom_id = f"{ontology}_{axiom}"
-                if custom_id in seen_ids:
-                    continue
-                seen_ids.add(custom_id)
-                temp = deepcopy(init_template(axiom=axiom, axiom_relation=axiom_relation))
-                temp["custom_id"] = custom_id
-                batches.append(temp)
-    # Save the batches to a JSONL file
-    with open("CQ_Batchinput/"+ontology+'_batchinput.jsonl', 'w', encoding='utf-8') as file:
-        for item in batches:
-            json_string = json.dumps(item, ensure_ascii=False)
-            file.write(json_string + '\n')
-        print(f"Ontology name: {ontology}, Number of batches: {len(batches)}")
-    data_num += len(batches)
+    for section in ["classes", "properties"]:
+        for entity in temp_axiom[section]:
+            for axiom_relation in temp_axiom[section][entity]:
+                for axiom_range in temp_axiom[section][entity][axiom_relation]:
+                    axiom = f"{entity} {axiom_relation} {axiom_range}"
+                    custom_id = f"{ontology}_{axiom}"
+                    if custom_id in seen_ids:
+                        continue
+                    seen_ids.add(custom_id)
+                    entries.append((entity, axiom, axiom_relation))
+                    origin[axiom] = (section, entity)
+
+    # packed requests: custom_id -> its axioms, for splitting the answers in CQ_postprocessing.py
+    packs_path = "CQ_Batchinput/"+ontology+"_packs.json"
+    if PACK_BY is None:
+        for entity, axiom, axiom_relation in entries:
+            add_request(batches, cached, axiom, axiom_relation, f"{ontology}_{axiom}")
+            index.add(f"{ontology}_{axiom}", ontology, axiom, entity, origin[axiom][0], axiom_relation, source=batches.path)
+        if os.path.exists(packs_path):
+            os.remove(packs_path)
+    else:
+        packs, packed_tokens = {}, 0
+        for n, axioms in enumerate(pack_axioms(entries, PACK_BY, PACK_SIZE)):
+            custom_id = f"{ontology}_packed {n:05d}"
+            packs[custom_id] = [axiom for axiom, _ in axioms]
+            for part, (axiom, axiom_relation) in enumerate(axioms):
+                section, entity = origin[axiom]
+                index.add(custom_id, ontology, axiom, entity, section, axiom_relation, part, source=batches.path)
+            packed_tokens += prompt_tokens(add_packed_request(batches, cached, axioms, custom_id))
+        with open(packs_path, "w", encoding="utf-8") as f:
+            json.dump(packs, f, ensure_ascii=False, indent=1)
+        tokens = sum(prompt_tokens(registry.request(axiom, axiom_relation)) for _, axiom, axiom_relation in entries)
+        packing_report[ontology] = {"axioms": len(entries), "requests": len(packs),
+                                    "prompt_tokens_per_axiom": tokens, "prompt_tokens_packed": packed_tokens,
+                                    "request_reduction": round(1 - len(packs) / max(len(entries), 1), 3),
+                                    "prompt_token_reduction": round(1 - packed_tokens / max(tokens, 1), 3)}
+        print(f"Ontology name: {ontology}, packed {len(entries)} axioms into {len(packs)} requests "
+              f"(-{packing_report[ontology]['request_reduction']:.1%}), prompt tokens {tokens} -> {packed_tokens} "
+              f"(-{packing_report[ontology]['prompt_token_reduction']:.1%})")
+    batches.close()
+    cached.close()
+    print(f"Ontology name: {ontology}, Number of batches: {len(batches.custom_ids)}, shards: {len(batches.shards)}, cached: {cached.count}")
+    if cached.retired:
+        print(f"Ontology name: {ontology}, batch input changed: {len(cached.retired)} earlier output files moved to CQ_Batchoutput/stale/")
+    data_num += len(batches.custom_ids)
+index.close()
+if packing_report:
+    with open("packing_report.json", "w", encoding="utf-8") as f:
+        json.dump(packing_report, f, indent=2)
 print(f"Total number of batches: {data_num}")
 
-client = OpenAI(api_key="")
-
-for ontology in os.listdir("CQ_Batchinput"):
-  if ontology.endswith(".jsonl"):
-    with open(os.path.join("CQ_Batchinput", ontology), "rb") as file:
-      batch_input_file = client.files.create(
-        file=file, 
-        purpose="batch"
-      )
-    batch_input_file_id = batch_input_file.id
-
-# Create a batch job
-    client.batches.create(
-      input_file_id=batch_input_file_id,
-      endpoint="/v1/chat/completions",
-      completion_window="24h", 
-            )
-  else:
-    print(f"Skipping non-JSONL file: {ontology}")
+# BACKEND: "batch" submits 24h OpenAI batch jobs; "realtime" sends the requests now, concurrently
+# within RPM/TPM limits; "local" runs them through a Hugging Face causal LM (LOCAL_MODEL) on this
+# machine (GPU if available, otherwise CPU). "realtime" and "local" write the answers to CQ_Batchoutput/
+# in the batch output schema.
+BACKEND = "batch"
+LOCAL_MODEL = "Qwen/Qwen2.5-0.5B-Instruct"
+# batch jobs are tracked in batch_ledger.json. WAIT_FOR_BATCHES polls them here until they are finished;
+# otherwise `python "../Batch processing/batch_orchestrator.py" run` (or `step`) later polls, downloads the outputs
+# into CQ_Batchoutput/ and resubmits failed requests
+WAIT_FOR_BATCHES = False
+
+if BACKEND == "realtime":
+    run_directory("CQ_Batchinput", "CQ_Batchoutput", RealtimeClient(rpm=500, tpm=200000))
+elif BACKEND == "local":
+    HFBackend(LOCAL_MODEL).run_directory("CQ_Batchinput", "CQ_Batchoutput")
+else:
+    orchestrator = BatchOrchestrator(OpenAI(api_key=""), "batch_ledger.json")
+    orchestrator.add_directory("CQ_Batchinput", "CQ_Batchoutput")
+    if WAIT_FOR_BATCHES:
+        orchestrator.run()
+    else:
+        orchestrator.step()
+    print(orchestrator.summary())
@@ -1,30 +1,35 @@
 import os
+import sys
 import json
+from functools import partial
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Batch processing"))
+from batch_writer import group_shards
+from batch_output import process_outputs, cq_parser
+from response_cache import ResponseCache
+from request_index import RequestIndex
 
 batchoutput_directory = "CQ_Batchoutput"
-jsonl_files = [file for file in os.listdir(batchoutput_directory) if file.endswith(".jsonl")]
+# shards of one output (swo_output_001.jsonl, swo_output_002.jsonl, ...) are read as one file
+jsonl_files = group_shards(batchoutput_directory)
 
-for jsonl_file in jsonl_files:
-    loaded_data = []
-    file_path = os.path.join(batchoutput_directory, jsonl_file)
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            temp_data = json.loads(line)
-            if "http://" in temp_data["response"]["body"]["choices"][0]["message"]["content"]: CQ_list = temp_data["response"]["body"]["choices"][0]["message"]["content"].split("// ")
-            else: CQ_list = temp_data["response"]["body"]["choices"][0]["message"]["content"].split("//")
-            temp_list = []
-            for CQ in CQ_list:
-                CQ = CQ.strip()
-                if CQ == "": continue
-                if CQ[:2]=="\n": CQ = CQ[2:]
-                if CQ[0]=="-": CQ = CQ[1:]
-                temp_list.append(CQ.strip())
-            temp_out = {"axiom": temp_data["custom_id"].split("_",1)[1], "CQ": temp_list}
-            loaded_data.append(temp_out)
-    # Save the loaded data to a new jsonl file
-    output_file_path = os.path.join("Generated CQ", f"{jsonl_file}")
-    with open(output_file_path, "w", encoding="utf-8") as f:
-        for item in loaded_data:
-            json_string = json.dumps(item, ensure_ascii=False)
-            f.write(json_string + '\n')
-    print(f"Loaded {len(loaded_data)} records from {len(jsonl_files)} JSONL files.")
\ No newline at end of file
+# packed requests (CQ_generation.py with PACK_BY): custom_id -> axioms answered by the request
+packs = {}
+for file in os.listdir("CQ_Batchinput"):
+    if file.endswith("_packs.json"):
+        with open(os.path.join("CQ_Batchinput", file), "r", encoding="utf-8") as f:
+            packs.update(json.load(f))
+
+if __name__ == "__main__":
+    # the output files are parsed in parallel and streamed record by record into Generated CQ/
+    # axioms are looked up in the request index written by CQ_generation.py
+    with RequestIndex("cq") as index:
+        stats = process_outputs(jsonl_files, partial(cq_parser, packs=packs), "Generated CQ", index=index)
+    for jsonl_file, file_stats in stats.items():
+        if file_stats["failed"]:
+            print(f"⚠️ {jsonl_file}: {len(file_stats['failed'])} axioms without CQs (errored responses or unsplit packed answers), "
+                  f"e.g. {file_stats['failed'][0]}")
+        print(f"Loaded {file_stats['written']} records from {file_stats['shards']} JSONL files.")
+
+    # remember the responses, so that unchanged requests are not resubmitted by CQ_generation.py
+    with ResponseCache() as cache:
+        print(f"Response cache: {cache.add_outputs('CQ_Batchinput', batchoutput_directory)} responses stored")
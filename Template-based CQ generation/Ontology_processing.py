@@ -1,11 +1,16 @@
 import sys
 import os
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import json
 import rdflib
-from rdflib import Graph, RDF, RDFS, OWL
+from rdflib import Graph, Namespace, RDF, RDFS, OWL
 from rdflib.namespace import XSD
 import random
 from rdflib import BNode, URIRef
+import graph_snapshot
+import triple_store
 # ——————————————
 # owl files to be processed label replacement
 TARGET_WITH_LABEL = [
@@ -13,37 +18,123 @@ TARGET_WITH_LABEL = [
     "OntoDT.owl"
 ]
 
+# entity sampling: at most SAMPLE_SIZE classes/properties per ontology (0 = keep all)
+SAMPLE_SIZE = 500
+SAMPLE_SEED = 0
+
 # output directory
 PREFIX_DIR = "Prefixes"
 AXIOM_DIR = "Axiom_per_entity"
+DESCRIPTION_DIR = "Ontology_description"
 INPUT_DIR = "Ontology"
-for d in (PREFIX_DIR, AXIOM_DIR):
-    os.makedirs(d, exist_ok=True)
+
+# annotations written to DESCRIPTION_DIR (output key → predicate)
+OBOINOWL = Namespace("http://www.geneontology.org/formats/oboInOwl#")
+ANNOTATION_PREDICATES = {
+    "rdfs:comment": RDFS.comment,
+    "oboInOwl:hasDefinition": OBOINOWL.hasDefinition,
+}
 
 
-def format_node(node, g, label_map=None):
+def format_node(node, g, label_map=None, cache=None):
     if label_map and node in label_map:
         return label_map[node]
+    if cache is None:
+        return _qname(node, g)
+    # qname resolution (or its failure) happens once per node and graph
+    name = cache.names.get(node)
+    if name is None:
+        name = cache.names[node] = _qname(node, g)
+    return name
+
+
+def _qname(node, g):
     try:
         return g.qname(node)
     except Exception:
         return str(node)
 
 
-def parse_rdf_list(list_node, g):
+# predicates consulted while rendering class expressions
+EXPRESSION_PREDICATES = {
+    OWL.onDatatype, OWL.withRestrictions, OWL.oneOf, OWL.unionOf, OWL.intersectionOf,
+    OWL.complementOf, OWL.onProperty, OWL.inverseOf, OWL.onClass, OWL.onDataRange,
+    OWL.qualifiedCardinality, OWL.minQualifiedCardinality, OWL.maxQualifiedCardinality,
+    OWL.hasValue, OWL.someValuesFrom, OWL.allValuesFrom,
+    OWL.cardinality, OWL.minCardinality, OWL.maxCardinality,
+    RDF.first, RDF.rest,
+    XSD.minInclusive, XSD.maxInclusive, XSD.minExclusive, XSD.maxExclusive,
+}
+
+
+def build_expression_index(g):
+    """
+    Scans the graph once and builds a per-subject predicate→objects map for every node
+    that takes part in a class expression (blank nodes, restrictions, RDF lists, facets).
+
+    Objects keep the graph's iteration order, so the first entry of each list is the
+    same node `g.value()` would return. An rdf:type entry is only recorded for
+    owl:Restriction. Nodes that are missing from the index are plain named terms.
+    """
+    index = {}
+    for s, p, o in g:
+        if p in EXPRESSION_PREDICATES or (p == RDF.type and o == OWL.Restriction):
+            index.setdefault(s, {}).setdefault(p, []).append(o)
+    return index
+
+
+def _value(node, pred, g, index=None):
+    # g.value() equivalent that goes through the expression index when one is given
+    if index is None:
+        return g.value(node, pred)
+    objs = index.get(node, {}).get(pred)
+    return objs[0] if objs else None
+
+
+def _is_restriction(node, g, index=None):
+    if index is None:
+        return (node, RDF.type, OWL.Restriction) in g
+    return RDF.type in index.get(node, {})
+
+
+class RenderCache:
+    """
+    Per-graph memo of rendered class expressions, parsed RDF lists and qname / plain-string
+    names of terms (`format_node`), keyed by node. `visiting` holds the nodes on the current rendering path, so cyclic or
+    self-referencing structures are cut off instead of recursing forever.
+    A cache must only be shared between calls that use the same graph and label map.
+    """
+    def __init__(self):
+        self.expressions = {}
+        self.lists = {}
+        self.names = {}
+        self.visiting = set()
+
+
+def parse_rdf_list(list_node, g, index=None, cache=None):
+    if cache is not None and list_node in cache.lists:
+        return cache.lists[list_node]
+    head = list_node
     items = []
+    seen = set()
     while list_node and list_node != RDF.nil:
-        first = g.value(list_node, RDF.first)
+        # a cyclic rdf:rest chain ends the list at the first repeated cell
+        if list_node in seen:
+            break
+        seen.add(list_node)
+        first = _value(list_node, RDF.first, g, index)
         if first is None:
             break
         items.append(first)
-        list_node = g.value(list_node, RDF.rest)
+        list_node = _value(list_node, RDF.rest, g, index)
         if list_node is None:
             break
+    if cache is not None:
+        cache.lists[head] = items
     return items
 
 
-def process_class_expression(node, g, label_map=None):
+def process_class_expression(node, g, label_map=None, index=None, cache=None):
     """
     Processes an OWL class expression node and converts it into a human-readable string representation.
 
@@ -51,6 +142,12 @@ def process_class_expression(node, g, label_map=None):
         node (rdflib.term.Node): The RDF node representing the OWL class expression.
         g (rdflib.Graph): The RDF graph containing the ontology data.
         label_map (dict, optional): A mapping of RDF nodes to human-readable labels. Defaults to None.
+        index (dict, optional): The result of `build_expression_index(g)`. When given, every node is
+            dispatched with a single lookup in the index instead of probing the graph once per
+            predicate. Defaults to None.
+        cache (RenderCache, optional): Memo shared across calls on the same graph, so each distinct
+            expression is rendered once no matter how often it is referenced. A private cache is
+            used when omitted. Defaults to None.
 
     Returns:
         str: A string representation of the OWL class expression.
@@ -72,61 +169,89 @@ def process_class_expression(node, g, label_map=None):
         - The function uses helper functions like `parse_rdf_list` and `format_node` to process RDF lists 
           and format nodes, respectively.
         - If a construct is not recognized, the function defaults to formatting the node as a URI, QName, or label.
+        - A node that is reached again while it is still being rendered (a cycle) is rendered as "?".
     """
+    if cache is None:
+        cache = RenderCache()
+    if node in cache.expressions:
+        return cache.expressions[node]
+    if node in cache.visiting:
+        return "?"
+    cache.visiting.add(node)
+    try:
+        text = _render_class_expression(node, g, label_map, index, cache)
+    finally:
+        cache.visiting.discard(node)
+    cache.expressions[node] = text
+    return text
+
+
+def _render_class_expression(node, g, label_map, index, cache):
+    if index is not None:
+        props = index.get(node)
+        if props is None:
+            # named term: nothing to dispatch on
+            return format_node(node, g, label_map, cache)
+        value = lambda pred: props[pred][0] if pred in props else None
+        is_restriction = RDF.type in props
+    else:
+        value = lambda pred: g.value(node, pred)
+        is_restriction = _is_restriction(node, g)
+
     # 0. DatatypeRestriction processing (onDatatype + withRestrictions)
-    on_dt = g.value(node, OWL.onDatatype)
-    wr   = g.value(node, OWL.withRestrictions)
+    on_dt = value(OWL.onDatatype)
+    wr   = value(OWL.withRestrictions)
     if on_dt is not None and wr is not None:
         # restriction processing
         facets = []
-        for rnode in parse_rdf_list(wr, g):
+        for rnode in parse_rdf_list(wr, g, index, cache):
             for facet_prop in [XSD.minInclusive, XSD.maxInclusive, XSD.minExclusive, XSD.maxExclusive]:
-                val = g.value(rnode, facet_prop)
+                val = _value(rnode, facet_prop, g, index)
                 if val is not None:
                     facet_name = facet_prop.split('#')[-1]
                     facets.append(f"{facet_name} {val}")
-        dt_qname = format_node(on_dt, g, label_map)
+        dt_qname = format_node(on_dt, g, label_map, cache)
         return f"DatatypeRestriction({dt_qname} {' '.join(facets)})"
 
     # 1. enumeration (oneOf)
-    one_of = g.value(node, OWL.oneOf)
+    one_of = value(OWL.oneOf)
     if one_of is not None:
-        items = parse_rdf_list(one_of, g)
-        return "{" + ", ".join(format_node(x, g, label_map) for x in items) + "}"
+        items = parse_rdf_list(one_of, g, index, cache)
+        return "{" + ", ".join(format_node(x, g, label_map, cache) for x in items) + "}"
 
     # 2. union
-    union_list = g.value(node, OWL.unionOf)
+    union_list = value(OWL.unionOf)
     if union_list is not None:
-        items = parse_rdf_list(union_list, g)
-        return "(" + " or ".join(process_class_expression(x, g, label_map) for x in items) + ")"
+        items = parse_rdf_list(union_list, g, index, cache)
+        return "(" + " or ".join(process_class_expression(x, g, label_map, index, cache) for x in items) + ")"
 
     # 3. intersection
-    inter_list = g.value(node, OWL.intersectionOf)
+    inter_list = value(OWL.intersectionOf)
     if inter_list is not None:
-        items = parse_rdf_list(inter_list, g)
-        return "(" + " and ".join(process_class_expression(x, g, label_map) for x in items) + ")"
+        items = parse_rdf_list(inter_list, g, index, cache)
+        return "(" + " and ".join(process_class_expression(x, g, label_map, index, cache) for x in items) + ")"
 
     # 4. complement
-    comp = g.value(node, OWL.complementOf)
+    comp = value(OWL.complementOf)
     if comp is not None:
-        return "not " + process_class_expression(comp, g, label_map)
+        return "not " + process_class_expression(comp, g, label_map, index, cache)
 
     # 5. restriction
-    if (node, RDF.type, OWL.Restriction) in g:
+    if is_restriction:
         # onProperty processing
-        on_prop = g.value(node, OWL.onProperty)
+        on_prop = value(OWL.onProperty)
         if isinstance(on_prop, URIRef):
-            prop_str = format_node(on_prop, g, label_map)
+            prop_str = format_node(on_prop, g, label_map, cache)
         elif isinstance(on_prop, BNode):
-            inv = g.value(on_prop, OWL.inverseOf)
-            prop_str = "inverseOf " + format_node(inv, g, label_map) if isinstance(inv, URIRef) else format_node(on_prop, g, label_map)
+            inv = _value(on_prop, OWL.inverseOf, g, index)
+            prop_str = "inverseOf " + format_node(inv, g, label_map, cache) if isinstance(inv, URIRef) else format_node(on_prop, g, label_map, cache)
         else:
             prop_str = "?"
 
         # 5.1 qualifiedCardinality / minQualified / maxQualified
-        q_card    = g.value(node, OWL.qualifiedCardinality)
-        min_qcard = g.value(node, OWL.minQualifiedCardinality)
-        max_qcard = g.value(node, OWL.maxQualifiedCardinality)
+        q_card    = value(OWL.qualifiedCardinality)
+        min_qcard = value(OWL.minQualifiedCardinality)
+        max_qcard = value(OWL.maxQualifiedCardinality)
         if q_card or min_qcard or max_qcard:
             if q_card:
                 label_card, count = "exactly", q_card
@@ -134,9 +259,9 @@ def process_class_expression(node, g, label_map=None):
                 label_card, count = "min", min_qcard
             else:
                 label_card, count = "max", max_qcard
-            filler = g.value(node, OWL.onDataRange) or g.value(node, OWL.onClass)
+            filler = value(OWL.onDataRange) or value(OWL.onClass)
             if filler is not None:
-                filler_str = process_class_expression(filler, g, label_map)
+                filler_str = process_class_expression(filler, g, label_map, index, cache)
                 return f"[{prop_str} {label_card} {count} {filler_str}]"
             else:
                 return f"[{prop_str} {label_card} {count}]"
@@ -147,9 +272,9 @@ def process_class_expression(node, g, label_map=None):
             (OWL.someValuesFrom, "some"),
             (OWL.allValuesFrom,  "only"),
         ]:
-            val = g.value(node, pred)
+            val = value(pred)
             if val is not None:
-                return f"[{prop_str} {label} {process_class_expression(val, g, label_map)}]"
+                return f"[{prop_str} {label} {process_class_expression(val, g, label_map, index, cache)}]"
 
         # 5.3 unqualified cardinalities
         for pred, label in [
@@ -157,58 +282,163 @@ def process_class_expression(node, g, label_map=None):
             (OWL.minCardinality, "min"),
             (OWL.maxCardinality, "max"),
         ]:
-            val = g.value(node, pred)
+            val = value(pred)
             if val is not None:
                 return f"[{prop_str} {label} {val}]"
 
         return f"[{prop_str} ?]"
 
     # 6.  (URI, QName, label)
-    return format_node(node, g, label_map)
+    return format_node(node, g, label_map, cache)
 
 
 
-def extract_for_file(file_path, file_format=None):
+def load_graph(file_path, file_format=None, snapshot_dir=graph_snapshot.SNAPSHOT_DIR, backend="rdflib"):
+    # reuse the parsed-graph snapshot of an unchanged file; snapshot_dir=None always re-parses
+    # backend="intstore" keeps the triples in triple_store.IntegerTripleStore instead of rdflib's Memory store
+    if backend == "intstore":
+        return triple_store.load_graph(file_path, file_format, snapshot_dir)
+    if snapshot_dir:
+        return graph_snapshot.load_graph(file_path, file_format, cache_dir=snapshot_dir)
     g = Graph()
     if not file_format:
         file_format = "turtle" if file_path.endswith(".ttl") else "xml"
-    try:
-        g.parse(file_path, format=file_format)
-    except Exception as e:
-        print(f"❌ failed ({file_path}): {e}")
-        return
+    g.parse(file_path, format=file_format)
+    return g
+
 
-    # label map
-    use_label = os.path.basename(file_path) in TARGET_WITH_LABEL
+def sample_entities(class_nodes, prop_nodes, sample_size, rng, stratify=False):
+    """
+    Picks at most `sample_size` entities out of the candidate class and property nodes.
+    Both lists must already be in a reproducible order. With `stratify` the sample keeps the
+    class/property ratio of the ontology; otherwise it is drawn from the pooled candidates.
+    Returns (chosen class nodes, chosen property nodes) as sets.
+    """
+    total = len(class_nodes) + len(prop_nodes)
+    if not sample_size or total <= sample_size:
+        return set(class_nodes), set(prop_nodes)
+    if stratify:
+        n_cls = min(len(class_nodes), round(sample_size * len(class_nodes) / total))
+        n_prop = min(len(prop_nodes), sample_size - n_cls)
+        return set(rng.sample(class_nodes, n_cls)), set(rng.sample(prop_nodes, n_prop))
+    pooled = [("class", n) for n in class_nodes] + [("property", n) for n in prop_nodes]
+    picked = rng.sample(pooled, sample_size)
+    return {n for typ, n in picked if typ == "class"}, {n for typ, n in picked if typ == "property"}
+
+
+def build_label_map(g, file_path):
+    # rdfs:label replaces the qname only for the ontologies listed in TARGET_WITH_LABEL
     label_map = {}
-    if use_label:
+    if os.path.basename(file_path) in TARGET_WITH_LABEL:
         for s, _, lbl in g.triples((None, RDFS.label, None)):
             label_map[s] = str(lbl)
+    return label_map
+
+
+def _render_context(g, file_path, use_index=True, label_map=None):
+    if label_map is None:
+        label_map = build_label_map(g, file_path)
+
+    # indexed BNode view: one graph scan instead of per-node predicate probes
+    index = build_expression_index(g) if use_index else None
+    # shared expressions are rendered once per graph
+    cache = RenderCache()
+    return label_map, index, cache
 
-    # file name processing
-    base = os.path.splitext(os.path.basename(file_path))[0]
-    axioms_file = os.path.join(AXIOM_DIR, f"{base}_axiom.json")
 
+def _candidate_entities(g, label_map, index, cache):
+    # candidate entities, in an order that does not depend on hashing or blank-node ids
+    def sort_key(node):
+        if isinstance(node, BNode):
+            return process_class_expression(node, g, label_map, index, cache)
+        return str(node)
+    class_nodes = {s for pred in (RDFS.subClassOf, OWL.disjointWith, OWL.equivalentClass) for s in g.subjects(pred)}
+    props = set(g.subjects(RDF.type, OWL.ObjectProperty)) | set(g.subjects(RDF.type, OWL.DatatypeProperty))
+    return sorted(class_nodes, key=sort_key), props
+
+
+def _sample_rng(file_path, seed):
+    return random.Random(f"{seed}:{os.path.basename(file_path)}") if seed is not None else random.Random()
+
+
+def _property_axioms(prop, g, label_map, index, cache):
+    types = [lab for cls, lab in [(OWL.ObjectProperty, "ObjectProperty"), (OWL.DatatypeProperty, "DatatypeProperty")] if (prop, RDF.type, cls) in g]
+    chars = [lab for cls, lab in [(OWL.FunctionalProperty, "Functional"), (OWL.InverseFunctionalProperty, "InverseFunctional"),
+                                  (OWL.TransitiveProperty, "Transitive"), (OWL.SymmetricProperty, "Symmetric"),
+                                  (OWL.AsymmetricProperty, "Asymmetric"), (OWL.ReflexiveProperty, "Reflexive"),
+                                  (OWL.IrreflexiveProperty, "Irreflexive")] if (prop, RDF.type, cls) in g]
+    doms = [process_class_expression(d, g, label_map, index, cache) for d in g.objects(prop, RDFS.domain)]
+    if not doms:
+        doms = ["None"]
+    rngs = [process_class_expression(r, g, label_map, index, cache) for r in g.objects(prop, RDFS.range)]
+    if not rngs:
+        rngs = ["None"]
+    supers = [format_node(o, g, label_map, cache) for o in g.objects(prop, RDFS.subPropertyOf)]
+    inverses = [format_node(o, g, label_map, cache) for o in g.objects(prop, OWL.inverseOf)]
+    return {
+        "characteristics": chars,
+        "domain": doms,
+        "range": rngs,
+        "subPropertyOf": supers,
+        "inverseOf": inverses
+    }
+
+
+def _class_axioms(node, g, label_map, index, cache):
+    # the axioms of one class, with the relation keys in the order extract_axioms() produces them
+    raw = {"subClassOf": [], "disjointWith": [], "equivalentClass": [], "propertyRestrictions": []}
+    for o in g.objects(node, RDFS.subClassOf):
+        rel = "propertyRestrictions" if isinstance(o, BNode) and _is_restriction(o, g, index) else "subClassOf"
+        raw[rel].append(process_class_expression(o, g, label_map, index, cache))
+    for o in g.objects(node, OWL.disjointWith):
+        raw["disjointWith"].append(process_class_expression(o, g, label_map, index, cache))
+    for o in g.objects(node, OWL.equivalentClass):
+        raw["equivalentClass"].append(process_class_expression(o, g, label_map, index, cache))
+    return {rel: exprs for rel, exprs in raw.items() if exprs}
+
+
+def extract_axioms(g, file_path, use_index=True, sample_size=SAMPLE_SIZE, seed=SAMPLE_SEED, stratify=False, label_map=None):
+    """
+    Renders the class and property axioms of a parsed ontology.
+    `file_path` decides whether labels replace qnames (TARGET_WITH_LABEL) and salts the seed.
+
+    Candidate entities (subjects of subClassOf/disjointWith/equivalentClass and the declared
+    object/datatype properties) are enumerated first and sampled down to `sample_size` with
+    `random.Random(f"{seed}:{file name}")`; only the chosen ones are rendered.
+    seed=None draws an unseeded sample. A `label_map` from `build_label_map` can be passed in
+    when the caller already built it.
+    Returns {"classes": {...}, "properties": {...}}.
+    """
+    label_map, index, cache = _render_context(g, file_path, use_index, label_map)
+    class_nodes, props = _candidate_entities(g, label_map, index, cache)
+    chosen_cls, chosen_props = sample_entities(class_nodes, sorted(props, key=str), sample_size,
+                                               _sample_rng(file_path, seed), stratify)
 
     # Class Axioms
     raw_cls = {"subclass": [], "disjoint": [], "equivalent": [], "restriction": []}
     for s, _, o in g.triples((None, RDFS.subClassOf, None)):
-        if isinstance(o, rdflib.term.BNode) and (o, RDF.type, OWL.Restriction) in g:
-            raw_cls["restriction"].append((format_node(s, g, label_map), process_class_expression(o, g, label_map)))
+        if s not in chosen_cls:
+            continue
+        if isinstance(o, rdflib.term.BNode) and _is_restriction(o, g, index):
+            raw_cls["restriction"].append((format_node(s, g, label_map, cache), process_class_expression(o, g, label_map, index, cache)))
         else:
-            raw_cls["subclass"].append((format_node(s, g, label_map), process_class_expression(o, g, label_map)))
+            raw_cls["subclass"].append((format_node(s, g, label_map, cache), process_class_expression(o, g, label_map, index, cache)))
     
     # DisjointWith
     for s, _, o in g.triples((None, OWL.disjointWith, None)):
+        if s not in chosen_cls:
+            continue
         raw_cls["disjoint"].append((
-            process_class_expression(s, g, label_map),
-            process_class_expression(o, g, label_map)
+            process_class_expression(s, g, label_map, index, cache),
+            process_class_expression(o, g, label_map, index, cache)
         ))
 
     # EquivalentClass 
     for s, _, o in g.triples((None, OWL.equivalentClass, None)):
-        subj_expr = process_class_expression(s, g, label_map)
-        obj_expr  = process_class_expression(o, g, label_map)
+        if s not in chosen_cls:
+            continue
+        subj_expr = process_class_expression(s, g, label_map, index, cache)
+        obj_expr  = process_class_expression(o, g, label_map, index, cache)
         raw_cls["equivalent"].append((subj_expr, obj_expr))
 
     class_axioms = {}
@@ -219,59 +449,187 @@ def extract_for_file(file_path, file_format=None):
             entry.setdefault(rel, []).append(expr)
 
     # Property Axioms
-    props = set(g.subjects(RDF.type, OWL.ObjectProperty)) | set(g.subjects(RDF.type, OWL.DatatypeProperty))
     prop_axioms = {}
     for prop in props:
-        pstr = format_node(prop, g, label_map)
-        types = [lab for cls, lab in [(OWL.ObjectProperty, "ObjectProperty"), (OWL.DatatypeProperty, "DatatypeProperty")] if (prop, RDF.type, cls) in g]
-        chars = [lab for cls, lab in [(OWL.FunctionalProperty, "Functional"), (OWL.InverseFunctionalProperty, "InverseFunctional"),
-                                      (OWL.TransitiveProperty, "Transitive"), (OWL.SymmetricProperty, "Symmetric"),
-                                      (OWL.AsymmetricProperty, "Asymmetric"), (OWL.ReflexiveProperty, "Reflexive"),
-                                      (OWL.IrreflexiveProperty, "Irreflexive")] if (prop, RDF.type, cls) in g]
-        doms = [process_class_expression(d, g, label_map) for d in g.objects(prop, RDFS.domain)]
-        if not doms:
-            doms = ["None"]
-        rngs = [process_class_expression(r, g, label_map) for r in g.objects(prop, RDFS.range)]
-        if not rngs:
-            rngs = ["None"]
-        supers = [format_node(o, g, label_map) for o in g.objects(prop, RDFS.subPropertyOf)]
-        inverses = [format_node(o, g, label_map) for o in g.objects(prop, OWL.inverseOf)]
-        prop_axioms[pstr] = {
-            "characteristics": chars,
-            "domain": doms,
-            "range": rngs,
-            "subPropertyOf": supers,
-            "inverseOf": inverses
-        }
-
-    all_entities = [('class', k) for k in class_axioms.keys()] + \
-                   [('property', k) for k in prop_axioms.keys()]
-    
-    if len(all_entities) > 500:
-        sampled = random.sample(all_entities, 500)
-        new_class_axioms = {}
-        new_prop_axioms = {}
-        for typ, key in sampled:
-            if typ == 'class':
-                new_class_axioms[key] = class_axioms[key]
+        if prop not in chosen_props:
+            continue
+        prop_axioms[format_node(prop, g, label_map, cache)] = _property_axioms(prop, g, label_map, index, cache)
+
+    return {"classes": class_axioms, "properties": prop_axioms}
+
+
+def iter_entity_axioms(g, file_path, use_index=True, sample_size=0, seed=SAMPLE_SEED, stratify=False):
+    """
+    Streaming counterpart of `extract_axioms`: yields ("classes" | "properties", entity, axioms)
+    one entity at a time, in a reproducible order, without building the per-ontology dicts.
+    No sampling by default (sample_size=0), so the whole ontology goes through.
+    """
+    label_map, index, cache = _render_context(g, file_path, use_index)
+    class_nodes, props = _candidate_entities(g, label_map, index, cache)
+    props = sorted(props, key=str)
+    chosen_cls, chosen_props = sample_entities(class_nodes, props, sample_size, _sample_rng(file_path, seed), stratify)
+    for node in class_nodes:
+        if node in chosen_cls:
+            yield "classes", process_class_expression(node, g, label_map, index, cache), \
+                _class_axioms(node, g, label_map, index, cache)
+    for prop in props:
+        if prop in chosen_props:
+            yield "properties", format_node(prop, g, label_map, cache), _property_axioms(prop, g, label_map, index, cache)
+
+
+def extract_annotations(g, file_path, label_map=None):
+    """
+    Collects the rdfs:comment / oboInOwl:hasDefinition annotations of every declared class
+    and object/datatype property, keyed with the same `format_node` names as `extract_axioms`.
+    Each annotation predicate is read in one pass over its triples; an entity with one value
+    gets a string, with several a list. Entities without annotations are left out.
+    Returns {"classes": {...}, "properties": {...}}.
+    """
+    if label_map is None:
+        label_map = build_label_map(g, file_path)
+    cache = RenderCache()
+
+    annotations = {}
+    for key, pred in ANNOTATION_PREDICATES.items():
+        for s, _, o in g.triples((None, pred, None)):
+            ann = annotations.setdefault(s, {})
+            if key not in ann:
+                ann[key] = str(o)
+            elif isinstance(ann[key], list):
+                ann[key].append(str(o))
             else:
-                new_prop_axioms[key] = prop_axioms[key]
-        class_axioms = new_class_axioms
-        prop_axioms  = new_prop_axioms
+                ann[key] = [ann[key], str(o)]
+
+    class_ann = {}
+    for cls in g.subjects(RDF.type, OWL.Class):
+        if cls in annotations:
+            class_ann[format_node(cls, g, label_map, cache)] = annotations[cls]
+    prop_ann = {}
+    for prop in list(g.subjects(RDF.type, OWL.ObjectProperty)) + list(g.subjects(RDF.type, OWL.DatatypeProperty)):
+        if prop in annotations:
+            prop_ann[format_node(prop, g, label_map, cache)] = annotations[prop]
+    return {"classes": class_ann, "properties": prop_ann}
+
+
+def extract_entities(g, file_path, descriptions=False, **extract_opts):
+    # axioms and, with descriptions=True, annotations of one parsed graph, sharing its label map
+    label_map = build_label_map(g, file_path)
+    output = extract_axioms(g, file_path, label_map=label_map, **extract_opts)
+    annotations = extract_annotations(g, file_path, label_map) if descriptions else None
+    return output, annotations
+
+
+def save_axioms(file_path, output):
+    # file name processing
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    axioms_file = os.path.join(AXIOM_DIR, f"{base}_axiom.json")
 
     # save to file
-    output = {"classes": class_axioms, "properties": prop_axioms}
+    os.makedirs(AXIOM_DIR, exist_ok=True)
     with open(axioms_file, "w", encoding="utf-8") as af:
         json.dump(output, af, indent=2, ensure_ascii=False)
-    print(f"✔️ Axiom saved: {axioms_file} (classes={len(class_axioms)}, properties={len(prop_axioms)})")
+    print(f"✔️ Axiom saved: {axioms_file} (classes={len(output['classes'])}, properties={len(output['properties'])})")
+    return axioms_file
+
+
+def save_descriptions(file_path, annotations):
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    description_file = os.path.join(DESCRIPTION_DIR, f"{base}_description.json")
+
+    os.makedirs(DESCRIPTION_DIR, exist_ok=True)
+    with open(description_file, "w", encoding="utf-8") as f:
+        json.dump(annotations, f, ensure_ascii=False, indent=2)
+    print(f"✔️ Description saved: {description_file} (classes={len(annotations['classes'])}, properties={len(annotations['properties'])})")
+    return description_file
+
+
+def extract_for_file(file_path, file_format=None, snapshot_dir=graph_snapshot.SNAPSHOT_DIR, backend="rdflib",
+                     descriptions=False, **extract_opts):
+    # extract_opts are passed on to extract_axioms (use_index, sample_size, seed, stratify)
+    try:
+        g = load_graph(file_path, file_format, snapshot_dir, backend)
+    except Exception as e:
+        print(f"❌ failed ({file_path}): {e}")
+        return
+    output, annotations = extract_entities(g, file_path, descriptions, **extract_opts)
+    save_axioms(file_path, output)
+    if annotations is not None:
+        save_descriptions(file_path, annotations)
+    return output
+
+
+def _extract_worker(file_path, snapshot_dir=graph_snapshot.SNAPSHOT_DIR, backend="rdflib", descriptions=False, extract_opts=None):
+    # runs in a pool process: the axioms (and annotations) are sent back to the parent, which writes them
+    start = time.perf_counter()
+    try:
+        g = load_graph(file_path, snapshot_dir=snapshot_dir, backend=backend)
+        output, annotations = extract_entities(g, file_path, descriptions, **(extract_opts or {}))
+    except Exception as e:
+        return file_path, None, None, str(e), time.perf_counter() - start
+    return file_path, output, annotations, None, time.perf_counter() - start
+
+
+def extract_parallel(paths, workers=None, snapshot_dir=graph_snapshot.SNAPSHOT_DIR, backend="rdflib",
+                     descriptions=False, **extract_opts):
+    """
+    Extracts several ontologies on a process pool. Files are submitted largest first so
+    that the big ones (swo_merged.owl) start right away and the small ones fill the
+    remaining cores. Prints a per-file timing/entity-count summary at the end.
+    """
+    paths = sorted(paths, key=os.path.getsize, reverse=True)
+    summary = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract_worker, path, snapshot_dir, backend, descriptions, extract_opts) for path in paths]
+        for future in as_completed(futures):
+            path, output, annotations, error, elapsed = future.result()
+            if error is not None:
+                print(f"❌ failed ({path}): {error}")
+                summary.append((path, elapsed, "-", "-"))
+                continue
+            save_axioms(path, output)
+            if annotations is not None:
+                save_descriptions(path, annotations)
+            summary.append((path, elapsed, len(output["classes"]), len(output["properties"])))
+
+    print(f"{'file':<32} {'seconds':>8} {'classes':>8} {'properties':>11}")
+    for path, elapsed, n_cls, n_prop in sorted(summary, key=lambda row: row[1], reverse=True):
+        print(f"{os.path.basename(path):<32} {elapsed:>8.2f} {n_cls:>8} {n_prop:>11}")
+    return summary
 
 
 def main():
-    dir_path = sys.argv[1] if len(sys.argv) > 1 else INPUT_DIR
-    for fname in os.listdir(dir_path):
-        if fname.endswith(".owl") or fname.endswith(".ttl"):
-            path = os.path.join(dir_path, fname)
-            extract_for_file(path)
+    parser = argparse.ArgumentParser(description="Extract axioms per entity from ontology files.")
+    parser.add_argument("dir_path", nargs="?", default=INPUT_DIR)
+    parser.add_argument("--no-index", action="store_true",
+                        help="probe the rdflib graph per node instead of building the expression index")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of worker processes (0 = one per core, 1 = sequential)")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help=f"always re-parse instead of reusing the parsed-graph snapshots in {graph_snapshot.SNAPSHOT_DIR}/")
+    parser.add_argument("--backend", choices=["rdflib", "intstore"], default="rdflib",
+                        help="triple store: rdflib's Memory store or the interned integer store (large ontologies)")
+    parser.add_argument("--sample-size", type=int, default=SAMPLE_SIZE,
+                        help="maximum number of entities kept per ontology (0 = all)")
+    parser.add_argument("--seed", type=int, default=SAMPLE_SEED,
+                        help="sampling seed, combined with the file name")
+    parser.add_argument("--stratify", action="store_true",
+                        help="keep the class/property ratio of each ontology in the sample")
+    parser.add_argument("--descriptions", action="store_true",
+                        help=f"also write the rdfs:comment / oboInOwl:hasDefinition annotations to {DESCRIPTION_DIR}/ from the same parse")
+    args = parser.parse_args()
+    for d in (PREFIX_DIR, AXIOM_DIR):
+        os.makedirs(d, exist_ok=True)
+    snapshot_dir = None if args.no_snapshot else graph_snapshot.SNAPSHOT_DIR
+    extract_opts = {"use_index": not args.no_index, "sample_size": args.sample_size,
+                    "seed": args.seed, "stratify": args.stratify}
+    paths = [os.path.join(args.dir_path, fname) for fname in os.listdir(args.dir_path)
+             if fname.endswith(".owl") or fname.endswith(".ttl")]
+    if args.jobs != 1:
+        extract_parallel(paths, workers=args.jobs or None, snapshot_dir=snapshot_dir, backend=args.backend,
+                         descriptions=args.descriptions, **extract_opts)
+        return
+    for path in paths:
+        extract_for_file(path, snapshot_dir=snapshot_dir, backend=args.backend, descriptions=args.descriptions, **extract_opts)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
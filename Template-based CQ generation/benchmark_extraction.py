@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import Ontology_processing
+import synthetic_ontology
+
+# ——————————————
+# Stage-by-stage timing of the axiom extraction (Ontology_processing.extract_for_file):
+# parse → label map → expression index → class axioms → property axioms → JSON write.
+# Runs over the bundled ontologies and, optionally, seeded synthetic ontologies of growing
+# size, and writes the results as JSON. With --baseline, stages that got slower than
+# --tolerance × the baseline time are reported (and the exit status is 1).
+STAGES = ["parse", "label_map", "index", "class_axioms", "property_axioms", "json_write"]
+
+
+def _peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def benchmark_file(file_path, backend="rdflib", use_index=True, sample_size=0, seed=Ontology_processing.SAMPLE_SEED):
+    """Times every extraction stage once for `file_path` (no snapshot cache). Returns one result row."""
+    timings = {}
+
+    start = time.perf_counter()
+    g = Ontology_processing.load_graph(file_path, snapshot_dir=None, backend=backend)
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    label_map = Ontology_processing.build_label_map(g, file_path)
+    timings["label_map"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    label_map, index, cache = Ontology_processing._render_context(g, file_path, use_index, label_map)
+    class_nodes, props = Ontology_processing._candidate_entities(g, label_map, index, cache)
+    props = sorted(props, key=str)
+    chosen_cls, chosen_props = Ontology_processing.sample_entities(
+        class_nodes, props, sample_size, Ontology_processing._sample_rng(file_path, seed))
+    timings["index"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    classes = {}
+    for node in class_nodes:
+        if node in chosen_cls:
+            classes[Ontology_processing.process_class_expression(node, g, label_map, index, cache)] = \
+                Ontology_processing._class_axioms(node, g, label_map, index, cache)
+    timings["class_axioms"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    properties = {}
+    for prop in props:
+        if prop in chosen_props:
+            properties[Ontology_processing.format_node(prop, g, label_map, cache)] = \
+                Ontology_processing._property_axioms(prop, g, label_map, index, cache)
+    timings["property_axioms"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with tempfile.TemporaryFile("w", encoding="utf-8") as f:
+        json.dump({"classes": classes, "properties": properties}, f, indent=2, ensure_ascii=False)
+    timings["json_write"] = time.perf_counter() - start
+
+    return {
+        "file": os.path.basename(file_path),
+        "bytes": os.path.getsize(file_path),
+        "triples": len(g),
+        "backend": backend,
+        "classes": len(classes),
+        "properties": len(properties),
+        "stages_s": {stage: round(timings[stage], 4) for stage in STAGES},
+        "total_s": round(sum(timings.values()), 4),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def compare(results, baseline, tolerance=1.5, min_seconds=0.05):
+    # (file, backend, stage, baseline s, current s) for every stage slower than tolerance × baseline
+    previous = {(row["file"], row["backend"]): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        old = previous.get((row["file"], row["backend"]))
+        if old is None:
+            continue
+        for stage in STAGES:
+            before, after = old["stages_s"][stage], row["stages_s"][stage]
+            if after > min_seconds and after > tolerance * before:
+                regressions.append((row["file"], row["backend"], stage, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the axiom extraction stage by stage.")
+    parser.add_argument("dir_path", nargs="?", default=Ontology_processing.INPUT_DIR,
+                        help="directory of ontologies to benchmark ('' to skip)")
+    parser.add_argument("--synthetic", default="",
+                        help="comma separated triple counts of synthetic ontologies, e.g. 10000,100000,1000000")
+    parser.add_argument("--depth", type=int, default=3, help="class expression depth of the synthetic ontologies")
+    parser.add_argument("--width", type=int, default=3, help="union/intersection width of the synthetic ontologies")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic ontologies")
+    parser.add_argument("--backend", choices=["rdflib", "intstore"], default="rdflib")
+    parser.add_argument("--no-index", action="store_true")
+    parser.add_argument("--sample-size", type=int, default=0, help="entities rendered per ontology (0 = all)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="previous --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args()
+
+    paths = []
+    if args.dir_path:
+        paths = [os.path.join(args.dir_path, fname) for fname in sorted(os.listdir(args.dir_path))
+                 if fname.endswith(".owl") or fname.endswith(".ttl")]
+
+    results, synthetic = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in filter(None, args.synthetic.split(",")):
+            path = os.path.join(tmp, f"synthetic_{size}_d{args.depth}_w{args.width}_s{args.seed}.ttl")
+            synthetic.append(synthetic_ontology.generate(path, int(size), args.depth, args.width, args.seed))
+        for path in sorted(paths, key=os.path.getsize) + [info["path"] for info in synthetic]:
+            row = benchmark_file(path, args.backend, not args.no_index, args.sample_size)
+            results.append(row)
+            print(f"{row['file']:<40} {row['triples']:>8} triples " +
+                  " ".join(f"{stage}={row['stages_s'][stage]:.3f}" for stage in STAGES))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {"backend": args.backend, "use_index": not args.no_index, "sample_size": args.sample_size,
+                    "depth": args.depth, "width": args.width, "seed": args.seed},
+        "synthetic": [{k: v for k, v in info.items() if k != "path"} for info in synthetic],
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✔️ Benchmark saved: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for file, backend, stage, before, after in regressions:
+            print(f"❌ {file} ({backend}) {stage}: {before:.3f}s → {after:.3f}s")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
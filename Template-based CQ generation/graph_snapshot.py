@@ -0,0 +1,158 @@
+import os
+import re
+import hashlib
+import pickle
+from array import array
+from rdflib import Graph, URIRef, BNode, Literal
+from rdflib.plugins.stores.memory import Memory
+
+# ——————————————
+# Parsed-graph snapshots: the triples of an ontology are stored once as an interned term
+# table plus an integer triple array, keyed by the content hash of the source file.
+# Loading a snapshot skips the RDF/XML parse, which dominates the runtime on swo_merged.owl.
+SNAPSHOT_DIR = "Graph_snapshot"
+SNAPSHOT_VERSION = 1
+
+
+class _RecordingMemory(Memory):
+    # remembers the order in which the parser added triples, so that a restored graph
+    # iterates (and therefore renders) exactly like a freshly parsed one
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.order = []
+
+    def add(self, triple, context, quoted=False):
+        super().add(triple, context, quoted)
+        self.order.append(triple)
+
+
+def file_digest(file_path):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _snapshot_prefix(file_path):
+    # file name plus a short hash of its absolute path, so same-named ontologies in different
+    # directories sharing one cache directory keep separate snapshots
+    path_hash = hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:8]
+    return f"{os.path.basename(file_path)}.{path_hash}."
+
+
+def snapshot_path(file_path, digest, cache_dir=SNAPSHOT_DIR):
+    return os.path.join(cache_dir, f"{_snapshot_prefix(file_path)}{digest[:16]}.snap")
+
+
+def remove_stale(file_path, cache_dir=SNAPSHOT_DIR):
+    # drops every snapshot of this file (same name and directory), whatever content hash it was
+    # taken from, and the "<name>.<content hash>.snap" snapshots written before the path hash
+    prefix = _snapshot_prefix(file_path)
+    legacy = re.compile(re.escape(os.path.basename(file_path)) + r"\.[0-9a-f]{16}\.snap$")
+    if os.path.isdir(cache_dir):
+        for fname in os.listdir(cache_dir):
+            if (fname.startswith(prefix) and fname.endswith(".snap")) or legacy.match(fname):
+                os.remove(os.path.join(cache_dir, fname))
+
+
+def save_snapshot(triples, namespaces, path):
+    """
+    Writes `triples` (in the order they should be re-added) and the namespace bindings.
+
+    Every distinct term gets an integer id; a term is stored as its lexical form plus a
+    one-byte kind (U = URIRef, B = BNode, L = Literal). Literals additionally keep
+    (datatype id, language). The triples become one flat unsigned-int array of ids.
+    """
+    ids = {}
+    values, kinds, literals = [], bytearray(), {}
+
+    def intern(term):
+        tid = ids.get(term)
+        if tid is None:
+            tid = ids[term] = len(values)
+            values.append(str(term))
+            if isinstance(term, Literal):
+                kinds.append(ord("L"))
+                dt = intern(term.datatype) if term.datatype is not None else -1
+                literals[tid] = (dt, term.language)
+            elif isinstance(term, BNode):
+                kinds.append(ord("B"))
+            else:
+                kinds.append(ord("U"))
+        return tid
+
+    flat = array("I")
+    for s, p, o in triples:
+        flat.extend((intern(s), intern(p), intern(o)))
+
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "terms": values,
+        "kinds": bytes(kinds),
+        "literals": literals,
+        "triples": flat.tobytes(),
+        "namespaces": [(prefix, str(ns)) for prefix, ns in namespaces],
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """Returns (terms, triples, namespaces): rdflib terms by id, the flat id array and the bindings."""
+    with open(path, "rb") as f:
+        payload = pickle.load(f)
+    if payload.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"snapshot version {payload.get('version')} != {SNAPSHOT_VERSION}")
+
+    values, kinds, literals = payload["terms"], payload["kinds"], payload["literals"]
+    terms = [None] * len(values)
+    for tid, (value, kind) in enumerate(zip(values, kinds)):
+        if kind == ord("U"):
+            terms[tid] = URIRef(value)
+        elif kind == ord("B"):
+            terms[tid] = BNode(value)
+    # literals last: their datatype ids may point anywhere in the table
+    for tid, (dt, lang) in literals.items():
+        terms[tid] = Literal(values[tid], lang=lang, datatype=terms[dt] if dt >= 0 else None)
+
+    flat = array("I")
+    flat.frombytes(payload["triples"])
+    return terms, flat, payload["namespaces"]
+
+
+def load_snapshot(path):
+    terms, flat, namespaces = read_snapshot(path)
+    g = Graph(bind_namespaces="none")
+    for prefix, ns in namespaces:
+        g.bind(prefix, ns, override=True, replace=True)
+    g.addN((terms[flat[i]], terms[flat[i + 1]], terms[flat[i + 2]], g) for i in range(0, len(flat), 3))
+    return g
+
+
+def load_graph(file_path, file_format=None, cache_dir=SNAPSHOT_DIR):
+    """
+    Parses `file_path` into an rdflib Graph, going through the snapshot cache in `cache_dir`.
+    A snapshot is only reused when the content hash of the file matches; a changed file
+    gets a new snapshot and the stale ones of the same file are removed.
+    """
+    if not file_format:
+        file_format = "turtle" if file_path.endswith(".ttl") else "xml"
+    path = snapshot_path(file_path, file_digest(file_path), cache_dir)
+    if os.path.exists(path):
+        try:
+            return load_snapshot(path)
+        except Exception as e:
+            print(f"⚠️ unreadable snapshot ({path}): {e}, re-parsing")
+
+    store = _RecordingMemory()
+    g = Graph(store=store)
+    g.parse(file_path, format=file_format)
+
+    remove_stale(file_path, cache_dir)
+    save_snapshot(store.order, g.namespaces(), path)
+    store.order = []
+    return g
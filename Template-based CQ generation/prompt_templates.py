@@ -0,0 +1,190 @@
+import os
+import json
+
+# ——————————————
+# CQ-generation prompt registry. The templates/ directory is read once; the parts of a
+# batch request that do not depend on the axiom (system prompt per logic hint, template
+# text per relation, request envelope) are built and JSON-encoded once, so a request line
+# is a concatenation of shared pre-encoded parts and the encoded axiom / custom_id.
+
+MODEL = "gpt-4.1"
+MAX_TOKENS = 512
+
+PROPERTY_RESTRICTION_HINT = """
+        The axiom may include different logical structures. Determine whether it involves existential/universal restrictions (some/only) or intersection/union (and/or), and generate CQs accordingly.
+        """
+DOMAIN_RANGE_HINT = """
+        If the property’s domain or range is undefined (None), generate a Competency Question asking what can be the domain or range of the property, is it right that the property has no domain or range.
+        """
+
+
+def load_templates(directory="templates"):
+    """
+    Read all .txt files in the given directory and return a dict
+    mapping filename (without .txt) to file content.
+    """
+    templates = {}
+    for filename in os.listdir(directory):
+        if filename.lower().endswith(".txt"):
+            key = os.path.splitext(filename)[0]
+            path = os.path.join(directory, filename)
+            with open(path, "r", encoding="utf-8") as f:
+                templates[key] = f.read()
+    return templates
+
+
+def logic_hint(axiom):
+    # hint for the logic of the axiom (matched on the whole axiom string)
+    if any(keyword in axiom for keyword in ["propertyRestrictions", "equivalentClass"]):
+        return PROPERTY_RESTRICTION_HINT
+    elif any(keyword in axiom for keyword in ["domain", "range"]):
+        return DOMAIN_RANGE_HINT
+    return ""
+
+
+def system_prompt(hint):
+    return f"""
+                    As an ontology engineer, generate a list of competency questions based on the following axiom and one-shot example.
+                    Definition of competency questions: the questions that outline the scope of ontology and provide an idea about the knowledge that needs to be entailed in the ontology.
+                    Avoid using narrative questions + axioms.
+                    Don't generate unnecessary text. Just return 3 distinct CQs separated by ' // '.
+                    Use the one-shot and known templates only as inspiration — do not copy them directly. Rephrase and vary the structure of each CQ while maintaining its logical intent.
+                    {hint.strip()}
+                    """
+
+
+def user_prompt(template, axiom):
+    return f"""
+                    Generate competency questions including axioms and current template.
+                    Template: {template}
+                    Axiom: {axiom}
+                    """
+
+
+def packed_system_prompt(hints):
+    return f"""
+                    As an ontology engineer, generate competency questions for each of the numbered axioms below, based on the template of its axiom type.
+                    Definition of competency questions: the questions that outline the scope of ontology and provide an idea about the knowledge that needs to be entailed in the ontology.
+                    Avoid using narrative questions + axioms.
+                    Return only a JSON object that maps every axiom number ("1", "2", ...) to a list of 3 distinct CQs for that axiom.
+                    Use the one-shot and known templates only as inspiration — do not copy them directly. Rephrase and vary the structure of each CQ while maintaining its logical intent.
+                    {" ".join(hint.strip() for hint in hints)}
+                    """
+
+
+def packed_user_prompt(templates, axioms):
+    template_text = "\n".join(f"Template ({relation}): {template}" for relation, template in templates.items())
+    axiom_text = "\n".join(f"{n}. {axiom}" for n, axiom in enumerate(axioms, 1))
+    return f"""
+                    Generate competency questions for every axiom, using the template of its axiom type.
+                    {template_text}
+                    Axioms:
+                    {axiom_text}
+                    """
+
+
+def prompt_tokens(request):
+    # rough prompt size of a request (≈ 4 characters per token), for comparing request layouts
+    return sum(len(message["content"]) for message in request["body"]["messages"]) // 4
+
+
+def pack_axioms(entries, by="entity", size=10):
+    """
+    Groups (entity, axiom, axiom_relation) entries into lists of at most `size` (axiom, axiom_relation)
+    pairs sharing the entity (`by="entity"`) or the axiom type (`by="relation"`), in first-seen order.
+    """
+    groups = {}
+    for entity, axiom, axiom_relation in entries:
+        key = entity if by == "entity" else TemplateRegistry._relation(axiom_relation)
+        groups.setdefault(key, []).append((axiom, axiom_relation))
+    for group in groups.values():
+        for start in range(0, len(group), size):
+            yield group[start:start + size]
+
+
+def _escape(text):
+    # JSON string body of `text` (json.dumps without the quotes); escaping is per character,
+    # so escaped pieces can be concatenated
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+class TemplateRegistry:
+    """
+    Prompt templates loaded once from `directory`, keyed by axiom relation
+    (domain and range share "domain_range").
+
+    `request` builds the batch request dict of one axiom (same layout as the OpenAI batch
+    input) and `request_line` its JSONL line, identical to `json.dumps(request, ensure_ascii=False)`.
+    The line is assembled from the JSON of a request built once per (relation, logic hint)
+    with placeholders for custom_id and axiom. Nothing shared is copied or mutated per axiom.
+    """
+    def __init__(self, directory="templates", model=MODEL, max_tokens=MAX_TOKENS):
+        self.templates = load_templates(directory)
+        self.model = model
+        self.max_tokens = max_tokens
+        self.system_prompts = {hint: system_prompt(hint) for hint in ("", PROPERTY_RESTRICTION_HINT, DOMAIN_RANGE_HINT)}
+        self._lines = {}
+        for relation, template in self.templates.items():
+            for hint in self.system_prompts:
+                encoded = json.dumps(self._request(hint, template, "\0", "\0"), ensure_ascii=False)
+                # [before custom_id, between custom_id and axiom, after axiom]
+                self._lines[relation, hint] = encoded.split("\\u0000")
+
+    def template(self, axiom_relation):
+        return self.templates[self._relation(axiom_relation)]
+
+    @staticmethod
+    def _relation(axiom_relation):
+        return "domain_range" if axiom_relation in ["domain", "range"] else axiom_relation
+
+    def _request(self, hint, template, axiom, custom_id):
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": self.system_prompts[hint]},
+                    {"role": "user", "content": user_prompt(template, axiom)},
+                    {"role": "user", "content": "Generated CQs:"}
+                ],
+                "max_tokens": self.max_tokens
+            }
+        }
+
+    def request(self, axiom, axiom_relation, custom_id=None):
+        return self._request(logic_hint(axiom), self.template(axiom_relation), axiom, custom_id)
+
+    def packed_request(self, axioms, custom_id=None):
+        """
+        One request for several (axiom, axiom_relation) pairs: the system prompt, and each distinct
+        template, appear once, and the answer is a JSON object of CQ lists keyed by axiom number
+        (see `batch_output.split_packed`). The completion budget is `max_tokens` per axiom.
+        """
+        templates, hints = {}, []
+        for axiom, axiom_relation in axioms:
+            relation = self._relation(axiom_relation)
+            templates.setdefault(relation, self.templates[relation])
+            hint = logic_hint(axiom)
+            if hint and hint not in hints:
+                hints.append(hint)
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": packed_system_prompt(hints)},
+                    {"role": "user", "content": packed_user_prompt(templates, [axiom for axiom, _ in axioms])},
+                    {"role": "user", "content": "Generated CQs (JSON):"}
+                ],
+                "max_tokens": self.max_tokens * len(axioms),
+                "response_format": {"type": "json_object"}
+            }
+        }
+
+    def request_line(self, axiom, axiom_relation, custom_id):
+        before, middle, after = self._lines[self._relation(axiom_relation), logic_hint(axiom)]
+        return before + _escape(custom_id) + middle + _escape(axiom) + after
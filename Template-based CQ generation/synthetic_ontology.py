@@ -0,0 +1,150 @@
+import os
+import random
+import argparse
+
+# ——————————————
+# Seeded synthetic OWL ontologies (Turtle) for benchmarking Ontology_processing.
+# The class hierarchy, restrictions and union/intersection expressions follow the shapes
+# found in the bundled ontologies; `depth` bounds the nesting of class expressions and
+# `width` is the number of operands of owl:unionOf / owl:intersectionOf.
+BASE_IRI = "http://example.org/synthetic"
+
+HEADER = f"""@prefix : <{BASE_IRI}#> .
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+
+<{BASE_IRI}> a owl:Ontology .
+"""
+CHARACTERISTICS = ["owl:FunctionalProperty", "owl:TransitiveProperty", "owl:SymmetricProperty",
+                   "owl:InverseFunctionalProperty", "owl:AsymmetricProperty"]
+
+
+class _ExpressionWriter:
+    # renders random class expressions as Turtle and counts the triples they add
+    def __init__(self, rng, n_props, depth, width):
+        self.rng = rng
+        self.n_props = n_props
+        self.depth = depth
+        self.width = width
+
+    def named(self, n_classes):
+        return f":C{self.rng.randrange(max(n_classes, 1))}", 0
+
+    def expression(self, n_classes, depth=None):
+        rng = self.rng
+        depth = self.depth if depth is None else depth
+        if depth <= 0 or rng.random() < 0.3:
+            return self.named(n_classes)
+        kind = rng.random()
+        if kind < 0.6:
+            return self.restriction(n_classes, depth)
+        if kind < 0.9:
+            op = rng.choice(["owl:unionOf", "owl:intersectionOf"])
+            members = [self.expression(n_classes, depth - 1) for _ in range(self.width)]
+            text = " ".join(m for m, _ in members)
+            # rdf:type, the operator and two triples per list cell
+            return f"[ a owl:Class ; {op} ( {text} ) ]", 2 + 2 * self.width + sum(t for _, t in members)
+        inner, triples = self.expression(n_classes, depth - 1)
+        return f"[ a owl:Class ; owl:complementOf {inner} ]", 2 + triples
+
+    def restriction(self, n_classes, depth=None):
+        rng = self.rng
+        depth = self.depth if depth is None else depth
+        prop = f":p{rng.randrange(self.n_props)}"
+        kind = rng.random()
+        if kind < 0.8:
+            quantifier = "owl:someValuesFrom" if kind < 0.5 else "owl:allValuesFrom"
+            filler, triples = self.expression(n_classes, depth - 1)
+            return f"[ a owl:Restriction ; owl:onProperty {prop} ; {quantifier} {filler} ]", 3 + triples
+        if kind < 0.9:
+            filler, triples = self.named(n_classes)
+            return (f"[ a owl:Restriction ; owl:onProperty {prop} ; "
+                    f"owl:minQualifiedCardinality \"{rng.randint(1, 3)}\"^^xsd:nonNegativeInteger ; owl:onClass {filler} ]"), 4 + triples
+        filler, triples = self.named(n_classes)
+        return f"[ a owl:Restriction ; owl:onProperty {prop} ; owl:hasValue {filler} ]", 3 + triples
+
+
+def generate(path, triples=10000, depth=3, width=3, seed=0, properties=None):
+    """
+    Writes a synthetic ontology with at least `triples` triples to `path` (Turtle) and returns
+    {"path", "triples", "classes", "properties", "depth", "width", "seed"}. The same arguments
+    always produce the same file. `properties` defaults to one object property per 100 triples.
+    """
+    rng = random.Random(seed)
+    n_props = properties or max(10, triples // 100)
+    expr = _ExpressionWriter(rng, n_props, depth, width)
+    # rough class count, only used for the domain/range of properties
+    est_classes = max(10, triples // 12)
+    count = 1
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+
+        # 1. object properties
+        for j in range(n_props):
+            lines = [f":p{j} a owl:ObjectProperty", f'rdfs:label "property {j}"']
+            count += 2
+            if rng.random() < 0.8:
+                lines.append(f"rdfs:domain :C{rng.randrange(est_classes)}")
+                count += 1
+            if rng.random() < 0.8:
+                lines.append(f"rdfs:range :C{rng.randrange(est_classes)}")
+                count += 1
+            if j and rng.random() < 0.3:
+                lines.append(f"rdfs:subPropertyOf :p{rng.randrange(j)}")
+                count += 1
+            if j and rng.random() < 0.1:
+                lines.append(f"owl:inverseOf :p{rng.randrange(j)}")
+                count += 1
+            if rng.random() < 0.2:
+                lines.append(f"a {rng.choice(CHARACTERISTICS)}")
+                count += 1
+            f.write(" ;\n    ".join(lines) + " .\n")
+
+        # 2. classes, until the triple budget is used up
+        i = 0
+        while count < triples:
+            lines = [f":C{i} a owl:Class", f'rdfs:label "class {i}"']
+            count += 2
+            if rng.random() < 0.5:
+                lines.append(f'rdfs:comment "Synthetic class number {i}."')
+                count += 1
+            if i:
+                lines.append(f"rdfs:subClassOf :C{rng.randrange(i)}")
+                count += 1
+            for _ in range(rng.randint(0, 2)):
+                text, added = expr.restriction(i)
+                lines.append(f"rdfs:subClassOf {text}")
+                count += 1 + added
+            if i and rng.random() < 0.2:
+                lines.append(f"owl:disjointWith :C{rng.randrange(i)}")
+                count += 1
+            if i and rng.random() < 0.1:
+                text, added = expr.expression(i)
+                lines.append(f"owl:equivalentClass {text}")
+                count += 1 + added
+            f.write(" ;\n    ".join(lines) + " .\n")
+            i += 1
+
+    return {"path": path, "triples": count, "classes": i, "properties": n_props,
+            "depth": depth, "width": width, "seed": seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic OWL ontology (Turtle).")
+    parser.add_argument("path")
+    parser.add_argument("--triples", type=int, default=10000)
+    parser.add_argument("--depth", type=int, default=3, help="maximum nesting of class expressions")
+    parser.add_argument("--width", type=int, default=3, help="operands per owl:unionOf / owl:intersectionOf")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--properties", type=int, default=None)
+    args = parser.parse_args()
+    info = generate(args.path, args.triples, args.depth, args.width, args.seed, args.properties)
+    print(f"✔️ {info['path']}: {info['triples']} triples, {info['classes']} classes, {info['properties']} properties")
+
+
+if __name__ == "__main__":
+    main()
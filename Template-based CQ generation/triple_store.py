@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+from array import array
+from bisect import bisect_left, bisect_right
+from rdflib import Graph, URIRef
+from rdflib.store import Store
+import graph_snapshot
+
+# ——————————————
+# Interned integer triple store for large ontologies.
+# rdflib's default Memory store keeps three nested dict indexes (plus a context set) of term
+# objects per triple. This store interns every term once and keeps the triples as unsigned-int
+# columns with two sorted permutations (SPO and POS) that are searched with bisect. It is an
+# rdflib Store, so the streaming RDF/XML and Turtle parsers feed it directly and
+# `process_class_expression` and the axiom loops run on it unchanged through `Graph`.
+
+
+class IntegerTripleStore(Store):
+    """
+    rdflib Store backed by integer arrays, built for load-then-query use.
+
+    Triples are appended to the insertion-ordered columns `_s`, `_p`, `_o` while parsing.
+    The first query freezes the store: duplicates are dropped, and `_spo` / `_pos` become
+    permutations of the columns sorted by (subject, predicate) and (predicate, object).
+    `remove` is supported but rewrites the columns (O(number of triples) per call), and the
+    next query sorts them again; interned terms are never dropped.
+    Lookups keep rdflib's Memory ordering: objects of (s, p) and subjects of (p, o) come in
+    insertion order, and (None, p, None) walks objects in the order they were first seen
+    with p. Extraction output therefore matches the default backend.
+    """
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None):
+        super().__init__(configuration)
+        self.identifier = identifier
+        self._terms = []
+        self._ids = {}
+        self._s, self._p, self._o = array("I"), array("I"), array("I")
+        self._spo, self._pos = array("I"), array("I")
+        self._frozen = True
+        self._namespace = {}
+        self._prefix = {}
+
+    # ---------- loading ----------
+    def _intern(self, term):
+        tid = self._ids.get(term)
+        if tid is None:
+            tid = self._ids[term] = len(self._terms)
+            self._terms.append(term)
+        return tid
+
+    def add(self, triple, context=None, quoted=False):
+        s, p, o = triple
+        self._s.append(self._intern(s))
+        self._p.append(self._intern(p))
+        self._o.append(self._intern(o))
+        self._frozen = False
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.add((s, p, o))
+
+    def remove(self, triple_pattern, context=None):
+        # drops every triple matching the pattern (None = wildcard), keeping the insertion order of the rest
+        ids = self._pattern_ids(triple_pattern)
+        if ids is None:
+            return
+        if not self._frozen:
+            self._freeze()
+        drop = set(self._match(*ids))
+        if not drop:
+            return
+        keep = [i for i in range(len(self._s)) if i not in drop]
+        self._s = array("I", (self._s[i] for i in keep))
+        self._p = array("I", (self._p[i] for i in keep))
+        self._o = array("I", (self._o[i] for i in keep))
+        self._frozen = False
+
+    @classmethod
+    def from_snapshot(cls, terms, flat, namespaces):
+        # adopts the term table and flat id array of graph_snapshot.read_snapshot() as-is
+        store = cls()
+        store._terms = terms
+        store._ids = {term: tid for tid, term in enumerate(terms)}
+        store._s, store._p, store._o = flat[0::3], flat[1::3], flat[2::3]
+        store._frozen = False
+        for prefix, ns in namespaces:
+            store.bind(prefix, URIRef(ns))
+        return store
+
+    def insertion_triples(self):
+        terms = self._terms
+        for s, p, o in zip(self._s, self._p, self._o):
+            yield terms[s], terms[p], terms[o]
+
+    def _sort_order(self, *columns):
+        """
+        Insertion indexes sorted by the given columns, ties in insertion order. Each triple is packed
+        into one integer (column ids..., insertion index), so this is a plain int sort instead of
+        a sort on tuple keys.
+        """
+        id_bits = max(len(self._terms) - 1, 1).bit_length()
+        index_bits = max(len(columns[0]) - 1, 1).bit_length()
+        if len(columns) == 2:
+            a, b = columns
+            keys = [((x << id_bits | y) << index_bits) | i for i, (x, y) in enumerate(zip(a, b))]
+        else:
+            a, b, c = columns
+            keys = [((((x << id_bits | y) << id_bits) | z) << index_bits) | i for i, (x, y, z) in enumerate(zip(a, b, c))]
+        keys.sort()
+        mask = (1 << index_bits) - 1
+        return array("I", (key & mask for key in keys))
+
+    def _freeze(self):
+        s, p, o = self._s, self._p, self._o
+        # drop repeated triples, keeping the first occurrence (rdflib sets semantics)
+        order = self._sort_order(s, p, o)
+        keep = array("I", order[:1])
+        for prev, cur in zip(order, order[1:]):
+            if s[prev] != s[cur] or p[prev] != p[cur] or o[prev] != o[cur]:
+                keep.append(cur)
+        if len(keep) != len(s):
+            keep = sorted(keep)
+            self._s = s = array("I", (s[i] for i in keep))
+            self._p = p = array("I", (p[i] for i in keep))
+            self._o = o = array("I", (o[i] for i in keep))
+        del order, keep
+        self._spo = self._sort_order(s, p)
+        self._pos = self._sort_order(p, o)
+        self._frozen = True
+
+    # ---------- lookups ----------
+    def _block(self, perm, col, value, lo=0, hi=None):
+        # [lo, hi) of `perm` where col[perm[j]] == value; perm must be sorted on col there
+        hi = len(perm) if hi is None else hi
+        key = col.__getitem__
+        return bisect_left(perm, value, lo, hi, key=key), bisect_right(perm, value, lo, hi, key=key)
+
+    def _match(self, si, pi, oi):
+        # yields insertion indexes of the triples matching the (id or None) pattern
+        s, p, o = self._s, self._p, self._o
+        if si is not None:
+            lo, hi = self._block(self._spo, s, si)
+            if pi is not None:
+                lo, hi = self._block(self._spo, p, pi, lo, hi)
+            for j in range(lo, hi):
+                i = self._spo[j]
+                if oi is None or o[i] == oi:
+                    yield i
+        elif pi is not None:
+            lo, hi = self._block(self._pos, p, pi)
+            if oi is not None:
+                lo, hi = self._block(self._pos, o, oi, lo, hi)
+                yield from self._pos[lo:hi]
+                return
+            # object groups in the order the object was first seen with this predicate
+            groups = []
+            j = lo
+            while j < hi:
+                k = bisect_right(self._pos, o[self._pos[j]], j, hi, key=o.__getitem__)
+                groups.append((self._pos[j], j, k))
+                j = k
+            groups.sort()
+            for _, j, k in groups:
+                yield from self._pos[j:k]
+        else:
+            for i in self._spo:
+                if oi is None or o[i] == oi:
+                    yield i
+
+    def _pattern_ids(self, triple_pattern):
+        # term ids of the pattern (None stays a wildcard); None when a term was never added
+        ids = []
+        for term in triple_pattern:
+            if term is None:
+                ids.append(None)
+                continue
+            tid = self._ids.get(term)
+            if tid is None:
+                return None
+            ids.append(tid)
+        return ids
+
+    def triples(self, triple_pattern, context=None):
+        if not self._frozen:
+            self._freeze()
+        ids = self._pattern_ids(triple_pattern)
+        if ids is None:
+            return
+        terms, s, p, o = self._terms, self._s, self._p, self._o
+        for i in self._match(*ids):
+            yield (terms[s[i]], terms[p[i]], terms[o[i]]), iter(())
+
+    def __len__(self, context=None):
+        if not self._frozen:
+            self._freeze()
+        return len(self._s)
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # ---------- namespaces (same semantics as rdflib's Memory store) ----------
+    def bind(self, prefix, namespace, override=True):
+        bound_namespace = self._namespace.get(prefix)
+        bound_prefix = self._prefix.get(namespace)
+        if bound_prefix is None and bound_namespace is not None:
+            bound_prefix = self._prefix.get(bound_namespace)
+        if override:
+            if bound_prefix is not None:
+                del self._namespace[bound_prefix]
+            if bound_namespace is not None:
+                del self._prefix[bound_namespace]
+            self._prefix[namespace] = prefix
+            self._namespace[prefix] = namespace
+        else:
+            ns = bound_namespace if bound_namespace is not None else namespace
+            pf = bound_prefix if bound_prefix is not None else prefix
+            self._prefix[ns] = pf
+            self._namespace[pf] = ns
+
+    def namespace(self, prefix):
+        return self._namespace.get(prefix)
+
+    def prefix(self, namespace):
+        return self._prefix.get(namespace)
+
+    def namespaces(self):
+        yield from self._namespace.items()
+
+
+def load_graph(file_path, file_format=None, snapshot_dir=graph_snapshot.SNAPSHOT_DIR):
+    """
+    Loads `file_path` into a Graph backed by IntegerTripleStore. A matching parsed-graph
+    snapshot is read straight into the integer columns; otherwise the file is streamed
+    through rdflib's parser into the store (and a snapshot is written when `snapshot_dir` is set).
+    """
+    if not file_format:
+        file_format = "turtle" if file_path.endswith(".ttl") else "xml"
+    path = None
+    if snapshot_dir:
+        path = graph_snapshot.snapshot_path(file_path, graph_snapshot.file_digest(file_path), snapshot_dir)
+        if os.path.exists(path):
+            try:
+                terms, flat, namespaces = graph_snapshot.read_snapshot(path)
+                return Graph(store=IntegerTripleStore.from_snapshot(terms, flat, namespaces), bind_namespaces="none")
+            except Exception as e:
+                print(f"⚠️ unreadable snapshot ({path}): {e}, re-parsing")
+
+    store = IntegerTripleStore()
+    g = Graph(store=store)
+    g.parse(file_path, format=file_format)
+    if path:
+        graph_snapshot.remove_stale(file_path, snapshot_dir)
+        graph_snapshot.save_snapshot(store.insertion_triples(), g.namespaces(), path)
+    return g
+
+
+def _measure(backend, file_path):
+    # child process of compare_backends(): parse + extract once, report time and peak RSS
+    import Ontology_processing
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    g = Ontology_processing.load_graph(file_path, snapshot_dir=None, backend=backend)
+    loaded = time.perf_counter()
+    output = Ontology_processing.extract_axioms(g, file_path)
+    done = time.perf_counter()
+    print(json.dumps({
+        "load_s": round(loaded - start, 3),
+        "extract_s": round(done - loaded, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "rss_growth_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss) / 1024, 1),
+        "entities": len(output["classes"]) + len(output["properties"]),
+    }))
+
+
+def compare_backends(dir_path):
+    """Runs every ontology in `dir_path` through both backends in fresh processes and prints time / peak RSS."""
+    rows = []
+    for fname in sorted(os.listdir(dir_path), key=lambda f: os.path.getsize(os.path.join(dir_path, f))):
+        if not (fname.endswith(".owl") or fname.endswith(".ttl")):
+            continue
+        path = os.path.join(dir_path, fname)
+        for backend in ("rdflib", "intstore"):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", backend, path],
+                                 capture_output=True, text=True, check=True).stdout
+            rows.append({"file": fname, "backend": backend, **json.loads(out.strip().splitlines()[-1])})
+
+    print(f"{'file':<32} {'backend':<9} {'load s':>7} {'extract s':>9} {'peak RSS MB':>11} {'RSS growth MB':>13}")
+    for r in rows:
+        print(f"{r['file']:<32} {r['backend']:<9} {r['load_s']:>7} {r['extract_s']:>9} {r['peak_rss_mb']:>11} {r['rss_growth_mb']:>13}")
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        _measure(sys.argv[2], sys.argv[3])
+    else:
+        compare_backends(sys.argv[1] if len(sys.argv) > 1 else "Ontology")